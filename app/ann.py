@@ -0,0 +1,155 @@
+# app/ann.py
+import os
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+# below this many vectors brute force is fast enough and no IVF is built
+IVF_MIN_VECTORS = int(os.getenv("IVF_MIN_VECTORS", "20000"))
+# lists probed per query: higher = better recall, slower
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+# retrain the centroids once the corpus has grown this much since training
+IVF_RETRAIN_FACTOR = float(os.getenv("IVF_RETRAIN_FACTOR", "4"))
+KMEANS_ITERATIONS = 15
+SAMPLE_PER_LIST = 64
+
+
+def default_nlist(n: int):
+    return max(1, int(4 * np.sqrt(n)))
+
+
+def kmeans(data, nlist: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0):
+    """Spherical k-means (cosine) on a sample of `data`; returns (nlist, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    n = len(data)
+    sample = data[np.sort(rng.choice(n, size=min(n, nlist * SAMPLE_PER_LIST), replace=False))]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        counts = np.bincount(assign, minlength=nlist)
+
+        # per-list sums in one pass: sort rows by list, reduce each run
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+
+        # an empty list gets a random sample point so no centroid is wasted
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+
+def assign_rows(data, centroids, batch: int = 65536):
+    out = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), batch):
+        block = np.asarray(data[start:start + batch], dtype=np.float32)
+        out[start:start + batch] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+# ---------------- BUILD / UPDATE ----------------
+def update(dir_path: str, matrix, ivf: dict, generation: int):
+    """
+    Brings the IVF index up to date with `matrix` (the committed vectors)
+    and returns the new manifest entry (or None while the corpus is too
+    small). New rows are only assigned to their nearest centroid;
+    centroids are retrained (into new files) when the corpus has grown by
+    IVF_RETRAIN_FACTOR since they were trained.
+    """
+    n = len(matrix)
+    if n < IVF_MIN_VECTORS:
+        return None
+
+    if ivf is None or n >= ivf["trained_on"] * IVF_RETRAIN_FACTOR:
+        name = f"ivf-{generation:05d}"
+        centroids = kmeans(matrix, default_nlist(n))
+        np.save(os.path.join(dir_path, name + ".centroids.npy"), centroids)
+        ivf = {"name": name, "nlist": len(centroids), "trained_on": n, "n_assigned": 0}
+    else:
+        centroids = np.load(os.path.join(dir_path, ivf["name"] + ".centroids.npy"))
+
+    # assignment file is append-only; drop anything a crashed ingest left behind
+    with open(os.path.join(dir_path, ivf["name"] + ".assign.i32"), "a+b") as f:
+        f.truncate(ivf["n_assigned"] * 4)
+        f.write(assign_rows(matrix[ivf["n_assigned"]:], centroids).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    return dict(ivf, n_assigned=n)
+
+
+# ---------------- SEARCH ----------------
+class IVFIndex:
+    """Inverted-file index over the vector matrix: probe the closest lists, score only their rows."""
+
+    def __init__(self, dir_path: str, ivf: dict, matrix):
+        self.matrix = matrix
+        self.centroids = np.load(os.path.join(dir_path, ivf["name"] + ".centroids.npy"))
+
+        n = min(ivf["n_assigned"], len(matrix))
+        assign = np.fromfile(os.path.join(dir_path, ivf["name"] + ".assign.i32"), dtype=np.int32, count=n)
+
+        # rows grouped by list: list l is order[starts[l]:starts[l + 1]]
+        self.order = np.argsort(assign, kind="stable").astype(np.int64)
+        self.starts = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=len(self.centroids)))])
+
+    def __len__(self):
+        return len(self.order)
+
+    def search(self, query_vector, k: int = 4, nprobe: int = IVF_NPROBE, live=None):
+        """`live` (bool mask over rows) drops tombstoned rows from the probed lists before scoring."""
+        q = np.asarray(query_vector, dtype=np.float32)
+        nprobe = min(nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+
+        ids = np.concatenate([self.order[self.starts[l]:self.starts[l + 1]] for l in probe])
+        ids.sort()  # sequential reads from the memmap
+        if live is not None:
+            ids = ids[live[ids]]
+        return search_rows(self.matrix, ids, q, k)
+
+
+def search_rows(matrix, ids, query_vector, k: int = 4):
+    """Exact top-k (score, row) over just the rows in `ids` (sorted), best first."""
+    if not len(ids):
+        return []
+    scores = matrix[ids] @ np.asarray(query_vector, dtype=np.float32)
+    k = min(k, len(ids))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(float(scores[i]), int(ids[i])) for i in top]
+
+
+def search_rows_many(matrix, ids, query_matrix, k: int = 4, live=None):
+    """
+    search_rows for a (b, dim) batch of queries; `ids` None means every
+    row. `live` (bool mask over rows, only with ids None) scores every row
+    but never returns the dead ones, without copying the matrix.
+    """
+    rows = matrix if ids is None else matrix[ids]
+    if not len(rows):
+        return [[] for _ in query_matrix]
+    scores = rows @ np.asarray(query_matrix, dtype=np.float32).T  # (rows, b)
+    n_rows = len(rows)
+    if live is not None and ids is None:
+        scores[~live] = -np.inf
+        n_rows = int(np.count_nonzero(live))
+        if not n_rows:
+            return [[] for _ in query_matrix]
+    k = min(k, n_rows)
+    top = np.argpartition(-scores, k - 1, axis=0)[:k]  # (k, b)
+    out = []
+    for col in range(scores.shape[1]):
+        best = top[:, col][np.argsort(-scores[top[:, col], col], kind="stable")]
+        picked = best if ids is None else ids[best]
+        out.append([(float(scores[i, col]), int(r)) for i, r in zip(best, picked)])
+    return out
@@ -0,0 +1,102 @@
+# app/batching.py
+import asyncio
+import os
+import weakref
+
+# ---------------- CONFIG ----------------
+# identical in-flight queries (same normalized text, mode, collections,
+# filters and corpus version) share one retrieval + LLM call
+COALESCE_QUERIES = os.getenv("COALESCE_QUERIES", "1") == "1"
+# distinct queries waiting for retrieval are scored together, at most this many per batch (1 = off)
+RETRIEVAL_BATCH_MAX = int(os.getenv("RETRIEVAL_BATCH_MAX", "32"))
+# retrieval batches running at once (threads); scoring holds the GIL, so more only helps a little
+RETRIEVAL_BATCH_WORKERS = int(os.getenv("RETRIEVAL_BATCH_WORKERS", "2"))
+
+
+def _consume(task):
+    # nobody may be left awaiting a shared task; don't log "exception never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    """
+    Concurrent `do(key, fn)` calls with the same key share one run of the
+    coroutine function `fn`: the first caller starts it, later ones await
+    the same task. The task isn't cancelled with its first caller (a
+    client hanging up), so the others still get the result.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()  # event loop → {key: task}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, fn):
+        """Returns (result, shared); shared is True for callers that joined a running call."""
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        shared = task is not None
+        if shared:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            task = calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: (calls.pop(key, None), _consume(t)))
+        return await asyncio.shield(task), shared
+
+
+class MicroBatcher:
+    """
+    Runs `fn(group, items)` → one result per item, in a worker thread, for
+    items submitted with the same `group`. An item starts right away when
+    one of `workers` is free; items arriving while all are busy queue up
+    and go together as the next batch (at most `max_size`). Batches only
+    form under load, so an idle server adds no wait.
+    """
+
+    def __init__(self, fn, max_size: int = RETRIEVAL_BATCH_MAX, workers: int = RETRIEVAL_BATCH_WORKERS):
+        self.fn = fn
+        self.max_size = max(1, max_size)
+        self.workers = max(1, workers)
+        self._state = weakref.WeakKeyDictionary()  # event loop → {"pending": [...], "running": n}
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, group, item):
+        loop = asyncio.get_running_loop()
+        state = self._state.setdefault(loop, {"pending": [], "running": 0})
+        future = loop.create_future()
+        state["pending"].append((group, item, future))
+        self._launch(state)
+        return await future
+
+    def _launch(self, state):
+        while state["pending"] and state["running"] < self.workers:
+            # the oldest item's group goes first; others keep their place
+            group = state["pending"][0][0]
+            batch, rest = [], []
+            for entry in state["pending"]:
+                (batch if entry[0] == group and len(batch) < self.max_size else rest).append(entry)
+            state["pending"] = rest
+            state["running"] += 1
+            asyncio.ensure_future(self._run(state, group, batch))
+
+    async def _run(self, state, group, batch):
+        # callers that gave up (cancelled futures) are dropped before the work starts
+        batch = [entry for entry in batch if not entry[2].done()]
+        try:
+            if batch:
+                results = await asyncio.to_thread(self.fn, group, [item for _, item, _ in batch])
+                for (_, _, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            state["running"] -= 1
+            self.batches += bool(batch)
+            self.items += len(batch)
+            self._launch(state)
@@ -0,0 +1,219 @@
+# app/cache.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app import db
+from app.index import tokenize
+
+CHUNK_CACHE_MB = int(os.getenv("CHUNK_CACHE_MB", "256"))
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# also keep answers in the SQLite metadata DB so they survive restarts
+ANSWER_CACHE_PERSIST = os.getenv("ANSWER_CACHE_PERSIST", "0") == "1"
+
+
+class ByteBudget:
+    """Bytes that several LoweredChunks views may memoize between them."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self, n: int):
+        with self._lock:
+            if self.used + n > self.max_bytes:
+                return False
+            self.used += n
+            return True
+
+    def give_back(self, n: int):
+        with self._lock:
+            self.used -= n
+
+
+class LoweredChunks:
+    """
+    Lowercased view over a chunk store, filled in as chunks are asked for.
+    Stops memoizing once `budget` (bytes, or a ByteBudget shared with
+    other views) is used up.
+    """
+
+    def __init__(self, chunks, budget):
+        self._chunks = chunks
+        self._memo = {}
+        self.budget = budget if isinstance(budget, ByteBudget) else ByteBudget(budget)
+        self.size_bytes = 0
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __getitem__(self, i: int):
+        text = self._memo.get(i)
+        if text is None:
+            text = self._chunks[i].lower()
+            if self.budget.take(len(text)):
+                self._memo[i] = text
+                self.size_bytes += len(text)
+        return text
+
+    def release(self):
+        # the view is being dropped: its bytes go back to the shared budget,
+        # and a query still holding it doesn't memoize any more
+        self.budget.give_back(self.size_bytes)
+        self.budget = ByteBudget(0)
+        self.size_bytes = 0
+        self._memo = {}
+
+
+class ChunkCache:
+    """
+    Process-wide cache of open chunk stores and their lowercased views,
+    one entry per store. Keys are (store path, generation): a new
+    generation replaces that store's entry, so it's only rebuilt after an
+    ingest, and queries over several collections hit for all of them. The
+    stores are mmapped; only the lowercased copies count against
+    `max_bytes`, shared by every entry.
+    """
+
+    def __init__(self, max_bytes: int = CHUNK_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._budget = ByteBudget(max_bytes)
+        self._entries = {}  # path -> (generation, (chunks, lowered))
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader):
+        """Returns (chunks, lowered); `loader()` is called on a miss."""
+        path, generation = key
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == generation:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        chunks = loader()
+        entry = (chunks, LoweredChunks(chunks, self._budget))
+
+        with self._lock:
+            old = self._entries.get(path)
+            self._entries[path] = (generation, entry)
+        if old is not None:
+            old[1][1].release()
+
+        return entry
+
+    def clear(self):
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        for _, (_, lowered) in entries.values():
+            lowered.release()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "size_bytes": self._budget.used,
+            "max_bytes": self.max_bytes,
+        }
+
+
+chunk_cache = ChunkCache()
+
+
+def normalize_query(query: str):
+    # lowercased, punctuation and query_rag's stopwords dropped
+    return " ".join(tokenize(query))
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of finished answers. Keys should carry the corpus
+    version (see answer_key) so an ingest makes old entries unreachable;
+    clear() drops them eagerly as well.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 persist: bool = ANSWER_CACHE_PERSIST):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        if persist:
+            db.init_db()
+
+    def get(self, key: str):
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        if self.persist:
+            row = db.get_cached_answer(key)
+            if row and now - row[0] < self.ttl:
+                result = json.loads(row[1])
+                self._remember(key, result, row[0])
+                with self._lock:
+                    self.hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, result: dict):
+        if key is None:
+            return
+        created = time.time()
+        self._remember(key, result, created)
+        if self.persist:
+            db.put_cached_answer(key, json.dumps(result), created)
+
+    def _remember(self, key, result, created):
+        with self._lock:
+            self._entries[key] = (created, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.persist:
+            db.clear_answer_cache()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+def answer_key(corpus_version, query: str):
+    return f"{corpus_version}|{normalize_query(query)}"
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,256 @@
+# app/chunker.py
+import itertools
+import os
+import re
+
+# ---------------- CONFIG ----------------
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1500"))
+# neighbours share whole trailing sentences, up to this many chars (the old
+# splitter repeated up to 300 chars of every chunk in the next one)
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "150"))
+
+# boilerplate: short lines (headers, footers, page numbers) at the top or
+# bottom of at least half of the first BOILERPLATE_SAMPLE pages of a document
+BOILERPLATE_SAMPLE = int(os.getenv("BOILERPLATE_SAMPLE", "12"))
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MAX_LEN = 120
+PAGE_NUMBER_WORDS = 3  # lines with at most this many words match whatever their numbers
+EDGE_LINES = 3  # only the top and bottom lines of a page are looked at
+
+# near-duplicates: Jaccard similarity of the chunks' sentence sets, so a
+# reprinted page or a copy with a sentence or two edited is skipped
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# a chunk is only compared with those sharing a sentence among their first
+# DEDUP_HEAD chars; the rest is hashed only then
+DEDUP_HEAD = 300
+
+# a sentence ends at . ? or ! (and closing quotes/brackets) followed by a
+# space or newline; a blank line ends a paragraph. Cuts are found with
+# str.rfind/find on these few chars, which beats a regex pass over every char
+SENTENCE_MARKS = ".?!"
+CLOSERS = "\"')]"
+PARAGRAPH = "\n\n"
+DIGITS_RE = re.compile(r"\d+")
+
+
+# ---------------- SPLITTING ----------------
+def _sentence_end(text: str, pos: int, hi: int):
+    # end offset of the sentence whose mark is at `pos`, or -1 if it's not one ("3.5")
+    end = pos + 1
+    while end < hi and text[end] in CLOSERS:
+        end += 1
+    return end if end < hi and text[end] in " \n" else -1
+
+
+def _last_end(text: str, lo: int, hi: int):
+    # end offset of the last sentence in text[lo:hi] followed by whitespace inside it, or -1
+    best = -1
+    for mark in SENTENCE_MARKS:
+        pos = text.rfind(mark, lo, hi)
+        while pos >= lo and pos >= best:
+            end = _sentence_end(text, pos, hi)
+            if end >= 0:
+                best = max(best, end)
+                break
+            pos = text.rfind(mark, lo, pos)
+    return best
+
+
+def _first_end(text: str, lo: int, hi: int):
+    # end offset of the first sentence (or paragraph) ending inside text[lo:hi], or -1
+    best = text.find(PARAGRAPH, lo, hi)
+    for mark in SENTENCE_MARKS:
+        pos = text.find(mark, lo, best if best >= 0 else hi)
+        while pos >= 0:
+            end = _sentence_end(text, pos, hi + 1)
+            if end >= 0:
+                best = end if best < 0 else min(best, end)
+                break
+            pos = text.find(mark, pos + 1, best if best >= 0 else hi)
+    return best
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+    """
+    Cuts text into chunks of at most `size` chars at a paragraph break in
+    the second half of the window, else at the last sentence end, else at
+    the last space. Each chunk starts with the last sentences of the
+    previous one, as long as they fit in `overlap` chars.
+
+    The loop runs per chunk: every cut is a handful of C-level rfind/find
+    calls, nothing walks the text char by char in Python.
+    """
+    text = text.strip()
+    chunks, start, n = [], 0, len(text)
+    while start < n:
+        if n - start <= size:
+            chunks.append(text[start:].strip())
+            break
+        hi = start + size
+        cut = text.rfind(PARAGRAPH, start + size // 2, hi)
+        if cut < 0:
+            # the space after may sit just past the window; most sentences end
+            # in its last half, so look there before scanning all of it
+            cut = _last_end(text, hi - size // 2, hi + 1)
+            cut = cut if cut >= 0 else _last_end(text, start, hi + 1)
+        if cut <= start:
+            # no sentence end in the window (tables, lists without full stops)
+            cut = max(text.rfind(" ", start, hi), text.rfind("\n", start, hi))
+            cut = cut if cut > start + size // 2 else hi
+            chunks.append(text[start:cut].strip())
+            start = cut
+            continue
+        chunks.append(text[start:cut].strip())
+        # the next chunk starts after the first sentence end within `overlap` of the cut
+        carry = _first_end(text, max(start + 1, cut - overlap), cut)
+        start = carry if carry > start else cut
+    return [c for c in chunks if c]
+
+
+# ---------------- BOILERPLATE ----------------
+def _line_key(line: str):
+    key = line.strip().lower()
+    if "  " in key or "\t" in key:
+        key = " ".join(key.split())
+    # "Page 3 of 40" and "Page 4 of 40" are the same footer; numbered body
+    # lines ("Step 3: open valve 3") have more words and stay distinct
+    if key.count(" ") <= 2 * PAGE_NUMBER_WORDS + 1 and DIGITS_RE.search(key):
+        if sum(not w.isdigit() for w in key.split(" ")) <= PAGE_NUMBER_WORDS:
+            return DIGITS_RE.sub("#", key)
+    return key
+
+
+def _edge_lines(text: str):
+    lines = text.strip().split("\n")
+    return lines[:EDGE_LINES] + lines[max(EDGE_LINES, len(lines) - EDGE_LINES):]
+
+
+def find_boilerplate(pages):
+    """Keys of short top/bottom lines that repeat on at least half of `pages` (texts); empty for short documents."""
+    if len(pages) < BOILERPLATE_MIN_PAGES:
+        return set()
+    counts = {}
+    for text in pages:
+        keys = {_line_key(line) for line in _edge_lines(text) if 0 < len(line.strip()) <= BOILERPLATE_MAX_LEN}
+        for key in keys:
+            counts[key] = counts.get(key, 0) + 1
+    needed = max(BOILERPLATE_MIN_PAGES, (len(pages) + 1) // 2)
+    return {key for key, n in counts.items() if n >= needed}
+
+
+def _matcher(boilerplate):
+    # a line much longer than every key can't be one; the running header is
+    # the same string on every page, so answers are memoized per document
+    longest = 2 * max(map(len, boilerplate), default=0) + 8
+    memo = {}
+
+    def is_boilerplate(line: str):
+        hit = memo.get(line)
+        if hit is None:
+            hit = memo[line] = len(line) <= longest and _line_key(line) in boilerplate
+        return hit
+
+    return is_boilerplate
+
+
+def strip_lines(text: str, is_boilerplate):
+    """Drops boilerplate lines from the top and bottom EDGE_LINES of a page."""
+    # walk in from both ends with find/rfind: the page body is never split or copied twice
+    text = text.strip()
+    start, end = 0, len(text)
+    for _ in range(EDGE_LINES):
+        nl = text.find("\n", start, end)
+        nl = end if nl < 0 else nl
+        if start >= end or not is_boilerplate(text[start:nl]):
+            break
+        start = nl + 1
+    for _ in range(EDGE_LINES):
+        nl = text.rfind("\n", start, end)
+        if start >= end or not is_boilerplate(text[nl + 1 if nl >= 0 else start:end]):
+            break
+        end = max(nl, start)
+    return text[start:end] if (start, end) != (0, len(text)) else text
+
+
+def clean_pages(stream, sample: int = BOILERPLATE_SAMPLE):
+    """
+    Wraps a (file_idx, page, text) stream (see loader.iter_pages): learns
+    each document's headers/footers from its first `sample` pages, then
+    strips them from every page. Only `sample` pages are held at a time.
+    """
+    for file_idx, pages in itertools.groupby(stream, key=lambda item: item[0]):
+        head = list(itertools.islice(pages, sample))
+        boilerplate = find_boilerplate([text for _, _, text in head])
+        if not boilerplate:
+            yield from head
+            yield from pages
+            continue
+        is_boilerplate = _matcher(boilerplate)
+        for _, page, text in itertools.chain(head, pages):
+            yield file_idx, page, strip_lines(text, is_boilerplate)
+
+
+# ---------------- NEAR-DUPLICATES ----------------
+def shingles(text: str):
+    """Hashes of the text's sentences (Python's hash: only compare within a process)."""
+    parts = text.split(". ")
+    parts[-1] = parts[-1].rstrip(".")
+    return frozenset(map(hash, parts))
+
+
+def similarity(a, b):
+    """Jaccard similarity of two shingle sets."""
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+
+class Deduper:
+    """
+    Remembers the chunks kept so far; `seen(text)` is True for a repeat or
+    a near-duplicate of one of them (and doesn't remember it).
+
+    Most chunks are neither: they pay for hashing the text and the few
+    sentences in its first DEDUP_HEAD chars. Whole shingle sets are only
+    built for chunks whose head shares a sentence with a kept one, as
+    copies with a sentence or two edited do.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._exact = set()
+        self._texts = []
+        self._shingles = {}  # kept chunk -> shingles, built on its first collision
+        self._buckets = {}
+        self.skipped = 0
+
+    def _kept_shingles(self, i: int):
+        s = self._shingles.get(i)
+        if s is None:
+            s = self._shingles[i] = shingles(self._texts[i])
+        return s
+
+    def seen(self, text: str):
+        key = hash(text)
+        if key in self._exact:  # a reprinted page chunks the same way
+            self.skipped += 1
+            return True
+
+        head = text[:DEDUP_HEAD].split(". ")
+        if len(text) > DEDUP_HEAD and len(head) > 1:
+            head.pop()  # cut mid-sentence
+        else:
+            head[-1] = head[-1].rstrip(".")
+        bands = set(map(hash, head))
+        candidates = [self._buckets[h] for h in bands if h in self._buckets]
+        if candidates:
+            s = shingles(text)
+            ids = set().union(*candidates)
+            if any(similarity(s, self._kept_shingles(i)) >= self.threshold for i in ids):
+                self.skipped += 1
+                return True
+
+        for h in bands:
+            self._buckets.setdefault(h, []).append(len(self._texts))
+        self._texts.append(text)
+        self._exact.add(key)
+        return False
@@ -0,0 +1,144 @@
+# app/chunkstore.py
+import mmap
+import os
+import struct
+from array import array
+
+import numpy as np
+
+# chunks.dat   utf-8 bytes of every chunk, back to back
+# chunks.idx   uint64 end offset of chunk i (chunk i starts where i-1 ended)
+# chunks.meta  uint32 (doc, page) of chunk i: doc is the source's "doc"
+#              number in the manifest, page is 0-based
+# a compacted store writes a fresh set under a prefix ("c00012-chunks.dat"),
+# the manifest's "files" entry says which set is live
+DATA_FILE = "chunks.dat"
+INDEX_FILE = "chunks.idx"
+META_FILE = "chunks.meta"
+OFFSET = struct.Struct("=Q")  # same layout as array("Q")
+META = struct.Struct("=II")  # same layout as array("I") pairs
+# chunks stored before metadata existed (or added without a source)
+UNKNOWN_DOC = 0xFFFFFFFF
+
+
+def _map(path: str):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ChunkStore:
+    """
+    Read-only, mmapped view of the first `n_chunks` chunks.
+    Chunk i is two offset reads and one slice: O(1), no full read, and the
+    pages are shared with every other process that maps the same files.
+    """
+
+    def __init__(self, dir_path: str, n_chunks: int, prefix: str = ""):
+        self._data = _map(os.path.join(dir_path, prefix + DATA_FILE))
+        self._index = _map(os.path.join(dir_path, prefix + INDEX_FILE))
+
+        available = len(self._index) // OFFSET.size if self._index else 0
+        self.n_chunks = min(n_chunks, available)
+
+    def __len__(self):
+        return self.n_chunks
+
+    def _bounds(self, i: int):
+        start = OFFSET.unpack_from(self._index, (i - 1) * OFFSET.size)[0] if i else 0
+        end = OFFSET.unpack_from(self._index, i * OFFSET.size)[0]
+        return start, end
+
+    def get_bytes(self, i: int):
+        """Zero-copy memoryview of chunk i's utf-8 bytes."""
+        if not 0 <= i < self.n_chunks:
+            raise IndexError(i)
+        start, end = self._bounds(i)
+        return memoryview(self._data)[start:end]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.n_chunks))]
+        if i < 0:
+            i += self.n_chunks
+        return str(self.get_bytes(i), "utf-8")
+
+    def __iter__(self):
+        for i in range(self.n_chunks):
+            yield self[i]
+
+
+class ChunkWriter:
+    """
+    Streams chunks onto the end of the store, after the first
+    `n_committed`. Anything past that (left by an ingest that crashed
+    before its manifest was saved) is truncated first. Data is always
+    flushed before the offsets that point into it.
+    """
+
+    FLUSH_EVERY = 4096  # offsets buffered before they are written out
+
+    def __init__(self, dir_path: str, n_committed: int, prefix: str = ""):
+        self._index = open(os.path.join(dir_path, prefix + INDEX_FILE), "a+b")
+        self._index.truncate(n_committed * OFFSET.size)
+
+        # stores older than chunks.meta get "unknown" rows for what they hold
+        self._meta = open(os.path.join(dir_path, prefix + META_FILE), "a+b")
+        have = min(os.fstat(self._meta.fileno()).st_size // META.size, n_committed)
+        self._meta.truncate(have * META.size)
+        self._meta.write(META.pack(UNKNOWN_DOC, 0) * (n_committed - have))
+
+        self.end = 0
+        if n_committed:
+            self._index.seek((n_committed - 1) * OFFSET.size)
+            self.end = OFFSET.unpack(self._index.read(OFFSET.size))[0]
+
+        self._data = open(os.path.join(dir_path, prefix + DATA_FILE), "a+b")
+        self._data.truncate(self.end)
+        self._pending = array("Q")
+        self._pending_meta = array("I")
+        self.n_chunks = n_committed
+
+    def add(self, text: str, doc: int = UNKNOWN_DOC, page: int = 0):
+        encoded = text.encode("utf-8")
+        self._data.write(encoded)
+        self.end += len(encoded)
+        self._pending.append(self.end)
+        self._pending_meta.extend((doc, page))
+        self.n_chunks += 1
+
+        if len(self._pending) >= self.FLUSH_EVERY:
+            self._flush()
+
+    def _flush(self):
+        self._data.flush()
+        self._pending.tofile(self._index)
+        self._pending_meta.tofile(self._meta)
+        self._pending = array("Q")
+        self._pending_meta = array("I")
+
+    def close(self):
+        self._flush()
+        for f in (self._data, self._index, self._meta):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+
+def read_meta(dir_path: str, n_chunks: int, prefix: str = ""):
+    """(n, 2) uint32 array of (doc, page) per chunk, mmapped; rows missing on disk read as unknown."""
+    path = os.path.join(dir_path, prefix + META_FILE)
+    have = min(os.path.getsize(path) // META.size if os.path.exists(path) else 0, n_chunks)
+    meta = np.memmap(path, dtype=np.uint32, mode="r", shape=(have, 2)) if have else np.zeros((0, 2), np.uint32)
+    if have < n_chunks:
+        missing = np.tile(np.array([UNKNOWN_DOC, 0], dtype=np.uint32), (n_chunks - have, 1))
+        meta = np.concatenate([meta, missing])
+    return meta
+
+
+def append_chunks(dir_path: str, n_committed: int, texts):
+    writer = ChunkWriter(dir_path, n_committed)
+    for text in texts:
+        writer.add(text)
+    writer.close()
@@ -0,0 +1,117 @@
+# app/context.py
+import os
+import re
+
+from app.chunker import CHUNK_OVERLAP
+
+# ---------------- CONFIG ----------------
+# LLM input budget for the retrieved context (the prompt template is extra)
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", "2000"))
+# chunks repeat up to CHUNK_OVERLAP chars of their predecessor (stores built
+# with the old splitter up to 300); look a bit further
+MAX_OVERLAP = max(400, CHUNK_OVERLAP + 100)
+# shorter shared text is coincidence ("the", ". "), not chunk overlap
+MIN_OVERLAP = 20
+
+# words and single punctuation marks: close to what BPE tokenizers produce
+# for English prose, without shipping a tokenizer
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str):
+    return len(TOKEN_RE.findall(text))
+
+
+def truncate_tokens(text: str, budget: int):
+    """Cuts `text` after `budget` tokens, at the last sentence end if there is one."""
+    if budget <= 0:
+        return ""
+    match = None
+    for i, match in enumerate(TOKEN_RE.finditer(text)):
+        if i == budget - 1:
+            break
+    cut = text[:match.end()] if match else text
+    sentence_end = cut.rfind(". ")
+    return cut[:sentence_end + 1] if sentence_end > len(cut) // 2 else cut
+
+
+def overlap(a: str, b: str):
+    """Length of the longest suffix of `a` that `b` starts with (0 if shorter than MIN_OVERLAP)."""
+    for k in range(min(len(a), len(b), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:k]):
+            return k
+    return 0
+
+
+def pack(hits, chunks, budget: int = CONTEXT_TOKENS, related=None):
+    """
+    Fills a token budget from retrieval hits, best first.
+
+    Each hit brings its neighbours (idx+1, idx-1) right after it, like the
+    old fixed-size cut, but a chunk that doesn't fit is skipped rather than
+    cut mid-sentence and smaller ones further down can still get in.
+    Adjacent selected chunks are merged into one passage with the
+    chunker's overlap removed, and the overlap isn't charged to the budget,
+    whichever of the two was selected first.
+    `related(i, j)`, if given, says whether neighbour j may join chunk i
+    (e.g. same document, inside the query's filters).
+
+    Returns {"text", "passages", "groups" (chunk ids per passage), "ids",
+    "tokens", "budget"}.
+    """
+    n = len(chunks)
+    related = related or (lambda i, j: True)
+    order = []
+    for _, idx in hits:
+        order.append(idx)
+        order.extend(j for j in (idx + 1, idx - 1) if 0 <= j < n and related(idx, j))
+
+    rank, used, texts = {}, 0, {}
+    for i in order:
+        if i in rank:
+            continue
+
+        # text this chunk adds next to already selected neighbours: the
+        # head its predecessor ends with, the tail its successor starts with
+        text = chunks[i]
+        start, end = 0, len(text)
+        if i - 1 in rank and related(i - 1, i):
+            start = overlap(chunks[i - 1], text)
+        if i + 1 in rank and related(i, i + 1):
+            end = max(start, end - overlap(text, chunks[i + 1]))
+        cost = count_tokens(text[start:end])
+
+        if used + cost <= budget:
+            rank[i] = len(rank)
+            used += cost
+        elif not rank:
+            # the best chunk alone is too big: keep its head
+            texts[i] = truncate_tokens(chunks[i], budget)
+            rank[i] = 0
+            break
+
+    # runs of consecutive ids become one passage, ordered by their best member
+    runs = []
+    for i in sorted(rank):
+        text = texts.get(i, chunks[i])
+        if runs and runs[-1]["ids"][-1] == i - 1 and related(i - 1, i):
+            # no shared text (a cut without a sentence end nearby): the
+            # chunks still continue each other
+            shared = overlap(runs[-1]["text"], text)
+            runs[-1]["text"] += text[shared:] if shared else " " + text
+            runs[-1]["ids"].append(i)
+            runs[-1]["rank"] = min(runs[-1]["rank"], rank[i])
+        else:
+            runs.append({"text": text, "ids": [i], "rank": rank[i]})
+    runs.sort(key=lambda r: r["rank"])
+
+    passages = [r["text"] for r in runs]
+    text = "\n\n".join(passages)
+    return {
+        "text": text,
+        "passages": passages,
+        "groups": [r["ids"] for r in runs],
+        "ids": [i for r in runs for i in r["ids"]],
+        "tokens": count_tokens(text),
+        "budget": budget,
+    }
@@ -1,54 +1,303 @@
 # app/db.py
-import sqlite3
+import json
+import logging
 import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from app.metrics import log
 
 DB_PATH = os.path.join("data", "metadata.db")
 DATA_DIR = "data"
 
+# ---------------- CONNECTION POOL ----------------
+# connections kept open per database file; WAL lets readers run while one
+# writer commits, busy_timeout makes writers wait instead of failing
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5"))
+# default page size for get_all_documents
+DOCUMENTS_PAGE = int(os.getenv("DOCUMENTS_PAGE", "100"))
+# finished jobs older than this are dropped from the shared jobs table
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(24 * 3600)))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # safe with WAL, one fsync per checkpoint
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",  # 8MB page cache per connection
+    f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}",
+)
+
+
+class Pool:
+    """
+    Fixed-size pool of connections to one database file. A connection is
+    only used by one thread at a time (check_same_thread is off so it can
+    move between threads). Callers block when all are checked out.
+    """
+
+    def __init__(self, path: str, size: int = DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get()
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str = None):
+    # keyed by path so tests (and benchmarks) can point DB_PATH elsewhere
+    path = path or DB_PATH
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = Pool(path)
+        return _pools[path]
+
+
+@contextmanager
+def connection():
+    """Pooled connection; commits on success, rolls back on error."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+
+# ---------------- SCHEMA ----------------
+_initialized = set()
+
 def init_db():
     # Make sure the data directory exists
     os.makedirs(DATA_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    # Simple table to just keep track of filenames
+    with connection() as conn:
+        cursor = conn.cursor()
+        # Simple table to just keep track of filenames, per collection
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                filename TEXT NOT NULL,
+                collection TEXT NOT NULL DEFAULT 'default',
+                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (collection, filename)
+            )
+        """)
+        _add_collection_column(cursor)
+        # per-collection listing, newest first, without a sort
+        cursor.execute("CREATE INDEX IF NOT EXISTS documents_collection_id ON documents (collection, id)")
+        # Finished answers, keyed on corpus version + normalized query
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS answer_cache (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        # Job status shared between server processes (see jobs.JOBS_SHARED)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                job TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+    _initialized.add(DB_PATH)
+
+def ensure_db():
+    # init_db once per database file per process
+    if DB_PATH not in _initialized:
+        init_db()
+
+def _add_collection_column(cursor):
+    # Older databases have documents(filename UNIQUE) without a collection;
+    # SQLite can't change a constraint in place, so copy into a new table
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(documents)")]
+    if "collection" in columns:
+        return
+    cursor.execute("ALTER TABLE documents RENAME TO documents_old")
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS documents (
+        CREATE TABLE documents (
             id INTEGER PRIMARY KEY,
-            filename TEXT NOT NULL UNIQUE,
-            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            filename TEXT NOT NULL,
+            collection TEXT NOT NULL DEFAULT 'default',
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (collection, filename)
         )
     """)
-    conn.commit()
-    conn.close()
-
-def add_document(filename: str):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    # Using 'OR IGNORE' is a simple way to avoid errors on duplicates
-    cursor.execute("INSERT OR IGNORE INTO documents (filename) VALUES (?)", (filename,))
-    conn.commit()
-    conn.close()
-
-def get_all_documents():
+    cursor.execute("""
+        INSERT INTO documents (id, filename, uploaded_at)
+        SELECT id, filename, uploaded_at FROM documents_old
+    """)
+    cursor.execute("DROP TABLE documents_old")
+
+
+# ---------------- DOCUMENTS ----------------
+def add_documents(filenames, collection: str = "default"):
+    """Records a batch of documents in one transaction; returns {filename: id}."""
+    filenames = list(dict.fromkeys(filenames))
+    if not filenames:
+        return {}
+    with connection() as conn:
+        # Using 'OR IGNORE' is a simple way to avoid errors on duplicates
+        conn.executemany(
+            "INSERT OR IGNORE INTO documents (filename, collection) VALUES (?, ?)",
+            [(name, collection) for name in filenames],
+        )
+        ids = {}
+        # stay under SQLite's bound-parameter limit
+        for start in range(0, len(filenames), 500):
+            batch = filenames[start:start + 500]
+            rows = conn.execute(
+                f"SELECT filename, id FROM documents WHERE collection = ? AND filename IN ({','.join('?' * len(batch))})",
+                [collection, *batch],
+            )
+            ids.update(rows)
+    return ids
+
+def add_document(filename: str, collection: str = "default"):
+    """Records a document (once per collection) and returns its id."""
+    return add_documents([filename], collection)[filename]
+
+def get_document(doc_id: int):
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT id, filename, collection, uploaded_at FROM documents WHERE id = ?", (doc_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(("id", "filename", "collection", "uploaded_at"), row))
+
+def delete_document(doc_id: int):
+    with connection() as conn:
+        conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+def get_all_documents(collection: str = None, limit: int = DOCUMENTS_PAGE, before_id: int = None):
     """
-    Fetches all document records from the database.
+    Fetches document records from the database, newest first: at most
+    `limit` of them (None for all), only ids below `before_id` (pass the
+    last id of the previous page), only one collection's if given.
     Returns a tuple: (list_of_documents, error_message).
     On success, error_message is None.
     On failure, list_of_documents is an empty list.
     """
+    where, params = [], []
+    if collection is not None:
+        where.append("collection = ?")
+        params.append(collection)
+    if before_id is not None:
+        where.append("id < ?")
+        params.append(before_id)
+
+    sql = "SELECT id, filename, collection, uploaded_at FROM documents"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, filename, uploaded_at FROM documents ORDER BY id DESC")
-        docs = cursor.fetchall()
-        conn.close()
+        with connection() as conn:
+            conn.row_factory = sqlite3.Row
+            try:
+                docs = conn.execute(sql, params).fetchall()
+            finally:
+                conn.row_factory = None
         return [dict(row) for row in docs], None
     except Exception as e:
-        print(f"Database error in get_all_documents: {e}")
+        log("db_error", logging.ERROR, op="get_all_documents", error=str(e))
         return [], str(e)
 
 
- 
-    
+# ---------------- ANSWER CACHE ----------------
+def get_cached_answer(key: str):
+    """Returns (created_at, result_json) or None."""
+    try:
+        with connection() as conn:
+            return conn.execute("SELECT created_at, result FROM answer_cache WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error as e:
+        log("db_error", logging.ERROR, op="get_cached_answer", error=str(e))
+        return None
+
+def put_cached_answer(key: str, result: str, created_at: float):
+    try:
+        with connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answer_cache (key, result, created_at) VALUES (?, ?, ?)",
+                (key, result, created_at),
+            )
+    except sqlite3.Error as e:
+        log("db_error", logging.ERROR, op="put_cached_answer", error=str(e))
 
+def clear_answer_cache():
+    try:
+        with connection() as conn:
+            conn.execute("DELETE FROM answer_cache")
+    except sqlite3.Error as e:
+        log("db_error", logging.ERROR, op="clear_answer_cache", error=str(e))
+
+
+# ---------------- JOBS ----------------
+def save_job(job: dict):
+    now = time.time()
+    try:
+        with connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, job, updated_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), now),
+            )
+            if job["status"] in ("done", "failed"):
+                conn.execute("DELETE FROM jobs WHERE updated_at < ?", (now - JOB_RETENTION,))
+    except sqlite3.Error as e:
+        log("db_error", logging.ERROR, op="save_job", error=str(e))
+
+def get_job(job_id: str):
+    try:
+        with connection() as conn:
+            row = conn.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    except sqlite3.Error as e:
+        log("db_error", logging.ERROR, op="get_job", error=str(e))
+        return None
+    return json.loads(row[0]) if row else None
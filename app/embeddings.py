@@ -0,0 +1,103 @@
+# app/embeddings.py
+import os
+import zlib
+
+import numpy as np
+
+from app.index import tokenize
+
+# ---------------- CONFIG ----------------
+# "hashing" (offline, deterministic), "sentence-transformers", or "none" to skip vectors
+EMBEDDER = os.getenv("EMBEDDER", "hashing")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "64"))
+
+
+class Embedder:
+    """Maps texts to L2-normalised float32 rows; `name` and `dim` identify the space."""
+
+    name = "base"
+    dim = 0
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder(Embedder):
+    """
+    Feature hashing of unigrams and bigrams into `dim` signed buckets.
+    No model, no network, same output in every process (crc32, not
+    hash()), so tests and offline runs get a real vector space.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        rows, cols, vals = [], [], []
+
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                cols.append(h % self.dim)
+                vals.append(1.0 if h & 0x80000000 else -1.0)
+
+        flat = np.array(rows, dtype=np.int64) * self.dim + np.array(cols, dtype=np.int64)
+        matrix = np.bincount(flat, weights=vals, minlength=len(texts) * self.dim)
+        return normalize(matrix.reshape(len(texts), self.dim))
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """CPU sentence-transformers model, loaded on first use (optional dependency)."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, batch_size: int = EMBED_BATCH):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "EMBEDDER=sentence-transformers needs `pip install sentence-transformers`"
+                ) from e
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    @property
+    def dim(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+def get_embedder(kind: str = EMBEDDER):
+    if kind == "none":
+        return None
+    if kind == "hashing":
+        return HashingEmbedder()
+    if kind == "sentence-transformers":
+        return SentenceTransformerEmbedder()
+    raise ValueError(f"Unknown EMBEDDER {kind!r}")
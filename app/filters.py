@@ -0,0 +1,98 @@
+# app/filters.py
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.chunkstore import UNKNOWN_DOC
+
+# {"filename": "a.pdf" | [...], "doc_id": 3 | [...], "page_from": 1, "page_to": 5,
+#  "uploaded_after": "2024-01-01", "uploaded_before": "2024-02-01T12:00:00"}
+# pages are 1-based and inclusive; dates are ISO 8601 (UTC unless they say otherwise)
+FILTER_KEYS = ("filename", "doc_id", "page_from", "page_to", "uploaded_after", "uploaded_before")
+DOC_KEYS = ("filename", "doc_id", "uploaded_after", "uploaded_before")
+
+
+def _timestamp(value):
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"not an ISO 8601 date: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _list_of(value, kind, key):
+    values = value if isinstance(value, list) else [value]
+    if not values or not all(isinstance(v, kind) and not isinstance(v, bool) for v in values):
+        raise ValueError(f"{key} must be a {kind.__name__} or a list of them")
+    return values
+
+
+def parse_filters(raw):
+    """Validates a query's "filters" object; returns a normalised dict, or None for no filters."""
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object")
+
+    unknown = set(raw) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"unknown filters {sorted(unknown)}, expected some of {list(FILTER_KEYS)}")
+
+    out = {}
+    if "filename" in raw:
+        out["filename"] = _list_of(raw["filename"], str, "filename")
+    if "doc_id" in raw:
+        out["doc_id"] = _list_of(raw["doc_id"], int, "doc_id")
+    for key in ("page_from", "page_to"):
+        if key in raw:
+            if not isinstance(raw[key], int) or isinstance(raw[key], bool) or raw[key] < 1:
+                raise ValueError(f"{key} must be a page number >= 1")
+            out[key] = raw[key]
+    for key in ("uploaded_after", "uploaded_before"):
+        if key in raw:
+            out[key] = _timestamp(raw[key])
+    return out
+
+
+def _doc_matches(source: dict, filters: dict):
+    if "filename" in filters and source.get("filename") not in filters["filename"]:
+        return False
+    if "doc_id" in filters and source.get("doc_id") not in filters["doc_id"]:
+        return False
+    uploaded = source.get("uploaded_at")
+    if "uploaded_after" in filters and (uploaded is None or uploaded < filters["uploaded_after"]):
+        return False
+    if "uploaded_before" in filters and (uploaded is None or uploaded > filters["uploaded_before"]):
+        return False
+    return True
+
+
+def chunk_mask(meta, manifest: dict, filters: dict):
+    """
+    Bool mask over chunk ids that pass `filters`: document filters pick a
+    set of doc numbers from the manifest, then chunks are kept by a
+    vectorised lookup of their doc and page in chunks.meta.
+    """
+    docs, pages = meta[:, 0], meta[:, 1]
+    mask = np.ones(len(meta), dtype=bool)
+
+    if any(key in filters for key in DOC_KEYS):
+        numbered = [s for s in manifest["sources"].values() if "doc" in s]
+        wanted = np.zeros(max((s["doc"] for s in numbered), default=-1) + 2, dtype=bool)
+        for source in numbered:
+            wanted[source["doc"]] = _doc_matches(source, filters)
+        # unknown docs (and any number past the table) land on the last, False slot
+        mask &= wanted[np.where((docs == UNKNOWN_DOC) | (docs >= len(wanted) - 1), len(wanted) - 1, docs)]
+
+    if "page_from" in filters:
+        mask &= pages >= filters["page_from"] - 1
+    if "page_to" in filters:
+        mask &= pages <= filters["page_to"] - 1
+    return mask
+
+
+def doc_table(manifest: dict):
+    """doc number → source entry, for turning chunks.meta rows into references."""
+    return {s["doc"]: s for s in manifest["sources"].values() if "doc" in s}
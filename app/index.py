@@ -0,0 +1,150 @@
+# app/index.py
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+from array import array
+from collections import Counter
+
+# same stopwords query_rag has always dropped
+STOPWORDS = {"what", "is", "the", "of", "in", "a", "an"}
+
+TOKEN_RE = re.compile(r"\w+")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+# ---------------- WRITE ----------------
+def write_segment(dir_path: str, name: str, texts):
+    """
+    Builds an inverted index over `texts` and writes it as one segment:
+      <name>.terms.json  term -> [doc_freq, offset, count] into the postings file
+      <name>.post        uint32 pairs (local_doc_id, term_freq), grouped by term
+      <name>.lens        uint32 document length per doc
+    Returns the segment metadata (name, number of docs, total length).
+    """
+    postings = {}
+    lens = array("I")
+
+    for doc_id, text in enumerate(texts):
+        tokens = tokenize(text)
+        lens.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    terms = {}
+    post = array("I")
+    for term in sorted(postings):
+        plist = postings[term]
+        terms[term] = [len(plist), len(post) // 2, len(plist)]
+        for doc_id, tf in plist:
+            post.append(doc_id)
+            post.append(tf)
+
+    base = os.path.join(dir_path, name)
+    with open(base + ".post", "wb") as f:
+        post.tofile(f)
+    with open(base + ".lens", "wb") as f:
+        lens.tofile(f)
+    with open(base + ".terms.json", "w", encoding="utf-8") as f:
+        json.dump(terms, f, separators=(",", ":"))
+
+    return {"name": name, "n_docs": len(lens), "total_len": sum(lens)}
+
+
+# ---------------- READ ----------------
+class Segment:
+    """Read-only view of one segment; postings are mmapped, not loaded."""
+
+    def __init__(self, dir_path: str, meta: dict, doc_base: int = 0):
+        base = os.path.join(dir_path, meta["name"])
+        self.name = meta["name"]
+        self.n_docs = meta["n_docs"]
+        self.total_len = meta["total_len"]
+        self.doc_base = doc_base
+
+        with open(base + ".terms.json", "r", encoding="utf-8") as f:
+            self.terms = json.load(f)
+
+        self.lens = array("I")
+        with open(base + ".lens", "rb") as f:
+            self.lens.frombytes(f.read())
+
+        self._post_file = open(base + ".post", "rb")
+        size = os.fstat(self._post_file.fileno()).st_size
+        self._post = (
+            memoryview(mmap.mmap(self._post_file.fileno(), 0, access=mmap.ACCESS_READ)).cast("I")
+            if size else memoryview(array("I"))
+        )
+
+    def doc_freq(self, term: str):
+        entry = self.terms.get(term)
+        return entry[0] if entry else 0
+
+    def postings(self, term: str):
+        entry = self.terms.get(term)
+        if not entry:
+            return
+        _, offset, count = entry
+        post = self._post
+        for i in range(offset * 2, (offset + count) * 2, 2):
+            yield post[i], post[i + 1]
+
+
+def bm25_search(segments, query: str, k: int = 4, allowed=None):
+    """
+    Returns the top-k (score, global_doc_id) pairs for `query`.
+    Only the posting lists of the query terms are read. If `allowed` is
+    given (truthy at allowed global ids, e.g. bytes of a bool mask) other
+    documents are skipped before they are scored.
+    """
+    return bm25_search_many(segments, [query], k, allowed)[0]
+
+
+def bm25_search_many(segments, queries, k: int = 4, allowed=None):
+    """
+    bm25_search for several queries at once: each posting list is read
+    and scored once, and the score added for every query with that term.
+    """
+    owners = {}  # term → score dicts of the queries that have it
+    results = [{} for _ in queries]
+    for query, scores in zip(queries, results):
+        for term in dict.fromkeys(tokenize(query)):
+            owners.setdefault(term, []).append(scores)
+
+    n_docs = sum(s.n_docs for s in segments)
+    if not owners or not n_docs:
+        return [[] for _ in queries]
+
+    avgdl = (sum(s.total_len for s in segments) / n_docs) or 1.0
+
+    for term, wanting in owners.items():
+        df = sum(s.doc_freq(term) for s in segments)
+        if not df:
+            continue
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        for seg in segments:
+            lens = seg.lens
+            for doc_id, tf in seg.postings(term):
+                gid = seg.doc_base + doc_id
+                if allowed is not None and not allowed[gid]:
+                    continue
+                norm = K1 * (1 - B + B * lens[doc_id] / avgdl)
+                score = idf * tf * (K1 + 1) / (tf + norm)
+                for scores in wanting:
+                    scores[gid] = scores.get(gid, 0.0) + score
+
+    out = []
+    for scores in results:
+        top = heapq.nlargest(k, scores.items(), key=lambda x: (x[1], -x[0]))
+        out.append([(score, gid) for gid, score in top])
+    return out
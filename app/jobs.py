@@ -0,0 +1,114 @@
+# app/jobs.py
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+
+# ---------------- CONFIG ----------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "100"))
+MAX_FINISHED_JOBS = 1000  # oldest finished jobs are forgotten past this
+# with several server processes a /jobs poll can land on another worker than
+# the one running the job, so job state is mirrored into the metadata DB
+# (on by default when uvicorn runs more than one worker: it takes the worker
+# count from WEB_CONCURRENCY, so pass that instead of --workers)
+JOBS_SHARED = os.getenv("JOBS_SHARED", "1" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 else "0") == "1"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Runs ingestion jobs on a bounded thread pool so request handlers
+    return immediately. Each job is a dict the worker updates in place
+    through the `progress` callback it is handed.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = MAX_PENDING_JOBS, shared: bool = JOBS_SHARED):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self.max_pending = max_pending
+        self.shared = shared
+
+    def _pending(self):
+        return sum(1 for j in self._jobs.values() if j["status"] in ("queued", "running"))
+
+    def submit(self, fn, files):
+        """Queues `fn(files, progress=...)` and returns the job id."""
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "files": [os.path.basename(f) for f in files],
+            "pages": 0,
+            "chunks": 0,
+            "report": [],
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "duration": None,
+        }
+
+        with self._lock:
+            if self._pending() >= self.max_pending:
+                raise QueueFull(f"{self.max_pending} ingestion jobs already pending")
+            self._jobs[job_id] = job
+            self._forget_old()
+
+        self._publish(job)
+        self._pool.submit(self._run, job, fn, files)
+        return job_id
+
+    def _publish(self, job):
+        if self.shared:
+            with self._lock:
+                snapshot = dict(job)
+            db.ensure_db()
+            db.save_job(snapshot)
+
+    def _run(self, job, fn, files):
+        def progress(**fields):
+            with self._lock:
+                job.update(fields)
+            self._publish(job)
+
+        def timing():
+            finished = time.time()
+            return {"finished_at": finished, "duration": round(finished - job["started_at"], 3)}
+
+        progress(status="running", started_at=time.time())
+        # the terminal status and its timing land in one update: a poller
+        # never sees "done" without finished_at
+        try:
+            report = fn(files, progress=progress)
+        except Exception as e:
+            progress(status="failed", error=str(e), **timing())
+        else:
+            progress(status="done", report=report or [], **timing())
+
+    def _forget_old(self):
+        finished = [k for k, j in self._jobs.items() if j["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        # queued on another worker process
+        if self.shared:
+            db.ensure_db()
+            return db.get_job(job_id)
+        return None
+
+
+jobs = JobQueue()
@@ -0,0 +1,142 @@
+# app/llm.py
+import asyncio
+import os
+import random
+import time
+import weakref
+
+# ---------------- CONFIG ----------------
+# "groq" for the real model, "fake" for offline tests and load tests
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "0.5"))
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.2"))
+FAKE_LLM_TOKEN_DELAY = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.01"))
+
+
+class FakeResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeLLM:
+    """
+    Stands in for ChatGroq offline: waits `latency` seconds, echoes the
+    question. When streaming, the first token comes after `latency` and
+    every further one after `token_delay`.
+    """
+
+    def __init__(self, latency: float = FAKE_LLM_LATENCY, token_delay: float = FAKE_LLM_TOKEN_DELAY):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def _answer(self, prompt: str):
+        self.calls += 1
+        question = prompt.rsplit("Question:", 1)[-1].split("Answer:", 1)[0].strip()
+        return f"Stub answer to: {question}"
+
+    def invoke(self, prompt: str):
+        time.sleep(self.latency)
+        return FakeResponse(self._answer(prompt))
+
+    async def ainvoke(self, prompt: str):
+        await asyncio.sleep(self.latency)
+        return FakeResponse(self._answer(prompt))
+
+    def _tokens(self, prompt: str):
+        words = self._answer(prompt).split(" ")
+        return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+    def stream(self, prompt: str):
+        time.sleep(self.latency)
+        for i, token in enumerate(self._tokens(prompt)):
+            if i:
+                time.sleep(self.token_delay)
+            yield FakeResponse(token)
+
+    async def astream(self, prompt: str):
+        await asyncio.sleep(self.latency)
+        for i, token in enumerate(self._tokens(prompt)):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield FakeResponse(token)
+
+
+def build_llm():
+    if LLM_PROVIDER == "fake":
+        return FakeLLM()
+
+    from langchain_groq import ChatGroq
+
+    # one client per process: its async HTTP client keeps a connection
+    # pool. Retries are done in agenerate so rate limits get backoff.
+    return ChatGroq(
+        model=LLM_MODEL,
+        temperature=0,
+        timeout=LLM_TIMEOUT,
+        max_retries=0,
+    )
+
+
+# ---------------- ASYNC CALLS ----------------
+# one semaphore per event loop (asyncio primitives can't cross loops)
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _semaphore():
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphores[loop]
+
+
+def is_rate_limit(error: Exception):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+async def agenerate(llm, prompt: str, timeout: float = LLM_TIMEOUT, retries: int = LLM_MAX_RETRIES):
+    """
+    Awaits `llm.ainvoke(prompt)` with at most LLM_MAX_CONCURRENCY calls in
+    flight, a per-call timeout, and exponential backoff with jitter on
+    rate-limit errors. Other errors are raised straight away.
+    """
+    for attempt in range(retries + 1):
+        try:
+            async with _semaphore():
+                return await asyncio.wait_for(llm.ainvoke(prompt), timeout)
+        except Exception as e:
+            if attempt == retries or not is_rate_limit(e):
+                raise
+            await asyncio.sleep(LLM_BACKOFF * 2 ** attempt * (1 + random.random()))
+
+
+async def astream_tokens(llm, prompt: str, timeout: float = LLM_TIMEOUT, retries: int = LLM_MAX_RETRIES):
+    """
+    Yields the answer text piece by piece as `llm.astream` produces it,
+    under the same concurrency cap. `timeout` bounds the wait for each
+    piece, not the whole answer. Rate limits are retried only before the
+    first piece has gone out.
+    """
+    for attempt in range(retries + 1):
+        started = False
+        try:
+            async with _semaphore():
+                stream = llm.astream(prompt).__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        return
+                    if chunk.content:
+                        started = True
+                        yield chunk.content
+        except Exception as e:
+            if started or attempt == retries or not is_rate_limit(e):
+                raise
+            await asyncio.sleep(LLM_BACKOFF * 2 ** attempt * (1 + random.random()))
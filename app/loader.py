@@ -0,0 +1,185 @@
+# app/loader.py
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------------- CONFIG ----------------
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+# big PDFs are cut into tasks of this many pages so one file can use several cores
+PAGES_PER_TASK = int(os.getenv("PAGES_PER_TASK", "20"))
+
+
+# ---------------- WORKER ----------------
+def pdf_reader(path: str):
+    # pypdf is imported on first parse, not when the API starts
+    from pypdf import PdfReader
+
+    return PdfReader(path)
+
+
+# top-level so the process pool can pickle it; returns plain tuples, not Documents
+def extract_pages(path: str, start: int, stop: int):
+    started = time.perf_counter()
+    reader = pdf_reader(path)
+    pages = [(i, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+    return pages, time.perf_counter() - started
+
+
+def _plan(path: str):
+    n_pages = len(pdf_reader(path).pages)
+    return [(start, min(start + PAGES_PER_TASK, n_pages)) for start in range(0, n_pages, PAGES_PER_TASK)]
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# ---------------- LOAD ----------------
+def new_report(paths):
+    return [{"file": os.path.basename(p), "pages": 0, "seconds": 0.0, "error": None, "cached": False} for p in paths]
+
+
+def iter_pages(paths, report, workers: int = None, digests=None, cache=None):
+    """
+    Yields (file_index, page_number, text), every file's pages together
+    and in order. With a `cache` (pagecache.PageCache) and the files'
+    content `digests`, files extracted before come first, straight from
+    the cache (their report entry gets "cached": True); the rest are
+    parsed as in parse_pages, streamed into a cache file as they come and
+    kept once the file is fully parsed without error.
+    """
+    todo = list(range(len(paths)))
+    if cache is not None and digests is not None:
+        todo = []
+        for file_idx, digest in enumerate(digests):
+            started = time.perf_counter()
+            pages = cache.get(digest)
+            if pages is None:
+                todo.append(file_idx)
+                continue
+            report[file_idx].update(pages=len(pages), seconds=round(time.perf_counter() - started, 4), cached=True)
+            for page, text in enumerate(pages):
+                yield file_idx, page, text
+
+    # the sub-report holds the same dicts, so parse_pages fills in `report`
+    current, writer = None, None
+
+    def store(file_idx):
+        entry = report[file_idx]
+        if not entry["error"] and writer.n_pages == entry["pages"]:
+            writer.commit(entry["seconds"])
+        else:
+            writer.abort()
+
+    try:
+        for sub_idx, page, text in parse_pages([paths[i] for i in todo], [report[i] for i in todo], workers):
+            file_idx = todo[sub_idx]
+            if cache is not None and digests is not None:
+                if file_idx != current:
+                    # the previous file's tasks have all been collected by now
+                    if writer is not None:
+                        store(current)
+                    current, writer = file_idx, cache.writer(digests[file_idx])
+                if writer is not None:
+                    writer.add(text)
+            yield file_idx, page, text
+
+        if writer is not None:
+            store(current)
+    finally:
+        if writer is not None:
+            writer.abort()  # the consumer stopped early: no half-written entries
+
+
+def parse_pages(paths, report, workers: int = None):
+    """
+    Yields (file_index, page_number, text) in (file, page) order while the
+    pool works ahead on at most `2 * workers` page-range tasks, so memory
+    stays bounded however many pages are queued. `report` (from
+    new_report) gets the page count, parse seconds and any error per file;
+    a failed file doesn't stop the others.
+    """
+    if not paths:
+        return
+    workers = workers or INGEST_WORKERS
+
+    def tasks():
+        for file_idx, path in enumerate(paths):
+            try:
+                ranges = _plan(path)
+            except Exception as e:
+                report[file_idx]["error"] = str(e)
+                continue
+            for start, stop in ranges:
+                yield file_idx, path, start, stop
+
+    def collect(file_idx, result):
+        entry = report[file_idx]
+        if isinstance(result, Exception):
+            entry["error"] = entry["error"] or str(result)
+            return []
+        file_pages, seconds = result
+        entry["pages"] += len(file_pages)
+        entry["seconds"] = round(entry["seconds"] + seconds, 4)
+        return file_pages
+
+    if workers <= 1:
+        for file_idx, path, start, stop in tasks():
+            try:
+                result = extract_pages(path, start, stop)
+            except Exception as e:
+                result = e
+            for page, text in collect(file_idx, result):
+                yield file_idx, page, text
+        return
+
+    window = deque()
+    pending = tasks()
+    # not fork: this runs inside the API process, next to the event loop and
+    # job threads, and a forked child can deadlock on a lock one of them held
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context()) as pool:
+        for task in pending:
+            window.append((task[0], pool.submit(extract_pages, *task[1:])))
+            if len(window) < 2 * workers:
+                continue
+            yield from _drain_one(window, collect)
+
+        while window:
+            yield from _drain_one(window, collect)
+
+
+def _drain_one(window, collect):
+    file_idx, future = window.popleft()
+    try:
+        result = future.result()
+    except Exception as e:
+        result = e
+    for page, text in collect(file_idx, result):
+        yield file_idx, page, text
+
+
+def load_pdfs(paths, workers: int = None):
+    """
+    Parses `paths` in parallel and returns (pages, report).
+
+    pages:  one list per path, in input order, of (page_number, text);
+            empty for a file that failed
+    report: one dict per path with the page count, parse seconds and the
+            error message if that file failed
+    """
+    report = new_report(paths)
+    pages = [[] for _ in paths]
+
+    for file_idx, page, text in iter_pages(paths, report, workers):
+        pages[file_idx].append((page, text))
+
+    for file_idx, entry in enumerate(report):
+        if entry["error"]:
+            pages[file_idx] = []
+            entry["pages"] = 0
+
+    return pages, report
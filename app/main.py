@@ -1,11 +1,41 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from typing import List
+import asyncio
 import os
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+
+from app.pipeline import (
+    RETRIEVERS, list_collections, page_cache, process_and_store_docs, aquery_rag, aquery_rag_stream, delete_document,
+    warm_up,
+)
+from app import db
+from app.store import COLLECTIONS_DIR, DEFAULT_COLLECTION, valid_collection
+from app.filters import parse_filters
+from app.cache import answer_cache, chunk_cache
+from app.jobs import QueueFull, jobs
+from app import metrics
+from app.profiler import profile_if_slow
+
+# heavy clients (LLM, PDF parser, embedding model) are built on first use;
+# WARMUP_ON_START=1 builds them in the background right after startup
+# instead, without delaying when the server starts accepting requests
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "0") == "1"
+
 
-from app.pipeline import process_and_store_docs, query_rag
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_START:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # ✅ CORS (IMPORTANT for Streamlit → Render communication)
 app.add_middleware(
@@ -16,10 +46,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------------- OBSERVABILITY ----------------
+@app.middleware("http")
+async def observe(request: Request, call_next):
+    # latency per route template (not raw path, so ids don't explode the
+    # label set); streamed responses count until their headers are sent
+    started = time.perf_counter()
+    with profile_if_slow(f"{request.method}-{request.url.path}"):
+        response = await call_next(request)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.request_seconds.observe(
+        time.perf_counter() - started, method=request.method, route=route, status=response.status_code
+    )
+    return response
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ✅ Upload folder
 UPLOAD_PATH = "data"
 os.makedirs(UPLOAD_PATH, exist_ok=True)
 
+# uploads are copied to disk in blocks of this size, never read whole
+UPLOAD_BLOCK = 1024 * 1024
+
 
 # ---------------- HEALTH CHECK (IMPORTANT) ----------------
 @app.get("/")
@@ -27,31 +80,172 @@ def home():
     return {"message": "API is running 🚀"}
 
 
+# ---------------- WARM-UP ----------------
+@app.get("/warmup")
+async def warmup():
+    # readiness probe: 200 once everything the first query needs is loaded, 503 with the errors otherwise
+    result = await asyncio.to_thread(warm_up)
+    return JSONResponse(result, status_code=200 if result["ready"] else 503)
+
+
+# ---------------- STATS ----------------
+@app.get("/stats")
+def stats():
+    return {"chunk_cache": chunk_cache.stats(), "answer_cache": answer_cache.stats(), "page_cache": page_cache().stats()}
+
+
+# ---------------- COLLECTIONS ----------------
+def check_collection(name: str):
+    if not valid_collection(name):
+        raise HTTPException(status_code=400, detail="collection must be 1-64 letters, digits, '_' or '-'")
+    return name
+
+
+@app.get("/collections")
+def collections():
+    return {"collections": list_collections()}
+
+
 # ---------------- UPLOAD ----------------
 @app.post("/upload")
-async def upload(files: List[UploadFile] = File(...)):
+async def upload(files: List[UploadFile] = File(...), collection: str = DEFAULT_COLLECTION):
+    check_collection(collection)
+    upload_dir = UPLOAD_PATH
+    if collection != DEFAULT_COLLECTION:
+        # same filename in two collections must not overwrite each other
+        upload_dir = os.path.join(UPLOAD_PATH, COLLECTIONS_DIR, collection)
+    os.makedirs(upload_dir, exist_ok=True)
     file_paths = []
 
     for file in files:
-        path = os.path.join(UPLOAD_PATH, file.filename)
+        path = os.path.join(upload_dir, file.filename)
 
         with open(path, "wb") as f:
-            f.write(await file.read())
+            while block := await file.read(UPLOAD_BLOCK):
+                f.write(block)
 
         file_paths.append(path)
 
-    process_and_store_docs(file_paths)
+    # 🔥 parse + index in the background, don't block the event loop
+    try:
+        job_id = jobs.submit(partial(process_and_store_docs, collection=collection), file_paths)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"message": "Documents queued for processing", "job_id": job_id, "collection": collection}
+
+
+# ---------------- DOCUMENTS ----------------
+@app.get("/documents")
+def documents(collection: str = None, limit: int = db.DOCUMENTS_PAGE, before_id: int = None):
+    # newest first; for the next page pass the last id as before_id
+    if collection is not None:
+        check_collection(collection)
+    db.ensure_db()
+    docs, error = db.get_all_documents(collection, min(max(limit, 1), 1000), before_id)
+
+    if error:
+        raise HTTPException(status_code=500, detail=error)
+
+    return docs
+
 
-    return {"message": "Documents processed successfully"}
+@app.delete("/documents/{doc_id}")
+async def remove_document(doc_id: int):
+    # chunks are tombstoned right away; the store is compacted in the background
+    result = await asyncio.to_thread(delete_document, doc_id)
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    return result
+
+
+# ---------------- JOBS ----------------
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
 
 
 # ---------------- QUERY ----------------
+def get_retriever(data: dict):
+    retriever = data.get("retriever")
+
+    if retriever is not None and retriever not in RETRIEVERS:
+        raise HTTPException(status_code=400, detail=f"retriever must be one of {list(RETRIEVERS)}")
+
+    return retriever
+
+
+def get_collections(data: dict):
+    # "collection": "name" or "collections": ["a", "b"]; default collection if neither
+    names = data.get("collections", data.get("collection", DEFAULT_COLLECTION))
+    if isinstance(names, str):
+        names = [names]
+    if not isinstance(names, list) or not names:
+        raise HTTPException(status_code=400, detail="collections must be a non-empty list of names")
+    return list(dict.fromkeys(check_collection(n) for n in names))
+
+
+def get_filters(data: dict):
+    # applied before scoring, see app/filters.py for the accepted keys
+    try:
+        return parse_filters(data.get("filters"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+
+
+def get_query(data: dict):
+    query_text = data.get("query")
+    if not isinstance(query_text, str) or not query_text.strip():
+        raise HTTPException(status_code=400, detail="Please provide a query")
+    return query_text
+
+
 @app.post("/query")
 async def query(data: dict):
-    query_text = data.get("query", "")
+    query_text = get_query(data)
+    retriever = get_retriever(data)
+    collections = get_collections(data)
+    filters = get_filters(data)
+
+    # {"timings": true} adds per-stage milliseconds to the response
+    # (load, retrieve, one per retriever, pack, llm, total); "coalesced": true
+    # means the stages are those of an identical request this one waited for
+    timings = {} if data.get("timings") else None
+    started = time.perf_counter()
+    result = await aquery_rag(query_text, retriever, timings, collections, filters)
+
+    if timings is not None:
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        result = {**result, "timings": timings}
+    return result
 
-    if not query_text:
-        return {"answer": "Please provide a query"}
 
-    result = query_rag(query_text)
-    return result
+# ---------------- QUERY (STREAMING) ----------------
+@app.post("/query/stream")
+async def query_stream(data: dict):
+    # validated like /query, before the 200 and the event stream start
+    query_text = get_query(data)
+    retriever = get_retriever(data)
+    collections = get_collections(data)
+    filters = get_filters(data)
+
+    async def events():
+        async for name, payload in aquery_rag_stream(query_text, retriever, collections, filters):
+            yield sse(name, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def sse(event: str, payload: dict):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
@@ -0,0 +1,159 @@
+# app/metrics.py
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ---------------- CONFIG ----------------
+# latency buckets (seconds): sub-millisecond index work up to slow LLM calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "json" = one JSON object per line (for log shippers), "text" = key=value
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format, one series per label set."""
+
+    def __init__(self, name: str, help: str, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+# ---------------- METRICS ----------------
+# stages of a query: load (open index/chunks), retrieve (whole retriever),
+# score (each retriever's candidate pull, labelled with its name), pack, llm;
+# and of an ingest: parse, index
+stage_seconds = Histogram("rag_stage_seconds", "Time spent per pipeline stage.", ("stage", "retriever"))
+request_seconds = Histogram("rag_http_request_seconds", "HTTP request latency.", ("method", "route", "status"))
+queries_total = Counter("rag_queries_total", "Answered queries.", ("mode", "cached"))
+ingested_pages = Counter("rag_ingested_pages_total", "Pages parsed by ingest jobs.")
+ingested_chunks = Counter("rag_ingested_chunks_total", "Chunks written by ingest jobs.")
+# ingested files whose page text came from the extraction cache (hit) or the PDF parser (miss)
+page_cache_files = Counter("rag_page_cache_files_total", "Ingested files by page-cache result.", ("result",))
+errors_total = Counter("rag_errors_total", "Errors caught and turned into error answers.", ("where",))
+# identical in-flight queries answered by another call's retrieval + LLM
+queries_coalesced = Counter("rag_queries_coalesced_total", "Queries that shared an in-flight answer.", ("mode",))
+retrieval_batch_size = Histogram(
+    "rag_retrieval_batch_size", "Queries scored together per retrieval batch.", buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+REGISTRY = [
+    stage_seconds, request_seconds, queries_total, ingested_pages, ingested_chunks, errors_total,
+    queries_coalesced, retrieval_batch_size, page_cache_files,
+]
+
+
+def render():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+@contextmanager
+def timed(stage: str, timings=None, retriever: str = ""):
+    """
+    Times the block into rag_stage_seconds; if `timings` is a dict, also
+    sets timings["<stage>_ms"] (the per-request view /query can return).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, timings, retriever)
+
+
+def record(stage: str, seconds: float, timings=None, retriever: str = ""):
+    stage_seconds.observe(seconds, stage=stage, retriever=retriever)
+    if timings is not None:
+        key = f"{retriever or stage}_ms"
+        timings[key] = round(timings.get(key, 0) + seconds * 1000, 3)
+
+
+# ---------------- STRUCTURED LOGS ----------------
+class _Formatter(logging.Formatter):
+    def format(self, record):
+        fields = {"ts": round(record.created, 3), "level": record.levelname, "event": record.getMessage()}
+        fields.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            fields["exc"] = self.formatException(record.exc_info)
+        if LOG_FORMAT == "json":
+            return json.dumps(fields, default=str)
+        return " ".join(f"{k}={v}" for k, v in fields.items())
+
+
+logger = logging.getLogger("rag")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(_Formatter())
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log(event: str, level: int = logging.INFO, exc_info=None, **fields):
+    """log("ingest_done", chunks=120) → {"ts": ..., "level": "INFO", "event": "ingest_done", "chunks": 120}"""
+    logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
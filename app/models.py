@@ -1,18 +1,28 @@
 # app/models.py
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 # What the user sends when they ask a question
 class QueryRequest(BaseModel):
     query: str
 
+# Where a piece of the answer's context came from
+class SourceChunk(BaseModel):
+    text: str
+    collection: str = "default"
+    doc_id: Optional[int] = None
+    filename: Optional[str] = None
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
 # What we send back
 class QueryResponse(BaseModel):
     answer: str
-    source_chunks: List[str]
+    source_chunks: List[SourceChunk]
 
 # How we show document info
 class DocumentMetadata(BaseModel):
     id: int
     filename: str
+    collection: str = "default"
     uploaded_at: str
\ No newline at end of file
@@ -0,0 +1,156 @@
+# app/pagecache.py
+import json
+import os
+import tempfile
+import time
+import zlib
+
+# ---------------- CONFIG ----------------
+# extracted page text of every parsed PDF, keyed by the SHA-256 of its
+# bytes, so re-uploading a file (to another collection, after a delete or
+# a store rebuild with new chunk settings) skips PDF parsing. 0 = off
+PAGE_CACHE_MB = int(os.getenv("PAGE_CACHE_MB", "512"))
+# directory name under the store root (pipeline.DB_PATH)
+PAGE_CACHE_DIR = "page_cache"
+# bump when extraction changes, so older entries are parsed again
+CACHE_VERSION = 1
+
+SUFFIX = ".pages.z"
+
+
+class PageCache:
+    """
+    One zlib-compressed JSON file per PDF under `dir_path`:
+    {"version", "pages": [text per page], "parse_seconds", "created_at"}.
+    Files are written atomically, so several processes can share the
+    directory. A hit touches the file's mtime; when the directory grows
+    past `max_bytes` the least recently used files are deleted.
+    """
+
+    def __init__(self, dir_path: str, max_bytes: int = PAGE_CACHE_MB * 1024 * 1024):
+        self.dir_path = dir_path
+        self.max_bytes = max_bytes
+
+    def _path(self, digest: str):
+        return os.path.join(self.dir_path, digest + SUFFIX)
+
+    def get(self, digest: str):
+        """The page texts stored for `digest`, or None."""
+        if self.max_bytes <= 0:
+            return None
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error):
+            _remove(path)  # truncated or corrupt: parse again
+            return None
+        if entry.get("version") != CACHE_VERSION:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return entry["pages"]
+
+    def put(self, digest: str, pages, parse_seconds: float = 0.0):
+        writer = self.writer(digest)
+        if writer is None:
+            return
+        for text in pages:
+            writer.add(text)
+        writer.commit(parse_seconds)
+
+    def writer(self, digest: str):
+        """A PageWriter streaming `digest`'s pages into the cache, or None when it's off."""
+        if self.max_bytes <= 0:
+            return None
+        return PageWriter(self, digest)
+
+    def evict(self):
+        """Deletes least recently used entries until the directory fits in `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.dir_path):
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.dir_path, name))
+            except FileNotFoundError:  # evicted by another process
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            _remove(os.path.join(self.dir_path, name))
+            total -= size
+
+    def stats(self):
+        names = os.listdir(self.dir_path) if os.path.isdir(self.dir_path) else []
+        sizes = [os.path.getsize(os.path.join(self.dir_path, n)) for n in names if n.endswith(SUFFIX)]
+        return {"entries": len(sizes), "size_bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+
+class PageWriter:
+    """
+    Writes one cache entry page by page: the JSON is compressed as it's
+    produced into a temporary file, which commit() renames into place, so
+    a file's pages never have to be held in memory together. abort() (or
+    outgrowing the cache) drops it.
+    """
+
+    def __init__(self, cache: PageCache, digest: str):
+        self.cache = cache
+        self.path = cache._path(digest)
+        os.makedirs(cache.dir_path, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(prefix=digest + ".", suffix=".tmp", dir=cache.dir_path)
+        self._file = os.fdopen(fd, "wb")
+        self._zlib = zlib.compressobj()
+        self.n_pages = 0
+        self.size = 0
+        self._write('{"version": %d, "pages": [' % CACHE_VERSION)
+
+    def _write(self, text: str):
+        if self._file is None:
+            return
+        data = self._zlib.compress(text.encode("utf-8"))
+        self.size += len(data)
+        if self.size > self.cache.max_bytes:
+            self.abort()  # would evict everything else; checked again at commit
+            return
+        self._file.write(data)
+
+    def add(self, text: str):
+        self._write((", " if self.n_pages else "") + json.dumps(text))
+        self.n_pages += 1
+
+    def commit(self, parse_seconds: float = 0.0):
+        """Moves the entry into place (if it wasn't dropped) and evicts old ones."""
+        self._write('], "parse_seconds": %s, "created_at": %s}' % (round(parse_seconds, 4), time.time()))
+        tail = self._zlib.flush()  # zlib holds back up to a block of output
+        self.size += len(tail)
+        if self._file is None or self.size > self.cache.max_bytes:
+            self.abort()
+            return
+        self._file.write(tail)
+        self._file.close()
+        self._file = None
+        os.replace(self.tmp_path, self.path)
+        self.cache.evict()
+
+    def abort(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        _remove(self.tmp_path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,119 +1,616 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import bisect
+import importlib
+import json
+import logging
 import os
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_groq import ChatGroq
+import threading
+import time
+
+import numpy as np
+
+from app import chunker, chunkstore, db, loader, pagecache, store
+from app.batching import COALESCE_QUERIES, MicroBatcher, SingleFlight
+from app.store import DEFAULT_COLLECTION
+from app.llm import agenerate, astream_tokens, build_llm
+from app.cache import answer_cache, answer_key, chunk_cache
+from app.context import pack
+from app.filters import chunk_mask, doc_table
+from app.embeddings import get_embedder
+from app.index import Segment
+from app.jobs import QueueFull, jobs
+from app.metrics import (
+    errors_total, ingested_chunks, ingested_pages, log, page_cache_files, queries_coalesced, queries_total,
+    record, retrieval_batch_size, timed,
+)
+from app.retrievers import DenseRetriever, HybridRetriever, LexicalRetriever
+from app.vectors import VectorIndex
 
 # ---------------- PATH ----------------
 DB_PATH = "vectorstore"
 
 # ---------------- LLM ----------------
-llm = ChatGroq(
-    model="llama-3.1-8b-instant",
-    temperature=0
-)
+# built on first use, not at import: langchain_groq takes about a second to
+# import and ChatGroq needs GROQ_API_KEY. Tests and benchmarks assign `llm`.
+llm = None
+_llm_lock = threading.Lock()
 
-# ---------------- PROCESS ----------------
-def process_and_store_docs(file_paths):
-    documents = []
-
-    for path in file_paths:
-        loader = PyPDFLoader(path)
-        documents.extend(loader.load())
-
-    # 🔥 SMART CHUNKING (FIX)
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1500,
-        chunk_overlap=300,
-        separators=[
-            "\n\n\n",
-            "\n\n",
-            "\n",
-            ". "
-        ]
-    )
 
-    chunks = splitter.split_documents(documents)
+def get_llm():
+    global llm
+    if llm is None:
+        with _llm_lock:
+            if llm is None:
+                llm = build_llm()
+    return llm
 
-    texts = [doc.page_content for doc in chunks]
 
-    os.makedirs(DB_PATH, exist_ok=True)
+# ---------------- RETRIEVAL ----------------
+# default retriever: "lexical" (BM25), "dense" (embeddings) or "hybrid" (both, fused)
+RETRIEVERS = ("lexical", "dense", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "lexical")
+embedder = get_embedder()
 
-    with open(os.path.join(DB_PATH, "data.txt"), "w", encoding="utf-8") as f:
-        f.write("\n\n---\n\n".join(texts))  # custom separator
+# one writer at a time per collection, across processes too (see
+# store.WriterLock); queries never take these locks
+_ingest_locks = {}
+_locks_guard = threading.Lock()
 
-    print("TOTAL CHUNKS:", len(texts))
 
+def _ingest_lock(path: str):
+    with _locks_guard:
+        return _ingest_locks.setdefault(path, store.WriterLock(path))
 
-# ---------------- LOAD ----------------
-def get_docs():
-    file_path = os.path.join(DB_PATH, "data.txt")
 
-    if not os.path.exists(file_path):
-        return []
+# ---------------- COLLECTIONS ----------------
+def collection_path(collection: str = DEFAULT_COLLECTION):
+    return store.collection_dir(DB_PATH, collection)
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = f.read()
 
-    return data.split("\n\n---\n\n")
+def page_cache():
+    # shared by every collection: same bytes, same pages
+    return pagecache.PageCache(os.path.join(DB_PATH, pagecache.PAGE_CACHE_DIR))
 
 
-# ---------------- QUERY ----------------
-def query_rag(query: str):
+def list_collections():
+    names = [DEFAULT_COLLECTION]
+    root = os.path.join(DB_PATH, store.COLLECTIONS_DIR)
+    if os.path.isdir(root):
+        names += sorted(n for n in os.listdir(root) if store.valid_collection(n) and n != DEFAULT_COLLECTION)
+    return names
+
+
+# ---------------- PROCESS ----------------
+def process_and_store_docs(file_paths, progress=None, collection: str = DEFAULT_COLLECTION):
+    # progress(**fields) is called with status/pages/chunks as work advances
+    progress = progress or (lambda **fields: None)
+    store_path = collection_path(collection)
+
+    with _ingest_lock(store_path):
+        manifest = store.migrate_legacy(store_path)
+
+        # 🔥 skip files whose exact content is already in the store
+        new_sources = {}
+        for path in file_paths:
+            digest = store.file_sha256(path)
+            if digest not in manifest["sources"] and digest not in new_sources:
+                new_sources[digest] = path
+
+        if not new_sources:
+            log("ingest_skipped", collection=collection, files=len(file_paths))
+            return []
+
+        return _ingest(store_path, manifest, new_sources, progress, collection)
+
+
+def _ingest(store_path, manifest, new_sources, progress, collection=DEFAULT_COLLECTION):
+    paths = list(new_sources.values())
+    report = loader.new_report(paths)
+    writer = store.StoreWriter(store_path, manifest, embedder=embedder)
+    pages = 0
+
+    # every chunk records (doc number, page) so it can be traced and filtered
+    first_doc = store.next_doc(manifest)
+    uploaded_at = time.time()
+
+    # 🔥 STREAMING: parse (in parallel) → chunk each page → write chunk,
+    # nothing holds the whole upload in memory
+    progress(status="parsing")
+    started = time.perf_counter()
+    # a file's chunks are contiguous, so [first, end) ids say which are its
+    ranges = {}
+    # 🔥 SMART CHUNKING: headers/footers stripped, whole sentences, small
+    # overlap, near-duplicate chunks of the same document skipped
+    dedup, dedup_file, skipped = None, None, 0
+    # 🔥 PAGE CACHE: files whose bytes were parsed before skip the PDF parser
+    stream = loader.iter_pages(paths, report, digests=list(new_sources), cache=page_cache())
+    for file_idx, page, text in chunker.clean_pages(stream):
+        if file_idx != dedup_file:  # pages arrive file by file
+            dedup, dedup_file = chunker.Deduper(), file_idx
+        for chunk in chunker.chunk_text(text):
+            if dedup.seen(chunk):
+                skipped += 1
+                continue
+            ranges.setdefault(file_idx, [writer.next_id, 0])[1] = writer.next_id + 1
+            writer.add(chunk, first_doc + file_idx, page)
+        pages += 1
+        if pages % 50 == 0:
+            progress(pages=pages, chunks=writer.n_new)
+
+    record("parse", time.perf_counter() - started)
+    page_cache_files.inc(sum(e["cached"] for e in report), result="hit")
+    page_cache_files.inc(sum(not e["cached"] for e in report), result="miss")
+    for entry in report:
+        log("parsed", collection=collection, **entry)
+
+    # a failed file is not recorded, so a later re-upload is retried
+    parsed = [
+        (file_idx, digest, os.path.basename(path), entry)
+        for file_idx, ((digest, path), entry) in enumerate(zip(new_sources.items(), report))
+        if not entry["error"]
+    ]
+    db.ensure_db()
+    doc_ids = db.add_documents([filename for _, _, filename, _ in parsed], collection)
+    sources = {
+        digest: {
+            "filename": filename,
+            "pages": entry["pages"],
+            "doc": first_doc + file_idx,
+            "doc_id": doc_ids[filename],
+            "uploaded_at": uploaded_at,
+            "chunks": ranges.get(file_idx, [writer.next_id, writer.next_id]),
+        }
+        for file_idx, digest, filename, entry in parsed
+    }
+
+    # a file that failed part-way already streamed some chunks: tombstone
+    # them in the same commit, so they're never searchable without a source
+    failed = [ranges[i] for i, entry in enumerate(report) if entry["error"] and i in ranges]
+    # 🔥 a changed file uploaded under an existing name replaces the old
+    # version (same document id), whose chunks are tombstoned in that commit
+    names = {filename for _, _, filename, _ in parsed}
+    replaced = [d for d, s in manifest["sources"].items() if s.get("filename") in names]
+
+    progress(status="indexing", pages=pages, chunks=writer.n_new, report=report)
+    with timed("index"):
+        manifest = writer.commit(sources, drop=replaced, tombstones=failed)
+    answer_cache.clear()  # answers may change with the new chunks
+    remove_later(writer.garbage)  # the old IVF files, if this commit retrained it
+    if replaced:
+        compact_if_needed(collection, manifest)
+
+    ingested_pages.inc(pages)
+    ingested_chunks.inc(writer.n_new)
+    log("ingested", collection=collection, files=len(parsed), replaced=len(replaced), pages=pages,
+        new_chunks=writer.n_new, duplicate_chunks=skipped, total_chunks=manifest["n_chunks"])
+    return report
+
+
+# ---------------- DELETE ----------------
+# old files stay on disk this long after a compaction (or IVF retrain),
+# for readers that loaded the previous manifest just before the swap
+COMPACT_GRACE = float(os.getenv("COMPACT_GRACE", "60"))
+
+
+def delete_document(doc_id: int):
+    """
+    Tombstones one document's chunks; they stop being retrieved at once.
+    Queues a background compaction when enough of the store is deleted.
+    Returns None if there's no such document.
+    """
+    db.ensure_db()
+    doc = db.get_document(doc_id)
+    if doc is None:
+        return None
+
+    path = collection_path(doc["collection"])
+    with _ingest_lock(path):
+        manifest = store.migrate_legacy(path)
+        digests = [d for d, s in manifest["sources"].items() if s.get("doc_id") == doc_id]
+        before = store.n_deleted(manifest)
+        if digests:
+            manifest = store.tombstone(path, manifest, digests)
+        db.delete_document(doc_id)
+
+    answer_cache.clear()  # answers may quote the deleted chunks
+
+    job_id = compact_if_needed(doc["collection"], manifest)
+
+    return {
+        "id": doc_id,
+        "collection": doc["collection"],
+        "chunks_deleted": store.n_deleted(manifest) - before,
+        "compaction_job": job_id,
+    }
+
+
+def compact_if_needed(collection: str, manifest: dict):
+    """Queues a compaction job once enough of the store is deleted; returns its id or None."""
+    if not store.needs_compaction(manifest):
+        return None
     try:
-        chunks = get_docs()
+        return jobs.submit(lambda files, progress: compact_collection(collection, progress), [])
+    except QueueFull:
+        # tombstones keep working; the next delete or replace queues it again
+        log("compaction_deferred", logging.WARNING, collection=collection)
+        return None
+
+
+def compact_collection(collection: str = DEFAULT_COLLECTION, progress=None):
+    """Rewrites a collection's store without deleted chunks; queries keep running meanwhile."""
+    progress = progress or (lambda **fields: None)
+    path = collection_path(collection)
 
-        if not chunks:
-            return {
-                "answer": "No documents processed yet.",
-                "source_chunks": []
-            }
+    with _ingest_lock(path):
+        manifest = store.load_manifest(path)
+        progress(status="compacting", chunks=manifest["n_chunks"])
+        new, garbage = store.compact(path, manifest)
 
-        # 🔥 remove useless words
-        stopwords = {"what", "is", "the", "of", "in", "a", "an"}
-        query_words = [w for w in query.lower().split() if w not in stopwords]
+    remove_later(garbage)
 
-        scored_chunks = []
+    log("compacted", collection=collection, chunks_before=manifest["n_chunks"], chunks_after=new["n_chunks"])
+    return [{"collection": collection, "chunks_before": manifest["n_chunks"], "chunks_after": new["n_chunks"]}]
 
-        for i, chunk in enumerate(chunks):
-            chunk_lower = chunk.lower()
-            score = 0
 
-            for word in query_words:
-                if word in chunk_lower:
-                    score += 5
+def remove_later(paths):
+    """Deletes files a committed generation no longer reads, COMPACT_GRACE seconds from now."""
+    if not paths:
+        return
+    timer = threading.Timer(COMPACT_GRACE, _remove_files, args=(paths,))
+    timer.daemon = True
+    timer.start()
 
-            if query.lower() in chunk_lower:
-                score += 10
 
-            scored_chunks.append((score, i, chunk))
+def _remove_files(paths):
+    for file_path in paths:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
 
-        # sort best first
-        scored_chunks.sort(reverse=True, key=lambda x: x[0])
 
-        # 🔥 TAKE BEST + NEIGHBOURS (FIX)
-        selected_chunks = []
+# ---------------- LOAD ----------------
+# every function here works on one collection's store directory
+def _manifest(path: str):
+    if store.needs_migration(path):
+        with _ingest_lock(path):
+            return store.migrate_legacy(path)
+    return store.load_manifest(path)
+
+
+def get_manifest(collection: str = DEFAULT_COLLECTION):
+    return _manifest(collection_path(collection))
+
+
+def _store_key(path: str):
+    # 🔥 HOT RELOAD: every commit renames a new CURRENT into place (new
+    # inode + mtime), so one stat per request notices an ingest done by
+    # any process, without reading anything
+    for name in (store.CURRENT, store.MANIFEST):
+        try:
+            st = os.stat(os.path.join(path, name))
+        except FileNotFoundError:
+            continue
+        return (path, st.st_mtime_ns, st.st_ino)
+    return None
+
+
+def _chunks(path: str, entry=None):
+    # chunks of the same generation as `entry` (default: the current one)
+    entry = entry or _index(path)
+    if entry is None:
+        return [], []
+    return chunk_cache.get((path, entry["name"]), lambda: store.read_chunks(path, entry["manifest"]))
+
+
+def get_chunks(collection: str = DEFAULT_COLLECTION):
+    """Returns the cached (chunks, lowered_chunks); shared, don't mutate."""
+    return _chunks(collection_path(collection))
+
+
+def get_docs(collection: str = DEFAULT_COLLECTION):
+    return get_chunks(collection)[0]
+
+
+# per store directory: key, name (of the manifest), segments (by name), ordered, generation,
+# vectors, manifest, meta (chunk → doc, page), docs (doc → source),
+# live (mask of chunks not deleted, None if nothing is) and live_bytes
+# (the same mask as BM25 reads it, built once per generation)
+_index_cache = {}
+
+def _index(path: str):
+    if store.needs_migration(path):
+        _manifest(path)
+    key = _store_key(path)
+
+    if key is None:
+        return None
+
+    # only open segments a new ingest added; existing ones stay mapped
+    cached = _index_cache.get(path)
+    if cached is None or cached["key"] != key:
+        # the manifest is read by name: it's immutable, so everything
+        # below comes from one generation even if CURRENT moves meanwhile
+        name = store.current(path)
+        if cached is not None and cached["name"] == name:
+            cached["key"] = key
+            return cached
+        manifest = store.load_manifest(path, name)
+        previous = cached["segments"] if cached else {}
+
+        opened, ordered, base = {}, [], 0
+        for meta in manifest["segments"]:
+            seg = previous.get(meta["name"])
+            if seg is None:
+                seg = Segment(path, meta, doc_base=base)
+            opened[meta["name"]] = seg
+            ordered.append(seg)
+            base += meta["n_docs"]
+
+        live = store.live_mask(manifest)
+        cached = _index_cache[path] = {
+            "key": key,
+            "name": name,
+            "segments": opened,
+            "ordered": ordered,
+            "generation": manifest["generation"],
+            "vectors": _open_vectors(path, manifest),
+            "manifest": manifest,
+            "meta": store.read_meta(path, manifest),
+            "docs": doc_table(manifest),
+            "live": live,
+            "live_bytes": live.tobytes() if live is not None else None,
+        }
 
-        for score, idx, chunk in scored_chunks[:4]:   # increased from 2 → 4
-            selected_chunks.append(chunk)
+    return cached
 
-            if idx + 1 < len(chunks):
-                selected_chunks.append(chunks[idx + 1])
 
-            if idx - 1 >= 0:
-                selected_chunks.append(chunks[idx - 1])
+def get_index(collection: str = DEFAULT_COLLECTION):
+    entry = _index(collection_path(collection))
+    return entry["ordered"] if entry else []
 
-        # remove duplicates
-        selected_chunks = list(dict.fromkeys(selected_chunks))
 
-        # 🔥 increase context size (FIX)
-        context = "\n\n".join(selected_chunks)
-        context = context[:7000]
+def _open_vectors(path: str, manifest):
+    # only usable if they were built by the embedder we'd query with
+    embedding = manifest.get("embedding")
+    if embedder is None or embedding != {"name": embedder.name, "dim": embedder.dim}:
+        return None
+    return VectorIndex(
+        path, manifest.get("n_vectors", 0), embedding["dim"], ivf=manifest.get("ivf"), prefix=store.files(manifest)
+    )
+
 
-        # 🔥 FINAL PROMPT
-        prompt = f"""
+def get_vectors(collection: str = DEFAULT_COLLECTION):
+    entry = _index(collection_path(collection))
+    return entry["vectors"] if entry else None
+
+
+def corpus_version(collections=(DEFAULT_COLLECTION,)):
+    # changes with every ingest into any of `collections`; None while they're all empty
+    versions = []
+    for collection in collections:
+        path = collection_path(collection)
+        entry = _index(path)
+        if entry and entry["ordered"]:
+            versions.append(f"{path}@{entry['generation']}")
+    return ",".join(versions) or None
+
+
+def _cached_answer(query: str, mode: str, collections=None, filters=None):
+    version = corpus_version(collections or [DEFAULT_COLLECTION])
+    if version is None:
+        return None, None
+    scope = f"{version}:{mode}"
+    if filters:
+        scope += ":" + json.dumps(filters, sort_keys=True)
+    key = answer_key(scope, query)
+    return key, answer_cache.get(key)
+
+
+# ---------------- QUERY ----------------
+NO_DOCS = {
+    "answer": "No documents processed yet.",
+    "source_chunks": []
+}
+
+NO_MATCH = {
+    "answer": "No documents match the filters.",
+    "source_chunks": []
+}
+
+
+def _empty_answer(context):
+    # None → nothing stored; no passages → the filters excluded everything
+    if context is None:
+        return NO_DOCS
+    if not context["passages"]:
+        return NO_MATCH
+    return None
+
+
+def make_retriever(mode: str, entry: dict, lowered, allowed=None, filtered: bool = False):
+    # `allowed` is live & filter-matching chunks. BM25 checks it per posting;
+    # dense search only narrows to those rows for real filters, tombstones
+    # alone are dropped from its results instead (no copy of the matrix).
+    # Without filters `allowed` is the generation's live mask, whose bytes
+    # are already in the entry
+    lexical = LexicalRetriever(entry["ordered"], lowered, allowed=allowed if filtered else entry["live_bytes"])
+    if mode == "lexical" or entry["vectors"] is None:
+        return lexical  # no usable vectors → BM25 only
+
+    if filtered:
+        dense = DenseRetriever(entry["vectors"], embedder, allowed=allowed)
+    else:
+        dense = DenseRetriever(entry["vectors"], embedder, live=allowed)
+    if mode == "dense":
+        return dense
+    return HybridRetriever([lexical, dense])
+
+
+class _Combined:
+    """Several collections' chunks seen as one id space (ids offset per collection)."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.starts = []
+        total = 0
+        for part in parts:
+            self.starts.append(total)
+            total += len(part["chunks"])
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def locate(self, i: int):
+        """Global id → (part, local id)."""
+        p = bisect.bisect_right(self.starts, i) - 1
+        return self.parts[p], i - self.starts[p]
+
+    def __getitem__(self, i: int):
+        part, local = self.locate(i)
+        return part["chunks"][local]
+
+    def related(self, i: int, j: int):
+        # neighbours stay in the same collection and document, and inside the filters
+        a, li = self.locate(i)
+        b, lj = self.locate(j)
+        if a is not b or a["meta"][li, 0] != b["meta"][lj, 0]:
+            return False
+        return b["allowed"] is None or bool(b["allowed"][lj])
+
+    def reference(self, ids, text: str):
+        """source_chunks entry for one packed passage: text plus where it came from."""
+        part, first = self.locate(ids[0])
+        local = [i - part["offset"] for i in ids]
+        doc = int(part["meta"][first, 0])
+        source = part["docs"].get(doc, {})
+        pages = part["meta"][local, 1]
+        known = doc != chunkstore.UNKNOWN_DOC
+        return {
+            "text": text,
+            "collection": part["collection"],
+            "doc_id": source.get("doc_id"),
+            "filename": source.get("filename"),
+            "page_start": int(pages.min()) + 1 if known else None,
+            "page_end": int(pages.max()) + 1 if known else None,
+        }
+
+
+def retrieve(query: str, mode: str = None, timings=None, collections=None, filters=None):
+    """
+    Returns the packed context to answer `query` from (best hits +
+    neighbours within the token budget, see context.pack), or None while
+    nothing is stored. Only the given collections are searched, and with
+    `filters` (see filters.parse_filters) only matching chunks are scored.
+    Each entry of context["sources"] says which document and pages a
+    passage came from.
+    """
+    return retrieve_many([query], mode, timings, collections, filters)[0]
+
+
+def retrieve_many(queries, mode: str = None, timings=None, collections=None, filters=None):
+    """
+    retrieve() for several queries with the same mode, collections and
+    filters: each index is loaded once and each retriever scores the
+    whole batch in one pass (see Retriever.retrieve_many). `timings` gets
+    the batch's stage times.
+    """
+    mode = mode or RETRIEVAL_MODE
+    parts, hits, offset = [], [[] for _ in queries], 0
+
+    # each collection has its own index, so cost follows what's queried
+    for collection in collections or [DEFAULT_COLLECTION]:
+        path = collection_path(collection)
+        with timed("load", timings):
+            entry = _index(path)
+            chunks, lowered = _chunks(path, entry)
+        if not chunks or entry is None:
+            continue
+
+        # 🔥 filters and deletes become an ID set first; retrievers only score inside it
+        allowed = entry["live"]
+        if filters:
+            matching = chunk_mask(entry["meta"], entry["manifest"], filters)
+            allowed = matching if allowed is None else allowed & matching
+
+        with timed("retrieve", timings):
+            found = make_retriever(mode, entry, lowered, allowed, bool(filters)).retrieve_many(
+                queries, k=4, timings=timings
+            )
+        for query_hits, query_found in zip(hits, found):
+            query_hits.extend((score, offset + idx) for score, idx in query_found)
+        parts.append({
+            "collection": collection,
+            "chunks": chunks,
+            "meta": entry["meta"],
+            "docs": entry["docs"],
+            "allowed": allowed,
+            "offset": offset,
+        })
+        offset += len(chunks)
+
+    if not parts:
+        return [None] * len(queries)
+
+    chunks = _Combined(parts)
+    return [_pack_hits(query_hits, chunks, timings) for query_hits in hits]
+
+
+def _pack_hits(hits, chunks: _Combined, timings=None):
+    top_hits = sorted(hits, key=lambda x: -x[0])[:4]
+
+    # nothing matched → fall back to the first (allowed) chunks like before
+    if not top_hits:
+        for part in chunks.parts:
+            ids = range(len(part["chunks"])) if part["allowed"] is None else np.flatnonzero(part["allowed"])
+            if len(ids):
+                top_hits = [(0.0, part["offset"] + int(i)) for i in ids[:4]]
+                break
+
+    # 🔥 TAKE BEST + NEIGHBOURS, as many as fit the token budget
+    with timed("pack", timings):
+        context = pack(top_hits, chunks, related=chunks.related)
+        context["sources"] = [chunks.reference(ids, text) for ids, text in zip(context["groups"], context["passages"])]
+    return context
+
+
+# ---------------- COALESCING + BATCHING ----------------
+# a class asking at once: identical questions share one answer (keyed like
+# the answer cache), distinct ones waiting for retrieval are scored together
+inflight = SingleFlight()
+
+
+def _retrieve_batch(group, items):
+    mode, collections, _ = group
+    timings = {}
+    contexts = retrieve_many([query for query, _ in items], mode, timings, list(collections), items[0][1])
+    retrieval_batch_size.observe(len(items))
+    return [(context, timings) for context in contexts]
+
+
+retrieval_batcher = MicroBatcher(_retrieve_batch)
+
+
+async def aretrieve(query: str, mode: str = None, timings=None, collections=None, filters=None):
+    """retrieve() off the event loop, batched with concurrent queries of the same mode, collections and filters."""
+    mode = mode or RETRIEVAL_MODE
+    group = (mode, tuple(collections or [DEFAULT_COLLECTION]), json.dumps(filters, sort_keys=True) if filters else "")
+    context, batch_timings = await retrieval_batcher.submit(group, (query, filters))
+    if timings is not None:
+        timings.update(batch_timings)
+    return context
+
+
+def context_usage(context):
+    return {"tokens": context["tokens"], "budget": context["budget"]}
+
+
+def build_prompt(query: str, context):
+    # 🔥 FINAL PROMPT
+    return f"""
 Answer STRICTLY using the context.
 
 - Include ALL steps if present
@@ -122,7 +619,7 @@ Answer STRICTLY using the context.
 - Keep answer structured and exam-friendly
 
 Context:
-{context}
+{context["text"]}
 
 Question:
 {query}
@@ -130,15 +627,215 @@ Question:
 Answer:
 """
 
-        response = llm.invoke(prompt)
 
-        return {
+def query_rag(query: str, retriever: str = None, timings=None, collections=None, filters=None):
+    # `timings`, if given, is filled with per-stage milliseconds;
+    # `collections` limits the search (default: the default collection),
+    # `filters` (already parsed) limits which chunks are scored
+    mode = retriever or RETRIEVAL_MODE
+    try:
+        key, cached = _cached_answer(query, mode, collections, filters)
+        queries_total.inc(mode=mode, cached=bool(cached))
+        if cached:
+            return cached
+
+        context = retrieve(query, mode, timings, collections, filters)
+
+        empty = _empty_answer(context)
+        if empty:
+            return empty
+
+        with timed("llm", timings):
+            response = get_llm().invoke(build_prompt(query, context))
+
+        result = {
             "answer": response.content,
-            "source_chunks": selected_chunks
+            "source_chunks": context["sources"],
+            "context": context_usage(context),
         }
+        answer_cache.put(key, result)
+        return result
 
     except Exception as e:
+        errors_total.inc(where="query")
+        log("query_failed", logging.ERROR, exc_info=e, mode=mode)
         return {
             "answer": f"Backend error: {str(e)}",
             "source_chunks": []
         }
+
+
+async def aquery_rag(query: str, retriever: str = None, timings=None, collections=None, filters=None):
+    # same as query_rag but never blocks the event loop: retrieval runs in
+    # a worker thread (batched, see aretrieve) and the LLM call is awaited
+    mode = retriever or RETRIEVAL_MODE
+    try:
+        key, cached = _cached_answer(query, mode, collections, filters)
+        queries_total.inc(mode=mode, cached=bool(cached))
+        if cached:
+            return cached
+
+        if key is None or not COALESCE_QUERIES:
+            return await _aanswer(query, mode, timings, collections, filters, key)
+
+        # 🔥 the same question is already being answered → wait for that answer
+        async def answer():
+            # stage times go with the shared result, so every caller that
+            # asked for timings gets the run's stages, not just total_ms
+            stages = {}
+            return await _aanswer(query, mode, stages, collections, filters, key), stages
+
+        (result, stages), shared = await inflight.do(key, answer)
+        if shared:
+            queries_coalesced.inc(mode=mode)
+        if timings is not None:
+            timings.update(stages)
+            if shared:
+                timings["coalesced"] = True  # waited for another request's run
+        return result
+
+    except Exception as e:
+        errors_total.inc(where="query")
+        log("query_failed", logging.ERROR, exc_info=e, mode=mode)
+        return {
+            "answer": f"Backend error: {str(e) or type(e).__name__}",
+            "source_chunks": []
+        }
+
+
+async def _aanswer(query: str, mode: str, timings, collections, filters, key):
+    context = await aretrieve(query, mode, timings, collections, filters)
+
+    empty = _empty_answer(context)
+    if empty:
+        return empty
+
+    with timed("llm", timings):
+        response = await agenerate(get_llm(), build_prompt(query, context))
+
+    result = {
+        "answer": response.content,
+        "source_chunks": context["sources"],
+        "context": context_usage(context),
+    }
+    answer_cache.put(key, result)
+    return result
+
+
+# ---------------- STREAMING ----------------
+# events are (name, payload): one "sources", then "token"s, then "done" or "error"
+async def aquery_rag_stream(query: str, retriever: str = None, collections=None, filters=None):
+    started = time.perf_counter()
+    first_token_at = None
+    mode = retriever or RETRIEVAL_MODE
+
+    try:
+        key, cached = _cached_answer(query, mode, collections, filters)
+        queries_total.inc(mode=mode, cached=bool(cached))
+        if cached:
+            yield "sources", {"source_chunks": cached["source_chunks"], "context": cached.get("context")}
+            yield "token", {"text": cached["answer"]}
+            elapsed = round((time.perf_counter() - started) * 1000, 2)
+            yield "done", {"ttft_ms": elapsed, "total_ms": elapsed, "cached": True}
+            return
+
+        timings = {}
+        context = await aretrieve(query, mode, timings, collections, filters)
+
+        empty = _empty_answer(context)
+        if empty:
+            yield "sources", {"source_chunks": []}
+            yield "token", {"text": empty["answer"]}
+            yield "done", {"ttft_ms": 0.0, "total_ms": 0.0}
+            return
+
+        yield "sources", {"source_chunks": context["sources"], "timings": timings, "context": context_usage(context)}
+
+        answer = []
+        llm_started = time.perf_counter()
+        async for text in astream_tokens(get_llm(), build_prompt(query, context)):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            answer.append(text)
+            yield "token", {"text": text}
+
+        answer_cache.put(key, {"answer": "".join(answer), "source_chunks": context["sources"], "context": context_usage(context)})
+
+        finished = time.perf_counter()
+        record("llm", finished - llm_started)
+        yield "done", {
+            "ttft_ms": round(((first_token_at or finished) - started) * 1000, 2),
+            "total_ms": round((finished - started) * 1000, 2),
+            "cached": False,
+        }
+
+    except Exception as e:
+        errors_total.inc(where="stream")
+        log("query_failed", logging.ERROR, exc_info=e, mode=mode, stream=True)
+        yield "error", {"answer": f"Backend error: {str(e) or type(e).__name__}"}
+
+
+def query_rag_stream(query: str, retriever: str = None, collections=None, filters=None):
+    """Sync version for the Streamlit app: yields answer text as it's generated."""
+    mode = retriever or RETRIEVAL_MODE
+    try:
+        key, cached = _cached_answer(query, mode, collections, filters)
+        queries_total.inc(mode=mode, cached=bool(cached))
+        if cached:
+            yield cached["answer"]
+            return
+
+        context = retrieve(query, mode, None, collections, filters)
+
+        empty = _empty_answer(context)
+        if empty:
+            yield empty["answer"]
+            return
+
+        answer = []
+        started = time.perf_counter()
+        for chunk in get_llm().stream(build_prompt(query, context)):
+            if chunk.content:
+                answer.append(chunk.content)
+                yield chunk.content
+        record("llm", time.perf_counter() - started)
+
+        answer_cache.put(key, {"answer": "".join(answer), "source_chunks": context["sources"], "context": context_usage(context)})
+
+    except Exception as e:
+        errors_total.inc(where="stream")
+        log("query_failed", logging.ERROR, exc_info=e, mode=mode, stream=True)
+        yield f"Backend error: {str(e)}"
+
+
+# ---------------- WARM-UP ----------------
+def warm_up(collections=None):
+    """
+    Does the work deferred at import now instead of in the first request:
+    builds the LLM client, imports the PDF parser, loads the embedding
+    model and opens the collections' indexes (default: all of them).
+    Returns {"ready": bool, "steps": {name_ms: ...}, "errors": {name: message}}.
+    """
+    steps, errors = {}, {}
+
+    def step(name, fn):
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            errors[name] = str(e) or type(e).__name__
+        steps[f"{name}_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    def open_indexes():
+        for collection in collections or list_collections():
+            path = collection_path(collection)
+            _chunks(path, _index(path))
+
+    step("llm", get_llm)
+    step("pdf", lambda: importlib.import_module("pypdf"))
+    if embedder is not None:
+        step("embedder", lambda: embedder.embed(["warm up"]))
+    step("index", open_indexes)
+
+    log("warm_up", logging.WARNING if errors else logging.INFO, **steps, errors=errors)
+    return {"ready": not errors, "steps": steps, "errors": errors}
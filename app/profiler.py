@@ -0,0 +1,109 @@
+# app/profiler.py
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from app.metrics import log
+
+# ---------------- CONFIG ----------------
+# opt-in: requests slower than this many ms get their samples written out
+# as a folded-stack profile (flamegraph.pl / speedscope / inferno read it).
+# 0 = off, nothing is sampled.
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))  # newest profiles kept on disk
+
+# leaf frames of a thread that is just waiting for work; they would bury
+# the real stacks, so they aren't counted
+IDLE = {("threading.py", "wait"), ("selectors.py", "select"), ("thread.py", "_worker"), ("queue.py", "get")}
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """
+    Wall-clock sampling profiler: a daemon thread that snapshots every
+    other thread's Python stack each `interval` seconds. Costs nothing
+    in the sampled threads themselves (no sys.setprofile hooks).
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                if leaf in IDLE:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+def folded(stacks):
+    """One "root;caller;callee count" line per stack, the input format of flamegraph.pl."""
+    return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+
+def _prune(dir_path: str, keep: int):
+    names = sorted(n for n in os.listdir(dir_path) if n.endswith(".folded"))
+    for name in names[:-keep] if keep else names:
+        os.remove(os.path.join(dir_path, name))
+
+
+@contextmanager
+def profile_if_slow(name: str, threshold_ms: float = None):
+    """
+    Samples while the block runs; if it took longer than `threshold_ms`
+    (PROFILE_SLOW_MS by default) the stacks go to PROFILE_DIR as
+    <unix ms>-<name>.folded. A no-op when profiling is off.
+    """
+    threshold_ms = PROFILE_SLOW_MS if threshold_ms is None else threshold_ms
+    if threshold_ms <= 0:
+        yield
+        return
+
+    sampler = Sampler().start()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stacks = sampler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > threshold_ms and stacks:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name.strip("/")) or "root"
+            path = os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}-{safe}.folded")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(folded(stacks))
+            _prune(PROFILE_DIR, PROFILE_KEEP)
+            log("slow_request_profiled", name=name, ms=round(elapsed_ms, 1), samples=sampler.samples, path=path)
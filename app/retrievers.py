@@ -0,0 +1,148 @@
+# app/retrievers.py
+import os
+import time
+from itertools import islice
+
+import numpy as np
+
+from app.ann import IVF_NPROBE
+from app.index import bm25_search, bm25_search_many
+from app.metrics import record
+
+# ---------------- CONFIG ----------------
+# upper bound on candidates each stage may produce, so hybrid cost stays bounded
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "50"))
+DENSE_CANDIDATES = int(os.getenv("DENSE_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def take(name: str, candidates, limit: int, timings=None):
+    """Pulls at most `limit` items from a lazy candidate stream, timing the stage."""
+    start = time.perf_counter()
+    out = list(islice(candidates, limit))
+    record("score", time.perf_counter() - start, timings, retriever=name)
+    return out
+
+
+class Retriever:
+    """
+    Produces (score, chunk_id) pairs, best first. `candidates` is a
+    generator, so no work happens until a caller pulls from it.
+    """
+
+    name = "base"
+    limit = 50
+
+    def candidates(self, query: str, timings=None):
+        raise NotImplementedError
+
+    def retrieve(self, query: str, k: int = 4, timings=None):
+        return take(self.name, self.candidates(query, timings), min(k, self.limit), timings)
+
+    def candidates_many(self, queries, timings=None):
+        """
+        Candidate lists (each capped at `limit`) for a batch of queries.
+        Subclasses override this to share one pass over the index.
+        """
+        return [list(islice(self.candidates(query, timings), self.limit)) for query in queries]
+
+    def retrieve_many(self, queries, k: int = 4, timings=None):
+        start = time.perf_counter()
+        out = [found[:min(k, self.limit)] for found in self.candidates_many(queries, timings)]
+        record("score", time.perf_counter() - start, timings, retriever=self.name)
+        return out
+
+
+class LexicalRetriever(Retriever):
+    """
+    BM25 over the inverted index; full-phrase matches are moved to the
+    front. `allowed` (bool mask over chunk ids, or its bytes) restricts
+    what is scored.
+    """
+
+    name = "lexical"
+
+    def __init__(self, segments, lowered, limit: int = LEXICAL_CANDIDATES, allowed=None):
+        self.segments = segments
+        self.lowered = lowered
+        self.limit = limit
+        # bytes index faster than a numpy array in the postings loop
+        self.allowed = allowed.tobytes() if isinstance(allowed, np.ndarray) else allowed
+
+    def _phrase_first(self, query: str, hits):
+        phrase = query.lower().strip()
+        hits.sort(key=lambda x: (phrase in self.lowered[x[1]], x[0]), reverse=True)
+        return hits
+
+    def candidates(self, query: str, timings=None):
+        yield from self._phrase_first(query, bm25_search(self.segments, query, k=self.limit, allowed=self.allowed))
+
+    def candidates_many(self, queries, timings=None):
+        found = bm25_search_many(self.segments, queries, k=self.limit, allowed=self.allowed)
+        return [self._phrase_first(query, hits) for query, hits in zip(queries, found)]
+
+
+class DenseRetriever(Retriever):
+    """
+    Cosine similarity against the chunk embedding matrix (IVF-probed when
+    the store has one). With an `allowed` mask (selective filters) only
+    those rows are scored; a `live` mask (tombstones) keeps the full
+    search and drops dead rows from the results.
+    """
+
+    name = "dense"
+
+    def __init__(self, vectors, embedder, limit: int = DENSE_CANDIDATES, nprobe: int = IVF_NPROBE, allowed=None,
+                 live=None):
+        self.vectors = vectors
+        self.embedder = embedder
+        self.limit = limit
+        self.nprobe = nprobe
+        self.ids = np.flatnonzero(allowed[:len(vectors)]) if allowed is not None and vectors is not None else None
+        self.live = live[:len(vectors)] if live is not None and vectors is not None and self.ids is None else None
+
+    def candidates(self, query: str, timings=None):
+        if self.vectors is None or not len(self.vectors):
+            return
+        q = self.embedder.embed([query])[0]
+        yield from self.vectors.search(q, k=self.limit, nprobe=self.nprobe, ids=self.ids, live=self.live)
+
+    def candidates_many(self, queries, timings=None):
+        if self.vectors is None or not len(self.vectors):
+            return [[] for _ in queries]
+        # one embedding call and one pass over the matrix for the whole batch
+        return self.vectors.search_many(
+            self.embedder.embed(queries), k=self.limit, nprobe=self.nprobe, ids=self.ids, live=self.live
+        )
+
+
+class HybridRetriever(Retriever):
+    """
+    Reciprocal-rank fusion of several retrievers: score = sum of
+    1 / (rrf_k + rank) over the lists a chunk appears in. Each input list
+    is capped at its retriever's `limit`.
+    """
+
+    name = "hybrid"
+
+    def __init__(self, retrievers, rrf_k: int = RRF_K):
+        self.retrievers = retrievers
+        self.rrf_k = rrf_k
+        self.limit = sum(r.limit for r in retrievers)
+
+    def _fuse(self, ranked_lists):
+        fused = {}
+        for ranked in ranked_lists:
+            for rank, (_, chunk_id) in enumerate(ranked):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        return sorted(((score, cid) for cid, score in fused.items()), key=lambda x: (-x[0], x[1]))
+
+    def candidates(self, query: str, timings=None):
+        yield from self._fuse(
+            take(retriever.name, retriever.candidates(query, timings), retriever.limit, timings)
+            for retriever in self.retrievers
+        )
+
+    def candidates_many(self, queries, timings=None):
+        per_retriever = [retriever.retrieve_many(queries, retriever.limit, timings) for retriever in self.retrievers]
+        return [self._fuse(lists) for lists in zip(*per_retriever)]
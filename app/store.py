@@ -0,0 +1,473 @@
+# app/store.py
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+from app import ann, chunkstore
+from app.chunkstore import ChunkStore
+from app.embeddings import EMBED_BATCH
+from app.index import write_segment
+from app.vectors import VECTORS_FILE, VectorIndex, VectorWriter
+
+# ---------------- GENERATIONS ----------------
+# every commit writes an immutable manifest-<generation>.json, then
+# atomically swaps CURRENT (one line: that file's name). Readers in any
+# process follow CURRENT, so they see a whole generation or the previous
+# one, never a mix. Chunk/vector files are append-only logs a manifest
+# reads a fixed prefix of; segments and IVF files are per generation.
+CURRENT = "CURRENT"
+MANIFEST = "manifest.json"  # single mutable manifest of stores before CURRENT
+MANIFEST_RE = re.compile(r"^manifest-(\d+)\.json$")
+# older manifests kept around for readers that resolved CURRENT just before a swap
+MANIFEST_KEEP = int(os.getenv("MANIFEST_KEEP", "8"))
+
+# old text store, only read by migrate_legacy
+LEGACY_FILE = "data.txt"
+SEPARATOR = "\n\n---\n\n"
+
+# ---------------- COLLECTIONS ----------------
+# the default collection is the store root itself, so existing stores keep
+# working; every other one is a full store of its own under collections/
+DEFAULT_COLLECTION = "default"
+COLLECTIONS_DIR = "collections"
+COLLECTION_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def valid_collection(name: str):
+    return isinstance(name, str) and bool(COLLECTION_RE.match(name))
+
+
+def collection_dir(root: str, collection: str = DEFAULT_COLLECTION):
+    if not valid_collection(collection):
+        raise ValueError(f"Invalid collection name {collection!r}")
+    if collection == DEFAULT_COLLECTION:
+        return root
+    return os.path.join(root, COLLECTIONS_DIR, collection)
+
+
+def empty_manifest():
+    return {"generation": 0, "n_chunks": 0, "segments": [], "sources": {}}
+
+
+def file_sha256(path: str):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+LOCK_FILE = "LOCK"
+
+
+class WriterLock:
+    """
+    One writer per store at a time: a thread lock inside this process plus
+    an flock on <store>/LOCK across processes, since every server worker
+    can run ingest, delete and compaction jobs. Readers never take it.
+    Writers must load the manifest after acquiring it.
+    """
+
+    def __init__(self, dir_path: str):
+        self.dir_path = dir_path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if fcntl is not None:
+            try:
+                os.makedirs(self.dir_path, exist_ok=True)
+                self._file = open(os.path.join(self.dir_path, LOCK_FILE), "a")
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+
+def manifest_name(generation: int):
+    return f"manifest-{generation:06d}.json"
+
+
+def current(dir_path: str):
+    """Name of the manifest CURRENT points at (MANIFEST for older stores), or None if empty."""
+    try:
+        with open(os.path.join(dir_path, CURRENT), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return MANIFEST if os.path.exists(os.path.join(dir_path, MANIFEST)) else None
+
+
+def load_manifest(dir_path: str, name: str = None):
+    # `name` pins a generation (see current); by default the current one
+    name = name or current(dir_path)
+    if name is None:
+        return empty_manifest()
+
+    with open(os.path.join(dir_path, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_atomic(file_path: str, text: str):
+    # write-then-rename so nobody ever opens a half-written file
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def save_manifest(dir_path: str, manifest: dict):
+    """Publishes `manifest` as a new generation: immutable file first, then the CURRENT swap."""
+    name = manifest_name(manifest["generation"])
+    if os.path.exists(os.path.join(dir_path, name)):
+        raise FileExistsError(f"generation {manifest['generation']} already published in {dir_path}")
+
+    _write_atomic(os.path.join(dir_path, name), json.dumps(manifest))
+    _write_atomic(os.path.join(dir_path, CURRENT), name + "\n")
+
+    # the pointer is the commit point; make the rename itself durable
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    _prune_manifests(dir_path, manifest["generation"])
+
+
+def _prune_manifests(dir_path: str, generation: int):
+    for file_name in os.listdir(dir_path):
+        match = MANIFEST_RE.match(file_name)
+        if match and int(match.group(1)) <= generation - MANIFEST_KEEP:
+            os.remove(os.path.join(dir_path, file_name))
+    legacy = os.path.join(dir_path, MANIFEST)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def files(manifest: dict):
+    # prefix of the live chunk/vector files ("" until the first compaction)
+    return manifest.get("files", "")
+
+
+def read_chunks(dir_path: str, manifest: dict):
+    # anything past n_chunks is a crashed append that never got committed
+    return ChunkStore(dir_path, manifest["n_chunks"], files(manifest))
+
+
+def read_meta(dir_path: str, manifest: dict):
+    return chunkstore.read_meta(dir_path, manifest["n_chunks"], files(manifest))
+
+
+# new segments are cut every SEGMENT_CHUNKS chunks so ingest memory stays bounded
+SEGMENT_CHUNKS = int(os.getenv("SEGMENT_CHUNKS", "5000"))
+IVF_FILES = (".centroids.npy", ".assign.i32")
+
+
+class StoreWriter:
+    """
+    Streams chunks into the store. Chunk text goes straight to the chunk
+    file; index segments (and embeddings, if an `embedder` is given) are
+    cut every `segment_chunks` chunks, so memory is bounded by one segment
+    rather than the whole upload. Nothing is visible to readers until
+    `commit` saves the new manifest.
+    """
+
+    def __init__(self, dir_path: str, manifest: dict, segment_chunks: int = None, embedder=None):
+        os.makedirs(dir_path, exist_ok=True)
+        self.dir_path = dir_path
+        self.manifest = manifest
+        self.generation = manifest["generation"] + 1
+        self.segment_chunks = segment_chunks or SEGMENT_CHUNKS
+        self.segments = []
+        self._buffer = []
+        self.garbage = []  # files only older generations read, once committed
+        self.embedder = embedder
+        self._vectors = self._open_vectors() if embedder else None
+        self._chunks = chunkstore.ChunkWriter(dir_path, manifest["n_chunks"], files(manifest))
+
+    def _open_vectors(self):
+        embedding = {"name": self.embedder.name, "dim": self.embedder.dim}
+        same_space = self.manifest.get("embedding") == embedding
+        n_vectors = self.manifest.get("n_vectors", 0) if same_space else 0
+        self._ivf = self.manifest.get("ivf") if same_space else None
+        vectors = VectorWriter(self.dir_path, n_vectors, embedding["dim"], files(self.manifest))
+
+        # chunks stored before vectors existed (or with another embedder)
+        # are embedded once here, then only new chunks are
+        old = read_chunks(self.dir_path, self.manifest)
+        for start in range(n_vectors, len(old), EMBED_BATCH):
+            vectors.add(self.embedder.embed(old[start:start + EMBED_BATCH]))
+
+        return vectors
+
+    @property
+    def n_new(self):
+        return self._chunks.n_chunks - self.manifest["n_chunks"]
+
+    @property
+    def next_id(self):
+        return self._chunks.n_chunks
+
+    def add(self, text: str, doc: int = chunkstore.UNKNOWN_DOC, page: int = 0):
+        self._chunks.add(text, doc, page)
+        self._buffer.append(text)
+        if len(self._buffer) >= self.segment_chunks:
+            self._cut_segment()
+
+    def _cut_segment(self):
+        if not self._buffer:
+            return
+        name = f"seg-{self.generation:05d}-{len(self.segments):03d}"
+        self.segments.append(write_segment(self.dir_path, name, self._buffer))
+        if self._vectors is not None:
+            for start in range(0, len(self._buffer), EMBED_BATCH):
+                self._vectors.add(self.embedder.embed(self._buffer[start:start + EMBED_BATCH]))
+        self._buffer = []
+
+    def commit(self, sources=None, extra=None, drop=(), tombstones=()):
+        """
+        Saves and returns the new manifest (`extra` fields are merged in
+        as-is). In the same generation, `drop` (content hashes) removes
+        existing sources and tombstones their chunks, e.g. the previous
+        version of a re-uploaded file, and `tombstones` adds chunk ranges
+        to delete, e.g. what a failed file streamed in.
+        """
+        self._cut_segment()
+        self._chunks.close()
+
+        kept, deleted = _drop_sources(self.dir_path, self.manifest, drop)
+        deleted += [list(r) for r in tombstones]
+        manifest = dict(
+            self.manifest,
+            generation=self.generation,
+            n_chunks=self._chunks.n_chunks,
+            segments=self.manifest["segments"] + self.segments,
+            sources={**kept, **(sources or {})},
+            **(extra or {}),
+        )
+        if deleted:
+            manifest["deleted"] = deleted
+
+        if self._vectors is not None:
+            self._vectors.close()
+            dim = self.embedder.dim
+            manifest["embedding"] = {"name": self.embedder.name, "dim": dim}
+            manifest["n_vectors"] = self._vectors.n_vectors
+
+            # new rows join their nearest IVF list (trained once big enough)
+            matrix = VectorIndex(self.dir_path, manifest["n_vectors"], dim, prefix=files(manifest)).matrix
+            manifest["ivf"] = ann.update(self.dir_path, matrix, self._ivf, self.generation)
+
+        save_manifest(self.dir_path, manifest)
+        # a retrained IVF index went to new files; only readers of older
+        # generations still need the previous ones
+        old_ivf = self.manifest.get("ivf")
+        if old_ivf and (manifest.get("ivf") or {}).get("name") != old_ivf["name"]:
+            self.garbage = [os.path.join(self.dir_path, old_ivf["name"] + ext) for ext in IVF_FILES]
+        return manifest
+
+
+def append_chunks(dir_path: str, manifest: dict, texts, sources=None, embedder=None):
+    """
+    Appends `texts` as new segment(s). Existing chunks keep their ids and
+    existing index segments are left untouched. `sources` maps content
+    hash -> info about the file the chunks came from. Returns the new
+    manifest (already saved).
+    """
+    writer = StoreWriter(dir_path, manifest, embedder=embedder)
+    for text in texts:
+        writer.add(text)
+    return writer.commit(sources)
+
+
+# ---------------- DELETES ----------------
+# deleting a document only records its chunk id range in manifest
+# "deleted" (a tombstone); readers mask those ids out. compact() later
+# rewrites the store without them.
+COMPACT_RATIO = float(os.getenv("COMPACT_RATIO", "0.2"))
+
+
+def n_deleted(manifest: dict):
+    return sum(end - start for start, end in manifest.get("deleted", []))
+
+
+def needs_compaction(manifest: dict, ratio: float = None):
+    ratio = COMPACT_RATIO if ratio is None else ratio
+    return manifest["n_chunks"] > 0 and n_deleted(manifest) / manifest["n_chunks"] > ratio
+
+
+def live_mask(manifest: dict):
+    """Bool mask of chunks not tombstoned, or None when nothing is deleted."""
+    if not manifest.get("deleted"):
+        return None
+    mask = np.ones(manifest["n_chunks"], dtype=bool)
+    for start, end in manifest["deleted"]:
+        mask[start:end] = False
+    return mask
+
+
+def _chunk_range(dir_path: str, manifest: dict, source: dict):
+    if "chunks" in source:
+        return source["chunks"]
+    # ingested before ranges were recorded: find them once through chunks.meta
+    ids = np.flatnonzero(read_meta(dir_path, manifest)[:, 0] == source["doc"])
+    return [int(ids[0]), int(ids[-1]) + 1] if len(ids) else None
+
+
+def _drop_sources(dir_path: str, manifest: dict, digests):
+    """(sources without `digests`, deleted ranges plus their chunks)."""
+    sources = dict(manifest["sources"])
+    deleted = [list(r) for r in manifest.get("deleted", [])]
+    for digest in digests:
+        source = sources.pop(digest)
+        chunk_range = _chunk_range(dir_path, manifest, source) if "doc" in source else None
+        if chunk_range and chunk_range[1] > chunk_range[0]:
+            deleted.append(chunk_range)
+    return sources, deleted
+
+
+def tombstone(dir_path: str, manifest: dict, digests):
+    """
+    Removes sources (by content hash) and tombstones their chunks in one
+    new generation. Cost is per deleted document, not per corpus chunk.
+    Returns the new manifest (already saved).
+    """
+    sources, deleted = _drop_sources(dir_path, manifest, digests)
+    manifest = dict(manifest, generation=manifest["generation"] + 1, sources=sources, deleted=deleted)
+    save_manifest(dir_path, manifest)
+    return manifest
+
+
+def store_files(dir_path: str, manifest: dict):
+    """Every file the manifest's generation reads (used to find garbage after a compaction)."""
+    prefix = files(manifest)
+    names = [prefix + n for n in (chunkstore.DATA_FILE, chunkstore.INDEX_FILE, chunkstore.META_FILE, VECTORS_FILE)]
+    for seg in manifest["segments"]:
+        names += [seg["name"] + ext for ext in (".terms.json", ".post", ".lens")]
+    if manifest.get("ivf"):
+        names += [manifest["ivf"]["name"] + ext for ext in IVF_FILES]
+    return [os.path.join(dir_path, n) for n in names]
+
+
+def compact(dir_path: str, manifest: dict):
+    """
+    Rewrites the store without tombstoned chunks: chunk text, metadata and
+    (copied, not re-embedded) vectors go to a fresh prefixed file set,
+    segments and the IVF index are rebuilt, source ranges are renumbered.
+    Readers keep using the old files until the new manifest is saved.
+    Returns (new manifest, paths of the old files that are now garbage).
+    """
+    keep = live_mask(manifest)
+    if keep is None:
+        return manifest, []
+
+    generation = manifest["generation"] + 1
+    prefix = f"c{generation:05d}-"
+    old_chunks = read_chunks(dir_path, manifest)
+    old_meta = read_meta(dir_path, manifest)
+    kept = np.flatnonzero(keep)
+
+    base = dict(empty_manifest(), generation=manifest["generation"], files=prefix)
+    writer = StoreWriter(dir_path, base)
+    for i in kept:
+        writer.add(old_chunks[int(i)], int(old_meta[i, 0]), int(old_meta[i, 1]))
+
+    # old id -> new id is the number of kept chunks before it; taking both
+    # bounds from it keeps empty ranges (files without text) empty and in range
+    kept_before = np.concatenate(([0], np.cumsum(keep)))
+    sources = {}
+    for digest, source in manifest["sources"].items():
+        source = dict(source)
+        if "chunks" in source:
+            start, end = source["chunks"]
+            source["chunks"] = [int(kept_before[start]), int(kept_before[end])]
+        sources[digest] = source
+
+    extra = {}
+    embedding = manifest.get("embedding")
+    n_vectors = min(manifest.get("n_vectors", 0), manifest["n_chunks"])
+    if embedding and n_vectors == manifest["n_chunks"]:
+        old_vectors = VectorIndex(dir_path, n_vectors, embedding["dim"], prefix=files(manifest)).matrix
+        vectors = VectorWriter(dir_path, 0, embedding["dim"], prefix)
+        for start in range(0, len(kept), 65536):
+            vectors.add(old_vectors[kept[start:start + 65536]])
+        vectors.close()
+        matrix = VectorIndex(dir_path, vectors.n_vectors, embedding["dim"], prefix=prefix).matrix
+        extra = {
+            "embedding": embedding,
+            "n_vectors": vectors.n_vectors,
+            "ivf": ann.update(dir_path, matrix, None, generation),
+        }
+    else:
+        # partial vectors get backfilled by the next ingest, from scratch
+        extra = {"embedding": None, "n_vectors": 0, "ivf": None}
+
+    new = writer.commit(sources, extra)
+    garbage = sorted(set(store_files(dir_path, manifest)) - set(store_files(dir_path, new)))
+    return new, garbage
+
+
+def next_doc(manifest: dict):
+    """First unused source "doc" number (chunks.meta refers to sources by it)."""
+    return max((s.get("doc", -1) for s in manifest["sources"].values()), default=-1) + 1
+
+
+def needs_migration(dir_path: str):
+    return os.path.exists(os.path.join(dir_path, LEGACY_FILE))
+
+
+def migrate_legacy(dir_path: str):
+    """
+    One-shot move of an old data.txt store onto the binary chunk store.
+    If a manifest already indexes those chunks only the text moves;
+    otherwise they are indexed as the first segment.
+    """
+    if not needs_migration(dir_path):
+        return load_manifest(dir_path)
+
+    file_path = os.path.join(dir_path, LEGACY_FILE)
+    with open(file_path, "r", encoding="utf-8") as f:
+        texts = f.read().split(SEPARATOR)
+
+    manifest = load_manifest(dir_path)
+
+    if manifest["segments"]:
+        # ids must line up with the existing segments, so keep empty chunks
+        texts = texts[:manifest["n_chunks"]]
+        chunkstore.append_chunks(dir_path, 0, texts)
+        manifest = dict(manifest, generation=manifest["generation"] + 1, n_chunks=len(texts))
+        save_manifest(dir_path, manifest)
+    else:
+        manifest = append_chunks(dir_path, empty_manifest(), [t for t in texts if t])
+
+    # the single rewrite-everything index the first layout kept next to data.txt
+    for name in ("index.json", "index.terms.json", "index.post", "index.lens"):
+        if os.path.exists(os.path.join(dir_path, name)):
+            os.remove(os.path.join(dir_path, name))
+
+    os.remove(file_path)
+    return manifest
@@ -0,0 +1,98 @@
+# app/vectors.py
+import os
+
+import numpy as np
+
+from app.ann import IVF_NPROBE, IVFIndex, search_rows, search_rows_many
+
+# one float32 row per chunk, row i = chunk i, no header (the manifest
+# records the dim and how many rows are committed)
+VECTORS_FILE = "vectors.f32"
+
+
+class VectorWriter:
+    """Appends embedding rows after the first `n_committed`, dropping any uncommitted tail."""
+
+    def __init__(self, dir_path: str, n_committed: int, dim: int, prefix: str = ""):
+        self.dim = dim
+        self.n_vectors = n_committed
+        self._file = open(os.path.join(dir_path, prefix + VECTORS_FILE), "a+b")
+        self._file.truncate(n_committed * dim * 4)
+
+    def add(self, matrix):
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        assert matrix.ndim == 2 and matrix.shape[1] == self.dim, matrix.shape
+        self._file.write(matrix.tobytes())
+        self.n_vectors += len(matrix)
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class VectorIndex:
+    """
+    Cosine search over a memmapped (n, dim) float32 matrix. Brute force is
+    one matrix-vector product plus argpartition; once the store has an IVF
+    index (`ivf` manifest entry) only the probed lists are scored.
+    """
+
+    def __init__(self, dir_path: str, n_vectors: int, dim: int, ivf: dict = None, prefix: str = ""):
+        self.dim = dim
+        path = os.path.join(dir_path, prefix + VECTORS_FILE)
+        available = os.path.getsize(path) // (dim * 4) if os.path.exists(path) else 0
+        n = min(n_vectors, available)
+        self.matrix = (
+            np.memmap(path, dtype=np.float32, mode="r", shape=(n, dim)) if n
+            else np.zeros((0, dim), dtype=np.float32)
+        )
+        self.ivf = IVFIndex(dir_path, ivf, self.matrix) if ivf and n else None
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def search(self, query_vector, k: int = 4, nprobe: int = IVF_NPROBE, exact: bool = False, ids=None, live=None):
+        """
+        Returns the top-k (score, row) pairs, best first. `ids` (sorted row
+        numbers) limits the search to those rows; only they are scored, so
+        it's for selective filters. `live` (bool mask over rows, e.g.
+        tombstones) keeps the normal IVF / brute-force path and just never
+        returns dead rows.
+        """
+        n = len(self.matrix)
+        if not n:
+            return []
+
+        if ids is not None:
+            return search_rows(self.matrix, np.asarray(ids, dtype=np.int64), query_vector, k)
+
+        if self.ivf is not None and not exact:
+            return self.ivf.search(query_vector, k, nprobe, live)
+
+        scores = self.matrix @ np.asarray(query_vector, dtype=np.float32)
+        if live is not None:
+            scores[~live] = -np.inf
+            n = int(np.count_nonzero(live))
+            if not n:
+                return []
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), int(i)) for i in top]
+
+    def search_many(self, query_matrix, k: int = 4, nprobe: int = IVF_NPROBE, exact: bool = False, ids=None,
+                    live=None):
+        """
+        search() for a (b, dim) matrix of queries: brute force and `ids`
+        scoring read the rows once for the whole batch (one matrix-matrix
+        product). IVF probes differ per query, so those run one by one.
+        """
+        queries = np.asarray(query_matrix, dtype=np.float32)
+        if not len(self.matrix):
+            return [[] for _ in queries]
+        if ids is not None:
+            return search_rows_many(self.matrix, np.asarray(ids, dtype=np.int64), queries, k)
+        if self.ivf is not None and not exact:
+            return [self.ivf.search(q, k, nprobe, live) for q in queries]
+        return search_rows_many(self.matrix, None, queries, k, live)
@@ -0,0 +1,76 @@
+# benchmarks/bench_ann.py
+"""
+IVF approximate search vs exact brute force: recall@k and QPS per nprobe.
+
+    python -m benchmarks.bench_ann [--vectors 200000] [--dim 384] [--k 10]
+
+Vectors are synthetic clustered unit rows (what real embeddings look like
+to k-means), queries are noisy copies of stored rows.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app import ann
+from app.embeddings import normalize
+from app.vectors import VectorIndex, VectorWriter
+
+
+def make_vectors(n, dim, centers=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.standard_normal((centers, dim)).astype(np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 50000):
+        m = min(50000, n - start)
+        rows = means[rng.integers(0, centers, m)] + 0.5 * rng.standard_normal((m, dim)).astype(np.float32)
+        out[start:start + m] = normalize(rows)
+    return out
+
+
+def run(index, queries, k, **kwargs):
+    results = []
+    start = time.perf_counter()
+    for q in queries:
+        results.append({row for _, row in index.search(q, k=k, **kwargs)})
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64")
+    args = parser.parse_args()
+
+    matrix = make_vectors(args.vectors, args.dim)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.vectors, args.queries, replace=False)
+    queries = normalize(matrix[picks] + 0.1 * rng.standard_normal((args.queries, args.dim)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = VectorWriter(tmp, 0, args.dim)
+        writer.add(matrix)
+        writer.close()
+        del matrix
+
+        ann.IVF_MIN_VECTORS = 0
+        start = time.perf_counter()
+        ivf = ann.update(tmp, VectorIndex(tmp, args.vectors, args.dim).matrix, None, generation=1)
+        print(f"trained nlist={ivf['nlist']} + assigned {args.vectors} rows in {time.perf_counter() - start:.1f}s")
+
+        index = VectorIndex(tmp, args.vectors, args.dim, ivf=ivf)
+        exact, qps = run(index, queries, args.k, exact=True)
+        print(f"exact            recall@{args.k}=1.000  qps={qps:8.1f}")
+
+        for nprobe in (int(x) for x in args.nprobe.split(",")):
+            found, qps = run(index, queries, args.k, nprobe=nprobe)
+            recall = sum(len(a & b) for a, b in zip(found, exact)) / (args.k * len(exact))
+            print(f"ivf nprobe={nprobe:<4}  recall@{args.k}={recall:.3f}  qps={qps:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
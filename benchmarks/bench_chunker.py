@@ -0,0 +1,128 @@
+# benchmarks/bench_chunker.py
+"""
+Native chunker vs the old RecursiveCharacterTextSplitter(1500, 300).
+
+    pip install -r requirements_bench.txt
+    python -m benchmarks.bench_chunker [--docs 50] [--pages 20]
+
+Pages look like pypdf output: a running header, a "Page N of M" footer,
+prose wrapped at ~90 columns with single newlines, a disclaimer paragraph
+on some pages and a few pages reprinted verbatim. Reports chunking time
+(also with near-duplicate detection off), the time to build a BM25
+segment from the chunks (what ingest does next), chunk count, total and
+mean chunk size, and how many chunks carry the header. Fails unless
+chunking (with dedup) plus indexing beats the old splitter.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import textwrap
+import time
+
+from app import chunker
+from app.index import write_segment
+from benchmarks.pdfgen import WORDS
+
+DISCLAIMER = (
+    "This document is provided for information only. The company makes no warranty as to the "
+    "accuracy of the procedures described and accepts no liability for damage caused by their use. "
+    "Always follow the safety instructions of the equipment manufacturer before starting any work."
+)
+
+
+def make_docs(n_docs, n_pages, seed=0):
+    rng = random.Random(seed)
+    docs = []
+    for d in range(n_docs):
+        pages = []
+        for p in range(n_pages):
+            if pages and rng.random() < 0.1:
+                body = rng.choice(pages).split("\n", 1)[1].rsplit("\n", 1)[0]  # reprinted page
+                pages.append(f"ACME Engineering - Manual {d}\n{body}\nPage {p + 1} of {n_pages}")
+                continue
+            sentences = [
+                " ".join(rng.choices(WORDS, k=rng.randint(8, 22))).capitalize() + "."
+                for _ in range(rng.randint(25, 40))
+            ]
+            paragraphs = [" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6)]
+            if rng.random() < 0.3:
+                paragraphs.insert(rng.randint(0, len(paragraphs)), DISCLAIMER)
+            body = "\n".join(textwrap.fill(para, 90) for para in paragraphs)
+            pages.append(f"ACME Engineering - Manual {d}\n{body}\nPage {p + 1} of {n_pages}")
+        docs.append(pages)
+    return docs
+
+
+def old_chunks(docs):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1500, chunk_overlap=300, separators=["\n\n\n", "\n\n", "\n", ". "]
+    )
+    return [c for pages in docs for text in pages for c in splitter.split_text(text)]
+
+
+def new_chunks(docs, dedup=True):
+    # same path as pipeline._ingest
+    out, deduper, dedup_doc = [], None, None
+    stream = ((d, p, text) for d, pages in enumerate(docs) for p, text in enumerate(pages))
+    for d, _, text in chunker.clean_pages(stream):
+        if not dedup:
+            out.extend(chunker.chunk_text(text))
+            continue
+        if d != dedup_doc:
+            deduper, dedup_doc = chunker.Deduper(), d
+        out.extend(c for c in chunker.chunk_text(text) if not deduper.seen(c))
+    return out
+
+
+def index_time(chunks):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_segment(tmp, "bench", chunks)
+        return time.perf_counter() - start
+
+
+def stats(name, chunking, index, chunks):
+    total = sum(map(len, chunks))
+    headers = sum("ACME Engineering" in c for c in chunks)
+    print(f"{name:7s} chunk {chunking * 1000:7.1f}ms  index {index * 1000:7.1f}ms  chunks={len(chunks):6d}  "
+          f"chars={total:9d}  mean={total / len(chunks):6.0f}  with header={headers}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs, args.pages)
+    print(f"{args.docs} docs x {args.pages} pages, {sum(len(t) for p in docs for t in p)} chars")
+    variants = {"old": old_chunks, "nodedup": lambda d: new_chunks(d, dedup=False), "new": new_chunks}
+    best = {name: [float("inf"), float("inf"), None] for name in variants}
+    totals = {name: [] for name in variants}
+    # the variants take turns, so a slow spell on a noisy machine hits a
+    # whole round; speedups are the median of the per-round ratios
+    for _ in range(args.runs):
+        for name, fn in variants.items():
+            start = time.perf_counter()
+            chunks = fn(docs)
+            chunking = time.perf_counter() - start
+            index = index_time(chunks)
+            best[name] = [min(best[name][0], chunking), min(best[name][1], index), chunks]
+            totals[name].append(chunking + index)
+    for name in variants:
+        stats(name, *best[name])
+
+    speedup = statistics.median(o / n for o, n in zip(totals["old"], totals["new"]))
+    dedup = statistics.median(o / n for o, n in zip(totals["nodedup"], totals["new"]))
+    print(f"chunk+index speedup {speedup:.2f}x (dedup on/off {dedup:.2f}x)  "
+          f"chunks {len(best['new'][2]) / len(best['old'][2]):.2f}x  "
+          f"chars {sum(map(len, best['new'][2])) / sum(map(len, best['old'][2])):.2f}x")
+    assert speedup > 1, f"chunk+index {speedup:.2f}x the old splitter's speed"
+
+
+if __name__ == "__main__":
+    main()
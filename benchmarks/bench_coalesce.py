@@ -0,0 +1,104 @@
+# benchmarks/bench_coalesce.py
+"""
+Bursty /query load with and without coalescing + micro-batched retrieval.
+
+    python -m benchmarks.bench_coalesce [--bursts 10] [--students 40] [--same 0.6] [--mode lexical]
+
+Every burst is a class asking at once: a `--same` share of the students
+send one question (in a few spellings that normalize alike), the rest
+their own. Bursts go through the ASGI app in-process with the stub LLM
+(--llm-latency). The answer cache is cleared between bursts, so repeats
+come from the burst itself, not from earlier ones. Reports LLM calls,
+CPU ms per query (process time, all threads) and wall time per burst,
+with both off, coalescing only, and coalescing + batching.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import httpx  # noqa: E402
+
+from app import main, pipeline, store  # noqa: E402
+from app.cache import answer_cache  # noqa: E402
+from app.llm import FakeLLM  # noqa: E402
+from benchmarks.pdfgen import WORDS  # noqa: E402
+
+
+def make_bursts(args, rng):
+    bursts = []
+    for b in range(args.bursts):
+        topic = " ".join(rng.sample(WORDS, 3))
+        spellings = [f"What is {topic}? ({b})", f"what is {topic} ({b})", f"WHAT IS {topic.upper()} ({b})"]
+        same = int(args.students * args.same)
+        queries = [spellings[i % len(spellings)] for i in range(same)]
+        queries += [" ".join(rng.sample(WORDS, 3)) + f" {b}-{i}" for i in range(args.students - same)]
+        rng.shuffle(queries)
+        bursts.append(queries)
+    return bursts
+
+
+async def run(bursts, mode):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        walls = []
+        for queries in bursts:
+            answer_cache.clear()
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *(client.post("/query", json={"query": q, "retriever": mode}) for q in queries)
+            )
+            walls.append(time.perf_counter() - start)
+            assert all(r.status_code == 200 for r in responses)
+        return walls
+
+
+def measure(name, bursts, args, coalesce, batch):
+    pipeline.COALESCE_QUERIES = coalesce
+    pipeline.retrieval_batcher.max_size = batch
+    pipeline.llm = FakeLLM(latency=args.llm_latency)
+    batches, items = pipeline.retrieval_batcher.batches, pipeline.retrieval_batcher.items
+
+    cpu = time.process_time()
+    walls = asyncio.run(run(bursts, args.mode))
+    cpu = time.process_time() - cpu
+
+    n = sum(map(len, bursts))
+    batches = pipeline.retrieval_batcher.batches - batches
+    items = pipeline.retrieval_batcher.items - items
+    print(f"{name:9s} queries={n}  llm calls={pipeline.llm.calls:5d}  retrievals={items:5d} in {batches:5d} batches  "
+          f"cpu/query={cpu / n * 1000:6.2f}ms  burst wall={sum(walls) / len(walls) * 1000:7.1f}ms")
+    return pipeline.llm.calls, cpu / n
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--same", type=float, default=0.6)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--mode", default="lexical", choices=pipeline.RETRIEVERS)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline.DB_PATH = tmp
+        texts = [" ".join(rng.choices(WORDS, k=120)) for _ in range(args.chunks)]
+        store.append_chunks(pipeline.collection_path(), store.empty_manifest(), texts, embedder=pipeline.embedder)
+        bursts = make_bursts(args, rng)
+
+        pipeline.retrieve("warm up", args.mode)
+        off = measure("off", bursts, args, coalesce=False, batch=1)
+        measure("coalesce", bursts, args, coalesce=True, batch=1)
+        on = measure("both", bursts, args, coalesce=True, batch=args.batch)
+        print(f"llm calls {on[0] / off[0]:.2f}x  cpu/query {on[1] / off[1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main_()
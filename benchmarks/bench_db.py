@@ -0,0 +1,109 @@
+# benchmarks/bench_db.py
+"""
+Metadata DB ops/sec: the old connect-per-call access vs the pooled WAL layer.
+
+    python -m benchmarks.bench_db [--ops 2000] [--threads 8]
+
+"naive" reproduces what app/db.py did before the pool: open, run one
+statement, commit, close (default rollback journal).
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app import db
+
+
+# ---------------- OLD ACCESS PATTERN ----------------
+def naive_add(path, filename):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT OR IGNORE INTO documents (filename, collection) VALUES (?, 'default')", (filename,))
+    conn.commit()
+    conn.close()
+
+
+def naive_list(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT id, filename, collection, uploaded_at FROM documents ORDER BY id DESC").fetchall()
+    conn.close()
+    return rows
+
+
+def rate(n, seconds):
+    return f"{n / seconds:10.0f} ops/s"
+
+
+def threaded(fn, threads, per_thread):
+    errors = []
+
+    def run(t):
+        for i in range(per_thread):
+            try:
+                fn(t, i)
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("naive", "pooled"):
+            db.DB_PATH = os.path.join(tmp, f"{label}.db")
+            db.DATA_DIR = tmp
+            db.init_db()
+            if label == "naive":
+                db.get_pool().close()
+                conn = sqlite3.connect(db.DB_PATH)
+                conn.execute("PRAGMA journal_mode=DELETE")
+                conn.close()
+                add = lambda name: naive_add(db.DB_PATH, name)  # noqa: E731
+                listing = lambda: naive_list(db.DB_PATH)  # noqa: E731
+            else:
+                add = db.add_document
+                listing = lambda: db.get_all_documents()  # noqa: E731
+
+            start = time.perf_counter()
+            for i in range(args.ops):
+                add(f"single-{i}.pdf")
+            print(f"{label:7} add one at a time        {rate(args.ops, time.perf_counter() - start)}")
+
+            names = [f"batch-{i}.pdf" for i in range(args.ops)]
+            start = time.perf_counter()
+            if label == "naive":
+                for name in names:
+                    add(name)
+            else:
+                db.add_documents(names)
+            print(f"{label:7} add a {args.ops}-file upload    {rate(args.ops, time.perf_counter() - start)}")
+
+            start = time.perf_counter()
+            for _ in range(200):
+                listing()
+            # naive reads every row; pooled reads one indexed page
+            print(f"{label:7} list documents           {rate(200, time.perf_counter() - start)}")
+
+            per_thread = args.ops // args.threads
+            seconds, errors = threaded(lambda t, i: add(f"t{t}-{i}.pdf"), args.threads, per_thread)
+            print(f"{label:7} {args.threads} concurrent writers     "
+                  f"{rate(per_thread * args.threads, seconds)}  locked errors={errors}")
+
+            db.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
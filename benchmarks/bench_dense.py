@@ -0,0 +1,64 @@
+# benchmarks/bench_dense.py
+"""
+Brute-force NumPy dense search vs the old query_rag scoring loop.
+
+    python -m benchmarks.bench_dense [--chunks 100000] [--dim 384] [--queries 50]
+
+Chunks are synthetic; vectors come from the offline HashingEmbedder so
+nothing is downloaded.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.embeddings import HashingEmbedder
+from app.vectors import VectorIndex, VectorWriter
+from benchmarks.bench_index import linear_scan, make_chunks, percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, words_per_chunk=120)
+    queries = [" ".join(c.split()[:3]) for c in chunks[: args.queries]]
+    embedder = HashingEmbedder(dim=args.dim)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        writer = VectorWriter(tmp, 0, args.dim)
+        for i in range(0, len(chunks), args.batch):
+            writer.add(embedder.embed(chunks[i:i + args.batch]))
+        writer.close()
+        embed_s = time.perf_counter() - start
+        print(f"embedded {args.chunks} chunks in {embed_s:.1f}s ({args.chunks / embed_s:.0f} chunks/s), "
+              f"{os.path.getsize(os.path.join(tmp, 'vectors.f32')) / 2**20:.0f}MB")
+
+        index = VectorIndex(tmp, args.chunks, args.dim)
+        qvecs = embedder.embed(queries)
+        index.search(qvecs[0])  # fault the pages in once
+
+        samples = []
+        for q in qvecs:
+            start = time.perf_counter()
+            index.search(q, k=4)
+            samples.append(time.perf_counter() - start)
+        p50, p99 = percentiles(samples)
+        print(f"numpy dense   p50={p50:8.2f}ms  p99={p99:8.2f}ms")
+
+        samples = []
+        for q in queries[:10]:
+            start = time.perf_counter()
+            linear_scan(chunks, q)
+            samples.append(time.perf_counter() - start)
+        p50, p99 = percentiles(samples)
+        print(f"query_rag loop p50={p50:8.2f}ms  p99={p99:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_index.py
+"""
+Query latency of the BM25 inverted index vs the old linear scan.
+
+    python -m benchmarks.bench_index [--sizes 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from app.index import Segment, bm25_search, write_segment
+
+VOCAB = [f"term{i}" for i in range(20000)]
+
+
+def make_chunks(n, words_per_chunk=200, seed=0):
+    rng = random.Random(seed)
+    # zipf-ish vocabulary so a few terms are common and most are rare
+    weights = [1 / (i + 1) for i in range(len(VOCAB))]
+    return [" ".join(rng.choices(VOCAB, weights, k=words_per_chunk)) for _ in range(n)]
+
+
+def linear_scan(chunks, query):
+    # the scoring loop query_rag used before the index
+    stopwords = {"what", "is", "the", "of", "in", "a", "an"}
+    words = [w for w in query.lower().split() if w not in stopwords]
+    scored = []
+    for i, chunk in enumerate(chunks):
+        chunk_lower = chunk.lower()
+        score = sum(5 for w in words if w in chunk_lower)
+        if query.lower() in chunk_lower:
+            score += 10
+        scored.append((score, i))
+    scored.sort(reverse=True)
+    return scored[:4]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return p50 * 1000, p99 * 1000
+
+
+def timed(fn, queries):
+    out = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--skip-scan", action="store_true", help="don't time the old linear scan")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+
+    for n in args.sizes:
+        chunks = make_chunks(n)
+        queries = [" ".join(rng.sample(VOCAB[:5000], 3)) for _ in range(args.queries)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            meta = write_segment(tmp, "bench", chunks)
+            build_s = time.perf_counter() - start
+            seg = Segment(tmp, meta)
+
+            p50, p99 = percentiles(timed(lambda q: bm25_search([seg], q, k=4), queries))
+            print(f"{n:>7} chunks  bm25   p50={p50:8.2f}ms  p99={p99:8.2f}ms  (build {build_s:.1f}s)")
+
+        if not args.skip_scan:
+            p50, p99 = percentiles(timed(lambda q: linear_scan(chunks, q), queries[:20]))
+            print(f"{n:>7} chunks  scan   p50={p50:8.2f}ms  p99={p99:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_llm_concurrency.py
+"""
+N concurrent /query calls against a stub LLM with fixed latency.
+
+    python -m benchmarks.bench_llm_concurrency [--concurrency 20] [--latency 0.5]
+
+With the async path all N calls overlap and finish in about one LLM
+latency; the old sync `llm.invoke` inside the handler serialises them
+into about N latencies.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import httpx  # noqa: E402
+
+from app import main, pipeline, store  # noqa: E402
+from app.cache import answer_cache  # noqa: E402
+from app.llm import FakeLLM  # noqa: E402
+
+
+async def burst(app, n):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client.post("/query", json={"query": f"retrieval {i}"}) for i in range(n)))
+        return time.perf_counter() - start
+
+
+async def sync_burst(n):
+    # what the handler used to do: a blocking call on the event loop
+    async def one(i):
+        return pipeline.query_rag(f"retrieval {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - start
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline.DB_PATH = tmp
+        store.append_chunks(tmp, store.empty_manifest(), [f"retrieval chunk {i}" for i in range(100)])
+        pipeline.llm = FakeLLM(latency=args.latency)
+
+        # both runs ask the same questions; clear the answer cache (and its
+        # SQLite copy) before each, or the second run is all cache hits
+        for name, run in (("async", lambda: burst(main.app, args.concurrency)),
+                          ("sync", lambda: sync_burst(args.concurrency))):
+            answer_cache.clear()
+            calls = pipeline.llm.calls
+            elapsed = asyncio.run(run())
+            calls = pipeline.llm.calls - calls
+            assert calls == args.concurrency, f"{name}: {calls} LLM calls for {args.concurrency} queries"
+            print(f"{name:6s} {args.concurrency} queries in {elapsed:.2f}s  (~{elapsed / args.latency:.1f}x latency)  "
+                  f"llm calls {calls}")
+
+
+if __name__ == "__main__":
+    main_()
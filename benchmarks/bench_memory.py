@@ -0,0 +1,45 @@
+# benchmarks/bench_memory.py
+"""
+Peak traced memory of process_and_store_docs for growing uploads.
+
+    python -m benchmarks.bench_memory [--files 5 20 80] [--pages 20]
+
+Parsing runs in-process (INGEST_WORKERS=1) so tracemalloc sees it. With
+the streaming pipeline the peak should stay roughly flat as the upload
+grows instead of scaling with it; the window is one index segment
+(SEGMENT_CHUNKS chunks), so lower it to see the plateau on small runs.
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("INGEST_WORKERS", "1")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+from app import pipeline  # noqa: E402
+from benchmarks.pdfgen import write_corpus  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, nargs="+", default=[5, 20, 80])
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    for n_files in args.files:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_corpus(os.path.join(tmp, "pdfs"), n_files, args.pages)
+            upload_mb = sum(os.path.getsize(p) for p in paths) / 2**20
+            pipeline.DB_PATH = os.path.join(tmp, "vectorstore")
+
+            tracemalloc.start()
+            pipeline.process_and_store_docs(paths)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{n_files:>4} files  upload={upload_mb:7.1f}MB  peak={peak / 2**20:7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
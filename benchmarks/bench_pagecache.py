@@ -0,0 +1,76 @@
+# benchmarks/bench_pagecache.py
+"""
+Ingest time with and without the page-text extraction cache.
+
+    python -m benchmarks.bench_pagecache [--files 20] [--pages 20] [--workers 1] [--runs 3]
+
+Every run ingests the same PDFs into a fresh collection, i.e. what
+re-processing costs (another collection, after a delete, or a rebuild
+with new chunk settings). "off" always parses; "store" is the first
+ingest with the cache on (parse + write the cache); "hit" reads every
+file's pages from the cache. Reports the whole ingest (parse, chunk,
+index) and the parse stage alone, median of --runs. The generated PDFs
+are simple text, so parsing real documents costs more and the speedup
+is a lower bound.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from app import db, loader, pipeline
+from app.pagecache import PageCache
+from benchmarks.pdfgen import write_corpus
+
+
+def ingest(paths, collection):
+    start = time.perf_counter()
+    report = pipeline.process_and_store_docs(paths, collection=collection)
+    elapsed = time.perf_counter() - start
+    assert not any(r["error"] for r in report), report
+    return elapsed, sum(r["seconds"] for r in report), report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    loader.INGEST_WORKERS = args.workers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline.DB_PATH = os.path.join(tmp, "vs")
+        db.DB_PATH, db.DATA_DIR = os.path.join(tmp, "metadata.db"), tmp
+        paths = write_corpus(os.path.join(tmp, "pdfs"), args.files, args.pages)
+        pdf_bytes = sum(os.path.getsize(p) for p in paths)
+        cache_dir = os.path.join(tmp, "page_cache")
+        runs = iter(range(10_000))
+
+        def measure(name, cache_bytes, clear):
+            samples = []
+            for _ in range(args.runs):
+                if clear:
+                    for f in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+                        os.remove(os.path.join(cache_dir, f))
+                pipeline.page_cache = lambda: PageCache(cache_dir, cache_bytes)
+                samples.append(ingest(paths, f"run-{next(runs)}"))
+            total = statistics.median(s[0] for s in samples)
+            parse = statistics.median(s[1] for s in samples)
+            cached = sum(r["cached"] for r in samples[-1][2])
+            print(f"{name:6s} ingest {total * 1000:8.1f}ms  parse {parse * 1000:8.1f}ms  cached files {cached}/{len(paths)}")
+            return total
+
+        off = measure("off", 0, clear=True)
+        measure("store", 512 * 1024 * 1024, clear=True)
+        hit = measure("hit", 512 * 1024 * 1024, clear=False)
+
+        size = PageCache(cache_dir).stats()["size_bytes"]
+        print(f"{args.files} files x {args.pages} pages: cache-hit ingest x{off / hit:.2f} faster; "
+              f"cache {size / 1024:.0f}KB for {pdf_bytes / 1024:.0f}KB of PDFs")
+
+
+if __name__ == "__main__":
+    main()
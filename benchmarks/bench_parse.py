@@ -0,0 +1,42 @@
+# benchmarks/bench_parse.py
+"""
+Parsing throughput of app.loader.load_pdfs with 1..N worker processes.
+
+    python -m benchmarks.bench_parse [--files 50] [--pages 20] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.loader import load_pdfs
+from benchmarks.pdfgen import write_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_corpus(tmp, args.files, args.pages)
+        total_pages = args.files * args.pages
+        baseline = None
+
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            pages, report = load_pdfs(paths, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            assert sum(len(p) for p in pages) == total_pages, [r for r in report if r["error"]]
+            baseline = baseline or elapsed
+            print(
+                f"workers={workers:<3} {elapsed:7.2f}s  {total_pages / elapsed:8.1f} pages/s  "
+                f"speedup x{baseline / elapsed:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost: import time (`python -X importtime`) and baseline RSS.
+
+    python -m benchmarks.bench_startup [--runs 5] [--out startup.json]
+    python -m benchmarks.bench_startup --max-import-ms 1500 --max-rss-mb 150   # CI gate
+
+Every run is a fresh interpreter importing the target the way it starts
+in production: `app.pipeline` (what deploy_app.py imports on each
+Streamlit cold boot) and `app.main` (uvicorn). The "+warm_up" row also
+calls pipeline.warm_up(), i.e. pays the deferred work (LLM client, PDF
+parser, embedder, indexes) that used to happen at import. Reports the
+median import ms, process wall ms and RSS after startup, plus the
+slowest imports by self time. With --max-* budgets the exit code is 1
+when a target (not the +warm_up row) goes over.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+PROBE = """
+import time
+started = time.perf_counter()
+import {module}
+{extra}
+elapsed = time.perf_counter() - started
+rss = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) / 1024
+print(json.dumps({{"wall_ms": elapsed * 1000, "rss_mb": rss}}))
+"""
+
+TARGETS = {
+    "app.pipeline": ("app.pipeline", ""),
+    "app.main": ("app.main", ""),
+    "app.pipeline+warm_up": ("app.pipeline", "app.pipeline.warm_up()"),
+}
+
+
+def run_once(module, extra, env):
+    code = "import json\n" + PROBE.format(module=module, extra=extra)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    self_us, total_us = {}, 0
+    for line in proc.stderr.splitlines():
+        m = IMPORT_RE.match(line)
+        if not m:
+            continue
+        self_us[m.group(4)] = int(m.group(1))
+        if len(m.group(3)) == 1:  # top level: cumulative times add up to the whole import
+            total_us += int(m.group(2))
+    result["import_ms"] = total_us / 1000
+    return result, self_us
+
+
+def measure(name, runs, env):
+    module, extra = TARGETS[name]
+    samples, slowest = [], {}
+    for _ in range(runs):
+        result, self_us = run_once(module, extra, env)
+        samples.append(result)
+        for mod, us in self_us.items():
+            slowest[mod] = min(slowest.get(mod, us), us)
+    return {
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "wall_ms": round(statistics.median(s["wall_ms"] for s in samples), 1),
+        "rss_mb": round(statistics.median(s["rss_mb"] for s in samples), 1),
+        "slowest": {mod: round(us / 1000, 1) for mod, us in sorted(slowest.items(), key=lambda x: -x[1])[:5]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--out")
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-rss-mb", type=float)
+    args = parser.parse_args()
+
+    # a real provider without a key: imports must not need it
+    env = {k: v for k, v in os.environ.items() if k != "GROQ_API_KEY"}
+    env.update(PYTHONPATH=ROOT, LLM_PROVIDER="groq", LOG_LEVEL="ERROR")
+    run_once("app.main", "", env)  # compile .pyc files first, outside the numbers
+
+    results, failed = {}, []
+    for name in args.targets:
+        results[name] = r = measure(name, args.runs, env)
+        print(f"{name:22s} import {r['import_ms']:8.1f}ms  wall {r['wall_ms']:8.1f}ms  rss {r['rss_mb']:6.1f}MB  "
+              f"slowest: {', '.join(f'{m} {ms}ms' for m, ms in list(r['slowest'].items())[:3])}")
+        if name.endswith("+warm_up"):
+            continue
+        if args.max_import_ms is not None and r["import_ms"] > args.max_import_ms:
+            failed.append(f"{name} import {r['import_ms']}ms > {args.max_import_ms}ms")
+        if args.max_rss_mb is not None and r["rss_mb"] > args.max_rss_mb:
+            failed.append(f"{name} rss {r['rss_mb']}MB > {args.max_rss_mb}MB")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"python": sys.version.split()[0], "runs": args.runs, "results": results}, f, indent=2)
+    for message in failed:
+        print("over budget:", message)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# benchmarks/bench_suite.py
+"""
+Reproducible offline end-to-end benchmark: ingest + query, as JSON.
+
+    python -m benchmarks.bench_suite [--sizes small medium] [--out results.json]
+    python -m benchmarks.bench_suite --compare before.json after.json
+
+For each corpus size a synthetic PDF corpus (fixed seed) is generated and
+run in a fresh process so peak RSS is per size:
+
+- ingest: process_and_store_docs over the corpus → pages/sec, chunks/sec
+- query: sequential /query calls through TestClient → p50/p95/p99
+- load: `--concurrency` clients hammering /query over ASGI → QPS, p50/p95/p99
+
+The LLM is the offline stub (LLM_PROVIDER=fake) with `--llm-latency`, so
+numbers measure this code, not Groq. --compare prints the change of every
+metric between two result files (+ is better for rates, - for times).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+# files x pages per file
+SIZES = {"small": (10, 10), "medium": (40, 25), "large": (160, 25)}
+QUERY_WORDS = "retrieval index vector chunk latency memory cache segment protein energy".split()
+
+
+def percentiles(samples_ms):
+    samples = sorted(samples_ms)
+    if not samples:
+        return {}
+
+    def at(q):
+        return round(samples[min(len(samples) - 1, int(len(samples) * q))], 3)
+
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(samples[-1], 3)}
+
+
+def make_queries(n, seed):
+    import random
+
+    rng = random.Random(seed)
+    # distinct queries so the answer cache doesn't turn this into a cache benchmark
+    return [" ".join(rng.sample(QUERY_WORDS, 3)) + f" {i}" for i in range(n)]
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def _load(app, queries, concurrency):
+    import asyncio
+
+    import httpx
+
+    latencies, failed = [], 0
+    pending = iter(queries)
+
+    async def worker(client):
+        nonlocal failed
+        for query in pending:
+            start = time.perf_counter()
+            res = await client.post("/query", json={"query": query})
+            latencies.append((time.perf_counter() - start) * 1000)
+            failed += res.status_code != 200
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, failed, elapsed
+
+
+def run_size(name, files, pages, args):
+    """One corpus size, end to end; runs in its own process."""
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    from app import db, main, pipeline
+    from app.llm import FakeLLM
+    from benchmarks.pdfgen import write_corpus
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline.DB_PATH = os.path.join(tmp, "vectorstore")
+        main.UPLOAD_PATH = os.path.join(tmp, "uploads")
+        db.DB_PATH, db.DATA_DIR = os.path.join(tmp, "metadata.db"), tmp
+        pipeline.llm = FakeLLM(latency=args.llm_latency, token_delay=0)
+
+        paths = write_corpus(os.path.join(tmp, "corpus"), files, pages, seed=args.seed)
+        corpus_mb = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+
+        start = time.perf_counter()
+        report = pipeline.process_and_store_docs(paths)
+        ingest_s = time.perf_counter() - start
+        n_pages = sum(entry["pages"] for entry in report)
+        n_chunks = pipeline.get_manifest()["n_chunks"]
+
+        client = TestClient(main.app)
+        client.post("/query", json={"query": "warm up"})  # opens the index once
+        sequential = []
+        for query in make_queries(args.queries, args.seed):
+            start = time.perf_counter()
+            client.post("/query", json={"query": query})
+            sequential.append((time.perf_counter() - start) * 1000)
+
+        latencies, failed, elapsed = asyncio.run(
+            _load(main.app, make_queries(args.load_queries, args.seed + 1), args.concurrency)
+        )
+
+    return {
+        "size": name,
+        "files": files,
+        "pages": n_pages,
+        "chunks": n_chunks,
+        "corpus_mb": round(corpus_mb, 2),
+        "ingest": {
+            "seconds": round(ingest_s, 3),
+            "pages_per_sec": round(n_pages / ingest_s, 1),
+            "chunks_per_sec": round(n_chunks / ingest_s, 1),
+        },
+        "query": {"n": len(sequential), **percentiles(sequential)},
+        "load": {
+            "n": len(latencies),
+            "concurrency": args.concurrency,
+            "failed": failed,
+            "qps": round(len(latencies) / elapsed, 1),
+            **percentiles(latencies),
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ---------------- COMPARE ----------------
+def _flatten(result, prefix=""):
+    for key, value in result.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {r["size"]: dict(_flatten(r)) for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = {r["size"]: dict(_flatten(r)) for r in json.load(f)["results"]}
+
+    for size in before.keys() & after.keys():
+        print(f"== {size}")
+        for key, old in before[size].items():
+            new = after[size].get(key)
+            if new is None or not old:
+                continue
+            print(f"  {key:24s} {old:12.2f} -> {new:12.2f}  ({(new - old) / old * 100:+6.1f}%)")
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--load-queries", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for name in args.sizes:
+        files, pages = SIZES[name]
+        # a fresh interpreter per size: peak RSS and caches don't carry over
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            results.append(pool.submit(run_size, name, files, pages, args).result())
+        print(f"{name}: done", file=sys.stderr)
+
+    out = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+    text = json.dumps(out, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,70 @@
+# benchmarks/bench_upload_load.py
+"""
+/query latency while /upload jobs run in the background.
+
+    python -m benchmarks.bench_upload_load [--queries 200] [--files 20] [--pages 20]
+
+Runs offline: the LLM is replaced with a stub that answers instantly.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main, pipeline  # noqa: E402
+from app.llm import FakeLLM  # noqa: E402
+from benchmarks.pdfgen import write_corpus  # noqa: E402
+
+
+def query_latencies(client, n):
+    out = []
+    for i in range(n):
+        start = time.perf_counter()
+        client.post("/query", json={"query": f"retrieval index latency {i}"})
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def summary(samples):
+    samples = sorted(samples)
+    return f"p50={statistics.median(samples):7.2f}ms  p99={samples[int(len(samples) * 0.99) - 1]:7.2f}ms"
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline.DB_PATH = os.path.join(tmp, "vectorstore")
+        main.UPLOAD_PATH = os.path.join(tmp, "uploads")
+        os.makedirs(main.UPLOAD_PATH)
+        pipeline.llm = FakeLLM(latency=0)
+        client = TestClient(main.app)
+
+        # a small corpus so queries have something to retrieve
+        pipeline.process_and_store_docs(write_corpus(os.path.join(tmp, "seed"), 5, 10, seed=1))
+        print("idle       ", summary(query_latencies(client, args.queries)))
+
+        paths = write_corpus(os.path.join(tmp, "load"), args.files, args.pages, seed=2)
+        job_ids = []
+        for path in paths:
+            with open(path, "rb") as f:
+                res = client.post("/upload", files={"files": (os.path.basename(path), f, "application/pdf")})
+            job_ids.append(res.json()["job_id"])
+
+        print("uploading  ", summary(query_latencies(client, args.queries)))
+
+        while any(client.get(f"/jobs/{j}").json()["status"] not in ("done", "failed") for j in job_ids):
+            time.sleep(0.1)
+
+
+if __name__ == "__main__":
+    main_()
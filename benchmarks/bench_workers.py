@@ -0,0 +1,134 @@
+# benchmarks/bench_workers.py
+"""
+/query QPS of a real uvicorn server with 1..N worker processes sharing one store.
+
+    python -m benchmarks.bench_workers [--workers 1 2 4] [--seconds 10] [--concurrency 32]
+
+Every run seeds a store from a synthetic corpus, starts
+`uvicorn --workers N` on it and drives /query over HTTP. Halfway through,
+more PDFs are uploaded, so a new generation is published while workers
+are serving: "errors" counts non-200s and "Backend error" answers (a
+worker reading a half-written index would show up there), "chunks" the
+store size before and after. The stub LLM answers after --llm-latency
+seconds. QPS only scales up to the number of CPU cores.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+import httpx  # noqa: E402
+
+from app import db, pipeline  # noqa: E402
+from benchmarks.pdfgen import write_corpus  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(base, timeout=60):
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient(base_url=base) as client:
+        while time.time() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def drive(base, seconds, concurrency, upload_paths):
+    stop = time.perf_counter() + seconds
+    done, errors = 0, 0
+
+    async def worker(client, i):
+        nonlocal done, errors
+        n = 0
+        while time.perf_counter() < stop:
+            n += 1
+            res = await client.post("/query", json={"query": f"retrieval index latency {i} {n}"})
+            done += 1
+            if res.status_code != 200 or res.json()["answer"].startswith("Backend error"):
+                errors += 1
+
+    async def uploader(client):
+        await asyncio.sleep(seconds / 2)
+        files = [("files", (os.path.basename(p), open(p, "rb"), "application/pdf")) for p in upload_paths]
+        try:
+            job_id = (await client.post("/upload", files=files)).json()["job_id"]
+        finally:
+            for _, (_, f, _) in files:
+                f.close()
+        while (await client.get(f"/jobs/{job_id}")).json()["status"] not in ("done", "failed"):
+            await asyncio.sleep(0.1)
+
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(uploader(client), *(worker(client, i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return done, errors, elapsed
+
+
+def run(workers, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        # same relative layout the server sees from cwd=tmp
+        pipeline.DB_PATH = os.path.join(tmp, "vectorstore")
+        db.DATA_DIR = os.path.join(tmp, "data")
+        db.DB_PATH = os.path.join(db.DATA_DIR, "metadata.db")
+        pipeline.process_and_store_docs(write_corpus(os.path.join(tmp, "seed"), args.files, args.pages, seed=1))
+        before = pipeline.get_manifest()["n_chunks"]
+        upload_paths = write_corpus(os.path.join(tmp, "more"), 4, args.pages, seed=2)
+
+        port = free_port()
+        env = dict(
+            os.environ, PYTHONPATH=ROOT, WEB_CONCURRENCY=str(workers), LOG_LEVEL="WARNING",
+            FAKE_LLM_LATENCY=str(args.llm_latency),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers)],
+            cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base))
+            done, errors, elapsed = asyncio.run(drive(base, args.seconds, args.concurrency, upload_paths))
+            after = pipeline.get_manifest()["n_chunks"]
+        finally:
+            server.terminate()
+            server.wait()
+    return done / elapsed, errors, (before, after)
+
+
+def main_():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"cpus: {os.cpu_count()}")
+    base_qps = None
+    for workers in args.workers:
+        qps, errors, (before, after) = run(workers, args)
+        base_qps = base_qps or qps
+        print(f"workers={workers:2d}  qps={qps:8.1f}  ({qps / base_qps:4.2f}x)  errors={errors}  chunks={before}->{after}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,70 @@
+# benchmarks/pdfgen.py
+"""Writes small but valid text PDFs without any third-party dependency."""
+import random
+
+WORDS = (
+    "retrieval augmented generation index query vector chunk token model "
+    "document page context answer latency memory cache segment posting "
+    "embedding cluster network protocol kernel process thread scheduler "
+    "photosynthesis mitochondria enzyme protein molecule reaction energy"
+).split()
+
+
+def _escape(text: str):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def random_lines(rng, n_lines=45, words_per_line=12):
+    return [" ".join(rng.choices(WORDS, k=words_per_line)) for _ in range(n_lines)]
+
+
+def write_pdf(path: str, pages):
+    """`pages` is a list of pages, each a list of text lines."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+
+    for lines in pages:
+        body = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({_escape(l)}) '" for l in lines) + " ET"
+        stream = body.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_corpus(dir_path: str, n_files: int, pages_per_file: int, seed: int = 0):
+    import os
+
+    os.makedirs(dir_path, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n_files):
+        path = os.path.join(dir_path, f"doc_{i:04d}.pdf")
+        write_pdf(path, [random_lines(rng) for _ in range(pages_per_file)])
+        paths.append(path)
+    return paths
@@ -3,7 +3,9 @@ import requests
 import time
 from datetime import datetime
 import os
-from app import db, pipeline
+import shutil
+import threading
+from app import db, pipeline, store
 
 st.set_page_config(
     page_title="IntelliDoc AI",
@@ -43,7 +45,9 @@ def initialize_backend():
     os.makedirs("data/chroma_db", exist_ok=True)
     # Initialize the metadata database
     db.init_db()
-    # The pipeline will be initialized automatically when its functions are called
+    # LLM client, PDF parser and indexes load in the background, so the
+    # page renders right away and the first question doesn't pay for them
+    threading.Thread(target=pipeline.warm_up, name="warm-up", daemon=True).start()
     return True
 
 backend_ready = initialize_backend()
@@ -87,21 +91,32 @@ with st.sidebar:
     st.header("Upload Documents")
     active_chat = st.session_state.conversations.get(st.session_state.active_chat_id, {})
     
+    # each conversation searches its own collection
+    if active_chat:
+        active_chat["collection"] = st.text_input(
+            "Collection", value=active_chat.get("collection", "default"), key=f"collection_{st.session_state.active_chat_id}"
+        )
+    collection = active_chat.get("collection", "default")
+
     uploaded_files = st.file_uploader("Upload PDFs", type="pdf", accept_multiple_files=True, label_visibility="collapsed", key=f"uploader_{st.session_state.active_chat_id}")
 
-    if uploaded_files:
+    if uploaded_files and not store.valid_collection(collection):
+        st.error("Collection names are letters, digits, '_' or '-' (max 64).")
+    elif uploaded_files:
         if st.button("Process Documents", use_container_width=True, type="primary"):
             with st.spinner("Analyzing documents..."):
                 saved_files = []
+                upload_dir = os.path.join("data/uploads", collection)
+                os.makedirs(upload_dir, exist_ok=True)
                 for file in uploaded_files:
-                    file_path = os.path.join("data/uploads", file.name)
+                    file_path = os.path.join(upload_dir, file.name)
                     with open(file_path, "wb") as f:
-                        f.write(file.getvalue())
+                        file.seek(0)
+                        shutil.copyfileobj(file, f, 1024 * 1024)
                     saved_files.append(file_path)
-                    db.add_document(file.name)
                 
-                # Direct call to the pipeline function
-                pipeline.process_and_store_docs(saved_files)
+                # Direct call to the pipeline function (it records the documents too)
+                pipeline.process_and_store_docs(saved_files, collection=collection)
                 
                 active_chat["docs_are_processed"] = True
                 active_chat["messages"] = [{"role": "assistant", "content": "Documents are ready! How can I help you?"}]
@@ -134,7 +149,7 @@ with st.sidebar:
             # Yeh date ko aache format mein dikhane ke liye hai
                 dt_object = datetime.fromisoformat(doc['uploaded_at'].replace('Z', '+00:00'))
                 formatted_date = dt_object.strftime('%b %d, %Y - %I:%M %p')
-                st.info(f"**File:** `{doc['filename']}`\n\n**Uploaded:** {formatted_date}")
+                st.info(f"**File:** `{doc['filename']}` ({doc.get('collection', 'default')})\n\n**Uploaded:** {formatted_date}")
             except (ValueError, KeyError):
                 st.info(f"**File:** `{doc.get('filename', 'N/A')}`")
 
@@ -164,11 +179,10 @@ else:
             message_placeholder = st.empty()
             full_response = ""
             with st.spinner("Thinking..."):
-                # Direct call to the pipeline function
-                result = pipeline.query_rag(prompt)
-                answer = result.get("answer", "I couldn't find an answer.")
-                for chunk in answer.split():
-                    full_response += chunk + " "; time.sleep(0.05)
+                # Direct call to the pipeline, rendering tokens as the LLM produces them
+                for token in pipeline.query_rag_stream(prompt, collections=[active_chat.get("collection", "default")]):
+                    full_response += token
                     message_placeholder.markdown(full_response + "▌")
+                full_response = full_response or "I couldn't find an answer."
                 message_placeholder.markdown(full_response)
                 active_chat["messages"].append({"role": "assistant", "content": full_response})
\ No newline at end of file
@@ -1,11 +1,15 @@
 import streamlit as st
 import requests
+import time
+import json
 
 # ---------------- CONFIG ----------------
 st.set_page_config(page_title="IntelliDoc AI", layout="wide")
 
 API_URL = "https://rag-document-ai-1.onrender.com/query"
 UPLOAD_URL = "https://rag-document-ai-1.onrender.com/upload"
+JOBS_URL = "https://rag-document-ai-1.onrender.com/jobs"
+STREAM_URL = "https://rag-document-ai-1.onrender.com/query/stream"
 
 # ---------------- CSS ----------------
 st.markdown("""
@@ -47,6 +51,9 @@ if "current_chat" not in st.session_state:
 with st.sidebar:
     st.title("📂 Upload PDFs")
 
+    # each collection is searched on its own; chats remember theirs
+    collection = st.text_input("Collection", value="default")
+
     uploaded_files = st.file_uploader(
         "Upload files",
         type=["pdf"],
@@ -56,11 +63,20 @@ with st.sidebar:
     if st.button("Process Documents"):
         if uploaded_files:
             files = [("files", (file.name, file.getvalue())) for file in uploaded_files]
-            requests.post(UPLOAD_URL, files=files)
+            job_id = requests.post(UPLOAD_URL, files=files, params={"collection": collection}).json().get("job_id")
+
+            # processing runs in the background, poll until it's finished
+            with st.spinner("Processing documents..."):
+                while job_id:
+                    job = requests.get(f"{JOBS_URL}/{job_id}").json()
+                    if job.get("status") in ("done", "failed", None):
+                        break
+                    time.sleep(1)
 
             # create new chat session (per PDF)
             st.session_state.chats.append({
                 "title": uploaded_files[0].name,
+                "collection": collection,
                 "messages": []
             })
 
@@ -96,23 +112,44 @@ if st.session_state.current_chat is not None:
         else:
             st.markdown(f"<div class='chat-bot'>🤖 {msg['content']}</div>", unsafe_allow_html=True)
 
+# ---------------- STREAMING ----------------
+def stream_events(res):
+    # minimal server-sent-events reader: yields (event, payload)
+    event = None
+    for line in res.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:") and event:
+            yield event, json.loads(line[len("data:"):])
+            event = None
+
+
 # ---------------- INPUT ----------------
 query = st.chat_input("Ask something...")
 
 if query and st.session_state.current_chat is not None:
     try:
-        res = requests.post(API_URL, json={"query": query})
+        chat = st.session_state.chats[st.session_state.current_chat]
+        body = {"query": query, "collection": chat.get("collection", "default")}
+        res = requests.post(STREAM_URL, json=body, stream=True)
 
         # 🔥 check status first
         if res.status_code != 200:
             st.error(f"Backend error: {res.text}")
         else:
-            try:
-                data = res.json()
-                answer = data.get("answer") or data.get("response") or "No answer returned"
-            except:
-                st.error(f"Invalid response from backend: {res.text}")
-                answer = "Error parsing response"
+            st.markdown(f"<div class='chat-user'>🧑 {query}</div>", unsafe_allow_html=True)
+            placeholder = st.empty()
+            answer = ""
+
+            # render tokens as they arrive instead of waiting for the whole answer
+            for event, payload in stream_events(res):
+                if event == "token":
+                    answer += payload["text"]
+                    placeholder.markdown(f"<div class='chat-bot'>🤖 {answer}▌</div>", unsafe_allow_html=True)
+                elif event == "error":
+                    answer = payload.get("answer", "Error")
+
+            answer = answer or "No answer returned"
 
             chat = st.session_state.chats[st.session_state.current_chat]
 
@@ -0,0 +1,55 @@
+# tests/conftest.py
+import os
+
+import pytest
+
+# loaded before any test module: no test needs an API key, whatever the import order
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+from app import db, pipeline, store  # noqa: E402
+from app.llm import FakeLLM  # noqa: E402
+from app.store import DEFAULT_COLLECTION  # noqa: E402
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch):
+    """
+    Scratch state for the pipeline: the store under tmp_path/"vs", the
+    metadata DB in tmp_path and a stub LLM without latency. Returns the
+    default collection's store path.
+    """
+    monkeypatch.setattr(pipeline, "DB_PATH", str(tmp_path / "vs"))
+    monkeypatch.setattr(pipeline, "llm", FakeLLM(latency=0, token_delay=0))
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "metadata.db"))
+    monkeypatch.setattr(db, "DATA_DIR", str(tmp_path))
+    return pipeline.collection_path()
+
+
+@pytest.fixture
+def seed(rag):
+    """
+    seed(docs, collection="default", sources=None) writes `docs`
+    ({filename: [text or (text, page), ...]}) as a fresh, embedded store:
+    one source per file ("h<doc>"), each registered in the metadata DB.
+    `sources` ({filename: {field: value}}) overrides source fields such as
+    doc_id or uploaded_at. Returns (store path, {filename: doc_id}).
+    """
+
+    def seed(docs, collection: str = DEFAULT_COLLECTION, sources=None):
+        db.ensure_db()
+        ids = db.add_documents(list(docs), collection)
+        path = pipeline.collection_path(collection)
+        writer = store.StoreWriter(path, store.empty_manifest(), embedder=pipeline.embedder)
+        written = {}
+        for doc, (filename, chunks) in enumerate(docs.items()):
+            start, pages = writer.next_id, 0
+            for chunk in chunks:
+                text, page = chunk if isinstance(chunk, tuple) else (chunk, 0)
+                writer.add(text, doc, page)
+                pages = max(pages, page + 1)
+            written[f"h{doc}"] = {"filename": filename, "pages": pages, "doc": doc, "doc_id": ids[filename],
+                                  "chunks": [start, writer.next_id], **(sources or {}).get(filename, {})}
+        writer.commit(written)
+        return path, {s["filename"]: s["doc_id"] for s in written.values()}
+
+    return seed
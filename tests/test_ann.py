@@ -0,0 +1,106 @@
+# tests/test_ann.py
+import os
+
+import numpy as np
+
+from app import ann, store
+from app.embeddings import HashingEmbedder, normalize
+from app.vectors import VectorIndex, VectorWriter
+
+
+def clustered(n, dim=16, centers=20, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.standard_normal((centers, dim))
+    rows = means[rng.integers(0, centers, n)] + 0.3 * rng.standard_normal((n, dim))
+    return normalize(rows)
+
+
+def build(tmp_path, matrix, monkeypatch):
+    monkeypatch.setattr(ann, "IVF_MIN_VECTORS", 100)
+    path = str(tmp_path)
+    writer = VectorWriter(path, 0, matrix.shape[1])
+    writer.add(matrix)
+    writer.close()
+    index = VectorIndex(path, len(matrix), matrix.shape[1])
+    ivf = ann.update(path, index.matrix, None, generation=1)
+    return VectorIndex(path, len(matrix), matrix.shape[1], ivf=ivf), ivf
+
+
+def test_small_corpus_gets_no_ivf(tmp_path):
+    assert ann.update(str(tmp_path), clustered(50), None, generation=1) is None
+
+
+def test_probing_every_list_is_exact(tmp_path, monkeypatch):
+    matrix = clustered(2000)
+    index, ivf = build(tmp_path, matrix, monkeypatch)
+
+    for q in matrix[:10]:
+        exact = index.search(q, k=5, exact=True)
+        assert index.search(q, k=5, nprobe=ivf["nlist"]) == exact
+
+
+def test_recall_with_few_probes(tmp_path, monkeypatch):
+    matrix = clustered(2000)
+    index, _ = build(tmp_path, matrix, monkeypatch)
+
+    found = 0
+    for q in matrix[:50]:
+        exact = {row for _, row in index.search(q, k=10, exact=True)}
+        found += len(exact & {row for _, row in index.search(q, k=10, nprobe=8)})
+    assert found / 500 >= 0.9
+
+
+def test_incremental_commits_assign_new_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(ann, "IVF_MIN_VECTORS", 100)
+    path = str(tmp_path)
+    embedder = HashingEmbedder(dim=32)
+    texts = [f"topic{i % 7} note {i} about item{i}" for i in range(300)]
+
+    manifest = store.append_chunks(path, store.empty_manifest(), texts[:200], embedder=embedder)
+    trained = manifest["ivf"]
+    assert trained["n_assigned"] == 200
+
+    manifest = store.append_chunks(path, manifest, texts[200:], embedder=embedder)
+    assert manifest["ivf"]["name"] == trained["name"]  # grew < retrain factor
+    assert manifest["ivf"]["n_assigned"] == 300
+
+    index = VectorIndex(path, 300, 32, ivf=manifest["ivf"])
+    assert len(index.ivf) == 300
+    hits = index.search(embedder.embed([texts[250]])[0], k=1, nprobe=manifest["ivf"]["nlist"])
+    assert hits[0][1] == 250
+
+
+def test_tombstones_are_skipped_without_subsetting_rows(tmp_path, monkeypatch):
+    matrix = clustered(2000)
+    index, ivf = build(tmp_path, matrix, monkeypatch)
+    live = np.ones(len(matrix), dtype=bool)
+    live[::3] = False
+
+    # the same results as scoring only the live rows, through IVF and brute force
+    for q in matrix[:10]:
+        expected = ann.search_rows(index.matrix, np.flatnonzero(live), q, k=5)
+        assert index.search(q, k=5, nprobe=ivf["nlist"], live=live) == expected
+        assert index.search(q, k=5, exact=True, live=live) == expected
+    batched = index.search_many(matrix[:10], k=5, exact=True, live=live)
+    assert [[r for _, r in hits] for hits in batched] == \
+        [[r for _, r in ann.search_rows(index.matrix, np.flatnonzero(live), q, k=5)] for q in matrix[:10]]
+    assert index.search(matrix[0], k=5, exact=True, live=np.zeros(len(matrix), dtype=bool)) == []
+
+
+def test_retraining_leaves_the_old_ivf_files_as_garbage(tmp_path, monkeypatch):
+    monkeypatch.setattr(ann, "IVF_MIN_VECTORS", 100)
+    monkeypatch.setattr(ann, "IVF_RETRAIN_FACTOR", 1.5)
+    path = str(tmp_path)
+    embedder = HashingEmbedder(dim=32)
+    texts = [f"topic{i % 7} note {i} about item{i}" for i in range(400)]
+
+    old = store.append_chunks(path, store.empty_manifest(), texts[:200], embedder=embedder)["ivf"]
+    writer = store.StoreWriter(path, store.load_manifest(path), embedder=embedder)
+    for text in texts[200:]:
+        writer.add(text)
+    new = writer.commit()["ivf"]
+
+    assert new["name"] != old["name"] and new["trained_on"] == 400
+    # still on disk for readers of the previous generation; pipeline.remove_later deletes them
+    old_files = [os.path.join(path, old["name"] + ext) for ext in store.IVF_FILES]
+    assert writer.garbage == old_files and all(map(os.path.exists, old_files))
@@ -0,0 +1,91 @@
+# tests/test_batching.py
+import asyncio
+import threading
+
+from app import pipeline, store
+from app.batching import MicroBatcher, SingleFlight
+from app.llm import FakeLLM
+
+
+def test_single_flight_shares_one_run():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", compute) for _ in range(5)))
+        again = await flight.do("k", compute)  # finished calls aren't reused
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert len(calls) == 2
+    assert [r for r, _ in results] == ["answer"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert again == ("answer", False)
+
+
+def test_micro_batcher_groups_queued_items():
+    release = threading.Event()
+    batches = []
+
+    def run(group, items):
+        release.wait(1)
+        batches.append((group, items))
+        return [f"{group}:{item}" for item in items]
+
+    async def main():
+        batcher = MicroBatcher(run, max_size=4, workers=1)
+        first = asyncio.ensure_future(batcher.submit("a", 0))
+        await asyncio.sleep(0.01)  # 0 is running alone; the rest queue behind it
+        rest = [asyncio.ensure_future(batcher.submit(group, i)) for i, group in enumerate("abababa", 1)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(first, *rest)
+
+    results = asyncio.run(main())
+    assert results == ["a:0"] + [f"{g}:{i}" for i, g in enumerate("abababa", 1)]
+    assert batches == [("a", [0]), ("a", [1, 3, 5, 7]), ("b", [2, 4, 6])]
+
+
+def test_concurrent_queries_coalesce_and_batch(rag, monkeypatch):
+    texts = [f"station {i} pump maintenance and valve {i} inspection" for i in range(30)]
+    store.append_chunks(rag, store.empty_manifest(), texts)
+    monkeypatch.setattr(pipeline, "llm", FakeLLM(latency=0.05, token_delay=0))
+
+    queries = ["valve 3 inspection", "pump station 7", "maintenance of valve 12"]
+    # batched scoring finds what one-by-one scoring finds
+    batched = pipeline.retrieve_many(queries, "lexical")
+    assert [c["sources"] for c in batched] == [pipeline.retrieve(q, "lexical")["sources"] for q in queries]
+
+    async def burst():
+        # a class asking the same thing, spelled a little differently
+        asked = ["How do I inspect valve 3?", "how do i inspect VALVE 3", "How do I inspect valve 3"] * 5
+        return await asyncio.gather(*(pipeline.aquery_rag(q, "lexical") for q in asked + queries))
+
+    batcher = pipeline.retrieval_batcher
+    before = (batcher.batches, batcher.items)
+    results = asyncio.run(burst())
+    assert pipeline.llm.calls == 1 + len(queries)
+    batches, items = batcher.batches - before[0], batcher.items - before[1]
+    assert items == 1 + len(queries) and batches < items  # 4 retrievals, fewer passes
+    assert len({r["answer"] for r in results[:15]}) == 1
+    assert all(not r["answer"].startswith("Backend error") for r in results)
+
+
+def test_coalesced_callers_get_the_shared_stage_timings(rag, monkeypatch):
+    store.append_chunks(rag, store.empty_manifest(), ["pump maintenance and valve inspection"])
+    monkeypatch.setattr(pipeline, "llm", FakeLLM(latency=0.05, token_delay=0))
+
+    async def burst():
+        timings = [{}, {}, {}]
+        await asyncio.gather(*(pipeline.aquery_rag("valve inspection?", "lexical", t) for t in timings))
+        return timings
+
+    timings = asyncio.run(burst())
+    assert pipeline.llm.calls == 1
+    assert all("llm_ms" in t and "retrieve_ms" in t for t in timings)
+    assert sorted(t.get("coalesced", False) for t in timings) == [False, True, True]
@@ -0,0 +1,97 @@
+# tests/test_cache.py
+from app import cache, db
+from app.cache import AnswerCache, ChunkCache, answer_key
+
+
+def test_chunk_cache_hits_until_key_changes():
+    cache = ChunkCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return ["Alpha", "Beta"]
+
+    chunks, lowered = cache.get((1, 1), loader)
+    again = cache.get((1, 1), loader)
+
+    assert [lowered[0], lowered[1]] == ["alpha", "beta"]
+    assert again[0] is chunks
+    assert len(loads) == 1
+
+    cache.get((2, 1), loader)
+    assert len(loads) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_chunk_cache_respects_memory_cap():
+    cache = ChunkCache(max_bytes=4)
+    _, lowered = cache.get((1, 1), lambda: ["abc", "too big to hold"])
+
+    assert lowered[1] == "too big to hold"
+    assert lowered[0] == "abc"
+    assert cache.stats()["size_bytes"] == 3
+
+
+def test_chunk_cache_keeps_one_entry_per_store(rag, monkeypatch):
+    from app import pipeline, store
+
+    monkeypatch.setattr(pipeline, "chunk_cache", ChunkCache())
+    store.append_chunks(pipeline.collection_path("default"), store.empty_manifest(), ["apples are red fruit"])
+    store.append_chunks(pipeline.collection_path("a"), store.empty_manifest(), ["bananas are yellow fruit"])
+
+    for _ in range(10):
+        pipeline.retrieve("fruit", "lexical", collections=["default", "a"])
+    assert pipeline.chunk_cache.stats()["misses"] == 2 and pipeline.chunk_cache.stats()["hits"] >= 18
+
+    # a new generation replaces that store's entry only
+    manifest = store.load_manifest(pipeline.collection_path("a"))
+    store.append_chunks(pipeline.collection_path("a"), manifest, ["cherries are small fruit"])
+    pipeline.retrieve("fruit", "lexical", collections=["default", "a"])
+    assert pipeline.chunk_cache.stats()["misses"] == 3 and pipeline.chunk_cache.stats()["entries"] == 2
+
+
+def test_chunk_cache_budget_is_shared_between_stores():
+    cache = ChunkCache(max_bytes=8)
+    _, first = cache.get(("a", 1), lambda: ["abcde"])
+    _, second = cache.get(("b", 1), lambda: ["fghij"])
+    first[0], second[0]
+
+    assert cache.stats()["size_bytes"] == 5
+    cache.get(("a", 2), lambda: ["abcde"])  # the old view's bytes are handed back
+    assert cache.stats()["size_bytes"] == 0
+    assert second[0] == "fghij" and cache.stats()["size_bytes"] == 5
+
+
+def test_answer_key_ignores_case_stopwords_and_punctuation():
+    assert answer_key("v1", "What is RAG?") == answer_key("v1", "rag")
+    assert answer_key("v1", "rag") != answer_key("v2", "rag")
+
+
+def test_answer_cache_lru_and_ttl(monkeypatch):
+    answers = AnswerCache(max_entries=2, ttl=10, persist=False)
+    answers.put("a", {"answer": "A"})
+    answers.put("b", {"answer": "B"})
+    answers.get("a")
+    answers.put("c", {"answer": "C"})  # evicts b, the least recently used
+
+    assert answers.get("b") is None
+    assert answers.get("a") == {"answer": "A"}
+
+    now = cache.time.time()
+    monkeypatch.setattr(cache.time, "time", lambda: now + 11)
+    assert answers.get("a") is None
+    assert answers.stats()["hits"] == 2
+
+
+def test_answer_cache_persists_to_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "metadata.db"))
+
+    AnswerCache(persist=True).put("k", {"answer": "saved"})
+    fresh = AnswerCache(persist=True)
+
+    assert fresh.get("k") == {"answer": "saved"}
+
+    fresh.clear()
+    assert AnswerCache(persist=True).get("k") is None
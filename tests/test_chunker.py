@@ -0,0 +1,55 @@
+# tests/test_chunker.py
+from app.chunker import Deduper, chunk_text, clean_pages, find_boilerplate, shingles, similarity
+from app.context import overlap
+
+SENTENCES = [f"Sentence {i} explains how the pump at station {i} is serviced." for i in range(60)]
+
+
+def test_chunks_keep_whole_sentences_and_small_overlap():
+    chunks = chunk_text(" ".join(SENTENCES), size=400, overlap=120)
+
+    assert all(len(c) <= 400 for c in chunks)
+    for c in chunks:
+        assert c.startswith("Sentence ") and c.endswith("serviced.")
+    # each chunk starts with the previous one's last sentences, at most `overlap` chars
+    assert all(0 < overlap(a, b) <= 120 for a, b in zip(chunks, chunks[1:]))
+    # every sentence survives, and only little text is repeated
+    assert all(any(s in c for c in chunks) for s in SENTENCES)
+    assert sum(map(len, chunks)) < 1.35 * len(" ".join(SENTENCES))
+
+
+def test_paragraph_breaks_preferred_long_runs_cut():
+    para = "A wrapped\nsentence here. Next one."
+    assert chunk_text(para + "\n\nNew paragraph\nwithout end") == [para + "\n\nNew paragraph\nwithout end"]
+    text = "\n\n".join([para] * 3)
+    assert chunk_text(text, size=len(para) * 2 + 5, overlap=0) == ["\n\n".join([para] * 2), para]
+
+    long = "word " * 500
+    chunks = chunk_text(long, size=300)
+    assert all(len(c) <= 300 for c in chunks) and " ".join(chunks) == long.strip()
+
+
+def test_repeated_headers_and_page_numbers_are_stripped():
+    pages = [f"ACME Corp - Internal\nThe pump at station {i} was serviced.\nPage {i} of 5" for i in range(1, 6)]
+    assert find_boilerplate(pages) == {"acme corp - internal", "page # of #"}
+    assert find_boilerplate(pages[:2]) == set()  # too short to tell
+
+    stream = [(0, i, text) for i, text in enumerate(pages)] + [(1, 0, "ACME Corp - Internal\nOther doc.")]
+    cleaned = list(clean_pages(stream, sample=3))
+
+    assert [text for _, _, text in cleaned[:5]] == [f"The pump at station {i} was serviced." for i in range(1, 6)]
+    assert cleaned[5] == (1, 0, "ACME Corp - Internal\nOther doc.")  # learned per document
+
+
+def test_near_duplicates_are_skipped():
+    base = " ".join(SENTENCES[:20])
+    assert similarity(shingles(base), shingles(base + " One more.")) > 0.9
+    assert similarity(shingles(base), shingles(" ".join(SENTENCES[20:40]))) == 0
+
+    dedup = Deduper()
+    assert not dedup.seen(base)
+    assert dedup.seen(base)
+    assert dedup.seen(base.replace("Sentence 3 ", "Sentence three "))
+    assert dedup.seen(base.replace("Sentence 15 ", "Sentence fifteen "))  # past the hashed head
+    assert not dedup.seen(" ".join(SENTENCES[20:40]))
+    assert dedup.skipped == 3
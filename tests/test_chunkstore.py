@@ -0,0 +1,30 @@
+# tests/test_chunkstore.py
+from app import chunkstore
+from app.chunkstore import ChunkStore
+
+
+def test_random_access_and_separator_safe(tmp_path):
+    texts = ["first", "has \n\n---\n\n inside", "ünïcödé"]
+    chunkstore.append_chunks(str(tmp_path), 0, texts)
+
+    chunks = ChunkStore(str(tmp_path), 3)
+
+    assert len(chunks) == 3
+    assert chunks[1] == texts[1]
+    assert chunks[-1] == "ünïcödé"
+    assert bytes(chunks.get_bytes(0)) == b"first"
+
+
+def test_uncommitted_tail_is_hidden_and_overwritten(tmp_path):
+    path = str(tmp_path)
+    chunkstore.append_chunks(path, 0, ["a", "b"])
+    chunkstore.append_chunks(path, 2, ["crashed"])  # manifest never saw this
+
+    assert list(ChunkStore(path, 2)) == ["a", "b"]
+
+    chunkstore.append_chunks(path, 2, ["c"])
+    assert list(ChunkStore(path, 3)) == ["a", "b", "c"]
+
+
+def test_empty_store(tmp_path):
+    assert len(ChunkStore(str(tmp_path), 0)) == 0
@@ -0,0 +1,60 @@
+# tests/test_collections.py
+import os
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db, main, pipeline, store
+
+
+@pytest.fixture
+def fruit(seed):
+    seed({"apples.pdf": ["apples are red fruit"]})
+    seed({"bananas.pdf": ["bananas are yellow fruit"]}, collection="team-a")
+
+
+def test_collection_dirs():
+    assert store.collection_dir("vs") == "vs"
+    assert store.collection_dir("vs", "team-a") == os.path.join("vs", "collections", "team-a")
+    for bad in ("", "../x", "a/b", "x" * 65):
+        assert not store.valid_collection(bad)
+
+
+def test_queries_only_see_their_collections(fruit):
+
+    assert pipeline.retrieve("fruit")["passages"] == ["apples are red fruit"]
+    assert pipeline.retrieve("fruit", collections=["team-a"])["passages"] == ["bananas are yellow fruit"]
+    both = pipeline.retrieve("yellow fruit", collections=["default", "team-a"])
+    assert both["passages"] == ["bananas are yellow fruit", "apples are red fruit"]
+    assert pipeline.retrieve("fruit", collections=["empty"]) is None
+    assert pipeline.list_collections() == ["default", "team-a"]
+
+
+def test_api_scopes_and_validates_collections(fruit):
+    client = TestClient(main.app)
+
+    res = client.post("/query", json={"query": "fruit", "collection": "team-a"}).json()
+    assert [c["text"] for c in res["source_chunks"]] == ["bananas are yellow fruit"]
+    assert res["source_chunks"][0]["collection"] == "team-a"
+
+    assert client.post("/query", json={"query": "fruit", "collections": ["../etc"]}).status_code == 400
+    assert client.post("/upload?collection=bad/name", files={"files": ("a.pdf", b"x")}).status_code == 400
+
+
+def test_old_documents_table_gets_collection_column(rag):
+    path = db.DB_PATH
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE documents (id INTEGER PRIMARY KEY, filename TEXT NOT NULL UNIQUE, "
+                 "uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("INSERT INTO documents (filename) VALUES ('old.pdf')")
+    conn.commit()
+    conn.close()
+
+    db.init_db()
+    db.add_document("old.pdf", "team-a")  # same name, other collection
+
+    docs, error = db.get_all_documents()
+    assert error is None
+    assert sorted((d["filename"], d["collection"]) for d in docs) == [("old.pdf", "default"), ("old.pdf", "team-a")]
+    assert [d["collection"] for d in db.get_all_documents("team-a")[0]] == ["team-a"]
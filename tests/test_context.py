@@ -0,0 +1,52 @@
+# tests/test_context.py
+from app.chunker import chunk_text
+from app.context import count_tokens, overlap, pack
+
+
+def split(text):
+    return chunk_text(text, size=300, overlap=150)
+
+
+DOC = " ".join(f"Step {i} of the procedure is to check valve number {i} carefully." for i in range(40))
+
+
+def test_adjacent_chunks_merge_without_overlap():
+    chunks = split(DOC)
+    assert overlap(chunks[0], chunks[1]) > 0
+
+    packed = pack([(1.0, 5)], chunks, budget=10000)
+
+    assert packed["ids"] == [4, 5, 6]
+    assert len(packed["passages"]) == 1
+    passage = packed["passages"][0]
+    steps = [f"Step {i} " for i in range(40) if f"Step {i} " in passage]
+    assert len(steps) > 3 and all(passage.count(s) == 1 for s in steps)
+    assert packed["tokens"] < sum(count_tokens(chunks[i]) for i in (4, 5, 6))
+
+
+def test_budget_is_respected_best_first():
+    chunks = [f"chunk {i} " + "word " * 50 for i in range(10)]
+    packed = pack([(2.0, 7), (1.0, 2)], chunks, budget=160)
+
+    assert packed["tokens"] <= packed["budget"] == 160
+    assert 7 in packed["ids"] and 2 not in packed["ids"]
+    # consecutive ids are one passage even without shared text
+    assert packed["groups"] == [[6, 7, 8]] and "chunk 7" in packed["passages"][0]
+
+
+def test_overlap_is_free_whichever_neighbour_comes_first():
+    chunks = split(DOC)[:6]
+    merged = pack([(1.0, 5)], chunks, budget=10000)
+    assert merged["groups"] == [[4, 5]]  # chunk 4 is selected after the chunk it overlaps with
+
+    packed = pack([(1.0, 5)], chunks, budget=merged["tokens"])
+    assert packed["groups"] == [[4, 5]] and packed["text"] == merged["text"]
+
+
+def test_oversized_best_chunk_is_truncated():
+    chunks = [DOC]
+    packed = pack([(1.0, 0)], chunks, budget=30)
+
+    assert packed["ids"] == [0]
+    assert 0 < packed["tokens"] <= 30
+    assert DOC.startswith(packed["text"])
@@ -0,0 +1,66 @@
+# tests/test_db.py
+import threading
+
+import pytest
+
+from app import db
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "metadata.db"))
+    monkeypatch.setattr(db, "DATA_DIR", str(tmp_path))
+    db.init_db()
+    yield
+    db.get_pool().close()
+
+
+def test_connections_are_pooled_and_in_wal_mode(fresh_db):
+    with db.connection() as conn:
+        first = conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with db.connection() as conn:
+        assert conn is first
+
+
+def test_bulk_add_returns_ids_and_ignores_duplicates(fresh_db):
+    ids = db.add_documents(["a.pdf", "b.pdf", "a.pdf"])
+    assert sorted(ids) == ["a.pdf", "b.pdf"]
+    assert db.add_documents(["b.pdf", "c.pdf"])["b.pdf"] == ids["b.pdf"]
+    assert db.add_document("a.pdf", "other") not in ids.values()
+
+
+def test_get_all_documents_pages_newest_first(fresh_db):
+    db.add_documents([f"{i}.pdf" for i in range(25)])
+
+    seen, before = [], None
+    while True:
+        page, error = db.get_all_documents(limit=10, before_id=before)
+        assert error is None
+        if not page:
+            break
+        seen += page
+        before = page[-1]["id"]
+
+    assert [d["filename"] for d in seen] == [f"{i}.pdf" for i in reversed(range(25))]
+    assert len(db.get_all_documents(limit=None)[0]) == 25
+
+
+def test_concurrent_writers_do_not_fail(fresh_db):
+    errors = []
+
+    def write(t):
+        try:
+            for i in range(50):
+                db.add_document(f"t{t}-{i}.pdf")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(db.get_all_documents(limit=None)[0]) == 400
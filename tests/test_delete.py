@@ -0,0 +1,160 @@
+# tests/test_delete.py
+import os
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main, pipeline, store
+from app.embeddings import HashingEmbedder
+
+DOCS = {
+    "apples.pdf": ["apples are red fruit", "apples grow on trees"],
+    "bananas.pdf": ["bananas are yellow fruit", "bananas grow in bunches"],
+    "cherries.pdf": ["cherries are small fruit", "cherries have pits"],
+}
+
+
+@pytest.fixture
+def fruit(seed):
+    return seed(DOCS)
+
+
+def test_tombstoned_chunks_are_not_retrieved(fruit, monkeypatch):
+    path, ids = fruit
+    monkeypatch.setattr(store, "COMPACT_RATIO", 0.9)
+
+    result = pipeline.delete_document(ids["bananas.pdf"])
+
+    assert result["chunks_deleted"] == 2 and result["compaction_job"] is None
+    manifest = store.load_manifest(path)
+    assert manifest["deleted"] == [[2, 4]] and "h1" not in manifest["sources"]
+    for mode in pipeline.RETRIEVERS:
+        context = pipeline.retrieve("yellow bananas fruit", mode)
+        assert not any("bananas" in p for p in context["passages"])
+    assert pipeline.delete_document(ids["bananas.pdf"]) is None
+
+    # the live mask's bytes are built once per generation, not per query
+    entry = pipeline._index(path)
+    lexical = pipeline.make_retriever("lexical", entry, None, entry["live"])
+    assert lexical.allowed is entry["live_bytes"] == bytes([1, 1, 0, 0, 1, 1])
+
+
+def test_compact_renumbers_chunks_and_vectors(fruit):
+    path, _ = fruit
+    manifest = store.tombstone(path, store.load_manifest(path), ["h0"])
+
+    new, garbage = store.compact(path, manifest)
+
+    assert new["n_chunks"] == 4 and not new.get("deleted")
+    assert list(store.read_chunks(path, new)) == DOCS["bananas.pdf"] + DOCS["cherries.pdf"]
+    assert [s["chunks"] for s in new["sources"].values()] == [[0, 2], [2, 4]]
+    assert store.read_meta(path, new)[:, 0].tolist() == [1, 1, 2, 2]
+
+    embedder = HashingEmbedder(new["embedding"]["dim"])
+    matrix = pipeline._open_vectors(path, new).matrix
+    assert np.allclose(matrix, embedder.embed(DOCS["bananas.pdf"] + DOCS["cherries.pdf"]))
+
+    # the old generation's files are garbage, the new one's are all there
+    assert garbage and all(os.path.exists(p) for p in garbage)
+    assert all(os.path.exists(p) for p in store.store_files(path, new))
+    assert not set(garbage) & set(store.store_files(path, new))
+
+
+def test_compact_keeps_empty_source_ranges(fruit):
+    # a scanned PDF yields no chunks: an empty range, at either end of the store
+    path, _ = fruit
+    manifest = store.load_manifest(path)
+    manifest["sources"].update(first={"doc": 3, "chunks": [0, 0]}, last={"doc": 4, "chunks": [6, 6]})
+    manifest = store.tombstone(path, manifest, ["h1"])
+
+    new, _ = store.compact(path, manifest)
+
+    ranges = {digest: s["chunks"] for digest, s in new["sources"].items()}
+    assert ranges == {"h0": [0, 2], "h2": [2, 4], "first": [0, 0], "last": [4, 4]}
+
+
+def test_delete_api_compacts_in_background(fruit, monkeypatch):
+    path, ids = fruit
+    monkeypatch.setattr(pipeline, "COMPACT_GRACE", 0)
+    client = TestClient(main.app)
+
+    assert client.delete("/documents/9999").status_code == 404
+
+    res = client.delete(f"/documents/{ids['apples.pdf']}")
+    assert res.status_code == 200
+    job_id = res.json()["compaction_job"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "done"
+
+    assert store.load_manifest(path)["n_chunks"] == 4
+    names = [d["filename"] for d in client.get("/documents").json()]
+    assert names == ["cherries.pdf", "bananas.pdf"]
+    res = client.post("/query", json={"query": "apples fruit"}).json()
+    assert not any("apples" in c["text"] for c in res["source_chunks"])
+
+
+def test_documents_are_paged(fruit):
+    _, ids = fruit
+    client = TestClient(main.app)
+
+    first = client.get("/documents?limit=2").json()
+    assert [d["filename"] for d in first] == ["cherries.pdf", "bananas.pdf"]
+    rest = client.get(f"/documents?limit=2&before_id={first[-1]['id']}").json()
+    assert [d["filename"] for d in rest] == ["apples.pdf"]
+
+
+def test_partly_parsed_file_leaves_no_searchable_chunks(fruit, tmp_path, monkeypatch):
+    from app import loader
+    from benchmarks.pdfgen import write_pdf
+
+    monkeypatch.setattr(loader, "INGEST_WORKERS", 1)
+    monkeypatch.setattr(loader, "PAGES_PER_TASK", 1)
+    extract_pages = loader.extract_pages
+
+    def fail_after_first_page(path, start, stop):
+        if start > 0:
+            raise ValueError("broken xref")
+        return extract_pages(path, start, stop)
+
+    monkeypatch.setattr(loader, "extract_pages", fail_after_first_page)
+    pdf = str(tmp_path / "broken.pdf")
+    write_pdf(pdf, [["durian is a spiky fruit"], ["durian smells strong"]])
+
+    report = pipeline.process_and_store_docs([pdf])
+
+    assert report[0]["error"] == "broken xref"
+    manifest = store.load_manifest(pipeline.collection_path())
+    assert manifest["deleted"] == [[6, 7]] and len(manifest["sources"]) == 3
+    for mode in pipeline.RETRIEVERS:
+        assert not any("durian" in p for p in pipeline.retrieve("durian spiky fruit", mode)["passages"])
+
+
+def test_reupload_under_same_name_replaces_old_version(rag, tmp_path, monkeypatch):
+    from benchmarks.pdfgen import write_pdf
+
+    # no compaction job racing the asserts (compaction has its own tests)
+    monkeypatch.setattr(store, "COMPACT_RATIO", 2)
+
+    pdf = str(tmp_path / "a.pdf")
+    write_pdf(pdf, [["the reactor limit is forty degrees"]])
+    pipeline.process_and_store_docs([pdf])
+    write_pdf(pdf, [["the reactor limit is ninety degrees"]])
+    pipeline.process_and_store_docs([pdf])
+
+    manifest = store.load_manifest(rag)
+    assert [s["filename"] for s in manifest["sources"].values()] == ["a.pdf"] and manifest["deleted"] == [[0, 1]]
+    for mode in pipeline.RETRIEVERS:
+        passages = pipeline.retrieve("reactor limit forty degrees", mode)["passages"]
+        assert passages == ["the reactor limit is ninety degrees"]
+
+    client = TestClient(main.app)
+    docs = client.get("/documents").json()
+    assert [d["filename"] for d in docs] == ["a.pdf"]
+    assert client.delete(f"/documents/{docs[0]['id']}").json()["chunks_deleted"] == 1
+    assert pipeline.retrieve("reactor limit", "lexical")["passages"] == []
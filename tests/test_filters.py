@@ -0,0 +1,81 @@
+# tests/test_filters.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app import chunkstore, db, main, pipeline, store
+from app.filters import chunk_mask, parse_filters
+
+
+@pytest.fixture
+def reports(seed):
+    """Two documents: a.pdf pages 1-3 (uploaded Jan 2024), b.pdf page 1 (Mar 2024)."""
+    path, _ = seed(
+        {
+            "a.pdf": [(f"alpha report page {page} about turbines", page) for page in range(3)],
+            "b.pdf": [("beta memo about turbines", 0)],
+        },
+        sources={"a.pdf": {"doc_id": 10, "uploaded_at": 1704067200.0},
+                 "b.pdf": {"doc_id": 11, "uploaded_at": 1709251200.0}},
+    )
+    return path
+
+
+def test_parse_filters_validates():
+    assert parse_filters(None) is None
+    assert parse_filters({"filename": "a.pdf", "page_to": 2}) == {"filename": ["a.pdf"], "page_to": 2}
+    assert parse_filters({"uploaded_after": "2024-01-01"})["uploaded_after"] == 1704067200.0
+    for bad in ({"colour": "red"}, {"page_from": 0}, {"doc_id": "x"}, {"uploaded_before": "soon"}, "x"):
+        with pytest.raises(ValueError):
+            parse_filters(bad)
+
+
+def test_chunk_mask_intersects_docs_and_pages(reports):
+    path = reports
+    manifest = store.load_manifest(path)
+    meta = chunkstore.read_meta(path, manifest["n_chunks"])
+
+    assert chunk_mask(meta, manifest, parse_filters({"filename": "a.pdf", "page_from": 2})).tolist() == [
+        False, True, True, False]
+    assert chunk_mask(meta, manifest, parse_filters({"uploaded_after": "2024-02-01"})).tolist() == [
+        False, False, False, True]
+    assert chunk_mask(meta, manifest, parse_filters({"doc_id": [10, 11], "page_to": 1})).tolist() == [
+        True, False, False, True]
+
+
+def test_filtered_retrieval_and_references(reports):
+
+    context = pipeline.retrieve("turbines", filters=parse_filters({"filename": "b.pdf"}))
+    assert context["sources"] == [{
+        "text": "beta memo about turbines", "collection": "default",
+        "doc_id": 11, "filename": "b.pdf", "page_start": 1, "page_end": 1,
+    }]
+
+    # neighbours are pulled in only from the same document and inside the filters
+    context = pipeline.retrieve("page 1", filters=parse_filters({"page_to": 2}))
+    assert set(context["ids"]) <= {0, 1, 3}
+    assert pipeline.retrieve("turbines", filters=parse_filters({"filename": "none.pdf"}))["passages"] == []
+
+
+def test_api_filters(reports):
+    client = TestClient(main.app)
+
+    res = client.post("/query", json={"query": "turbines", "filters": {"filename": "a.pdf", "page_from": 3}}).json()
+    assert [(c["filename"], c["page_start"]) for c in res["source_chunks"]] == [("a.pdf", 3)]
+
+    res = client.post("/query", json={"query": "turbines", "filters": {"filename": "none.pdf"}}).json()
+    assert res["answer"] == pipeline.NO_MATCH["answer"]
+    assert client.post("/query", json={"query": "x", "filters": {"page_from": "one"}}).status_code == 400
+
+
+def test_ingest_records_chunk_metadata(rag, tmp_path):
+    from benchmarks.pdfgen import write_corpus
+
+    pipeline.process_and_store_docs(write_corpus(str(tmp_path / "pdfs"), 2, 3, seed=0))
+
+    manifest = pipeline.get_manifest()
+    meta = chunkstore.read_meta(pipeline.collection_path(), manifest["n_chunks"])
+    docs = {s["doc"]: s for s in manifest["sources"].values()}
+    assert sorted(docs) == [0, 1] and set(meta[:, 0].tolist()) == {0, 1}
+    assert meta[:, 1].max() == 2
+    ids = {d["id"] for d in db.get_all_documents()[0]}
+    assert {s["doc_id"] for s in docs.values()} == ids
@@ -0,0 +1,42 @@
+# tests/test_index.py
+from app.index import Segment, bm25_search, tokenize, write_segment
+
+
+def build(tmp_path, texts, name="seg"):
+    meta = write_segment(str(tmp_path), name, texts)
+    return Segment(str(tmp_path), meta)
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("What is the Role of RAG?") == ["role", "rag"]
+
+
+def test_bm25_ranks_matching_chunk_first(tmp_path):
+    seg = build(tmp_path, [
+        "Photosynthesis happens in the leaves of plants.",
+        "Retrieval augmented generation combines search with an LLM.",
+        "The mitochondria is the powerhouse of the cell.",
+    ])
+
+    hits = bm25_search([seg], "what is retrieval augmented generation", k=2)
+
+    assert hits[0][1] == 1
+    assert len(hits) == 1  # only docs containing a query term are scored
+
+
+def test_bm25_unknown_terms_return_nothing(tmp_path):
+    seg = build(tmp_path, ["alpha beta", "gamma delta"])
+    assert bm25_search([seg], "zeta", k=4) == []
+
+
+def test_bm25_across_segments_uses_global_ids(tmp_path):
+    first = write_segment(str(tmp_path), "s0", ["apple banana", "cherry"])
+    second = write_segment(str(tmp_path), "s1", ["banana split", "apple apple pie"])
+    segments = [
+        Segment(str(tmp_path), first, doc_base=0),
+        Segment(str(tmp_path), second, doc_base=first["n_docs"]),
+    ]
+
+    hits = bm25_search(segments, "apple", k=4)
+
+    assert [gid for _, gid in hits] == [3, 0]
@@ -0,0 +1,76 @@
+# tests/test_jobs.py
+import threading
+import time
+
+import pytest
+
+from app.jobs import JobQueue, QueueFull
+
+
+def wait(queue, job_id):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job never finished")
+
+
+def test_job_reports_progress_and_result():
+    def work(files, progress):
+        progress(pages=3)
+        progress(chunks=7)
+        return [{"file": f} for f in files]
+
+    queue = JobQueue(workers=1)
+    job = wait(queue, queue.submit(work, ["a.pdf"]))
+
+    assert job["status"] == "done"
+    assert (job["pages"], job["chunks"]) == (3, 7)
+    assert job["report"] == [{"file": "a.pdf"}]
+    assert job["duration"] >= 0
+
+
+def test_failed_job_keeps_error():
+    def work(files, progress):
+        raise ValueError("broken pdf")
+
+    queue = JobQueue(workers=1)
+    job = wait(queue, queue.submit(work, ["a.pdf"]))
+
+    assert job["status"] == "failed"
+    assert job["error"] == "broken pdf"
+    assert job["duration"] >= 0  # set along with the status, not after it
+
+
+def test_queue_is_bounded():
+    release = threading.Event()
+    queue = JobQueue(workers=1, max_pending=1)
+    queue.submit(lambda files, progress: release.wait(), [])
+
+    with pytest.raises(QueueFull):
+        queue.submit(lambda files, progress: None, [])
+    release.set()
+
+
+def test_unknown_job():
+    assert JobQueue().get("nope") is None
+
+
+def test_shared_jobs_are_visible_to_other_workers(tmp_path, monkeypatch):
+    from app import db
+
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "metadata.db"))
+    monkeypatch.setattr(db, "DATA_DIR", str(tmp_path))
+
+    def work(files, progress):
+        return [{"file": f} for f in files]
+
+    # two queues stand in for two server processes sharing one metadata DB
+    running, polled = JobQueue(workers=1, shared=True), JobQueue(workers=1, shared=True)
+    job_id = running.submit(work, ["a.pdf"])
+    wait(running, job_id)
+
+    job = polled.get(job_id)
+    assert job["status"] == "done" and job["report"] == [{"file": "a.pdf"}]
+    assert JobQueue(workers=1).get(job_id) is None
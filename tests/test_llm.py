@@ -0,0 +1,57 @@
+# tests/test_llm.py
+import asyncio
+
+import pytest
+
+from app import llm
+from app.llm import FakeLLM, agenerate
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class Flaky(FakeLLM):
+    def __init__(self, failures, error):
+        super().__init__(latency=0)
+        self.failures = failures
+        self.error = error
+
+    async def ainvoke(self, prompt):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        return await super().ainvoke(prompt)
+
+
+def test_retries_rate_limits_with_backoff(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_BACKOFF", 0)
+    model = Flaky(failures=2, error=RateLimited())
+
+    response = asyncio.run(agenerate(model, "Question: hi Answer:", retries=3))
+
+    assert response.content == "Stub answer to: hi"
+
+
+def test_other_errors_are_not_retried():
+    model = Flaky(failures=1, error=ValueError("bad request"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(agenerate(model, "x", retries=3))
+    assert model.failures == 0 and model.calls == 0
+
+
+def test_timeout():
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(agenerate(FakeLLM(latency=1), "x", timeout=0.01))
+
+
+def test_concurrent_calls_overlap():
+    async def burst():
+        model = FakeLLM(latency=0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(agenerate(model, "x") for _ in range(10)))
+        return loop.time() - start
+
+    assert asyncio.run(burst()) < 0.5
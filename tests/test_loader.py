@@ -0,0 +1,31 @@
+# tests/test_loader.py
+from app import loader
+from benchmarks.pdfgen import write_pdf
+
+
+def test_pages_come_back_in_order_and_failures_are_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "PAGES_PER_TASK", 2)
+    good = tmp_path / "good.pdf"
+    write_pdf(str(good), [[f"page number {i}"] for i in range(5)])
+    bad = tmp_path / "bad.pdf"
+    bad.write_text("not a pdf")
+
+    pages, report = loader.load_pdfs([str(bad), str(good)], workers=1)
+
+    assert pages[0] == []
+    assert report[0]["error"]
+    assert [n for n, _ in pages[1]] == [0, 1, 2, 3, 4]
+    assert "page number 3" in pages[1][3][1]
+    assert report[1]["pages"] == 5 and report[1]["error"] is None
+
+
+def test_process_pool_matches_serial_parse(tmp_path, monkeypatch):
+    # the API process has threads running, so workers must not be forked from it
+    assert loader._mp_context().get_start_method() != "fork"
+    monkeypatch.setattr(loader, "PAGES_PER_TASK", 2)
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"doc{i}.pdf"))
+        write_pdf(paths[-1], [[f"doc {i} page {p}"] for p in range(3)])
+
+    assert loader.load_pdfs(paths, workers=2)[0] == loader.load_pdfs(paths, workers=1)[0]
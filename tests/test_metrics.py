@@ -0,0 +1,54 @@
+# tests/test_metrics.py
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main, metrics, profiler, store
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        h.observe(value, stage='a"b')
+
+    lines = h.render()
+    assert 't_seconds_bucket{stage="a\\"b",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{stage="a\\"b",le="1"} 2' in lines
+    assert 't_seconds_bucket{stage="a\\"b",le="+Inf"} 3' in lines
+    assert 't_seconds_count{stage="a\\"b"} 3' in lines
+
+
+def test_query_timings_and_metrics_endpoint(rag):
+    store.append_chunks(rag, store.empty_manifest(), ["apples are red fruit"])
+    client = TestClient(main.app)
+
+    res = client.post("/query", json={"query": "fruit", "timings": True}).json()
+    assert {"load_ms", "retrieve_ms", "lexical_ms", "pack_ms", "llm_ms", "total_ms"} <= set(res["timings"])
+
+    text = client.get("/metrics").text
+    for stage in ("load", "retrieve", "pack", "llm"):
+        assert f'rag_stage_seconds_count{{stage="{stage}",retriever=""}}' in text
+    assert 'rag_stage_seconds_count{stage="score",retriever="lexical"}' in text
+    assert 'rag_http_request_seconds_count{method="POST",route="/query",status="200"}' in text
+
+
+def test_slow_block_writes_folded_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_DIR", str(tmp_path))
+
+    def busy(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+    with profiler.profile_if_slow("fast", threshold_ms=10_000):
+        busy(0.05)
+    with profiler.profile_if_slow("/query", threshold_ms=1):
+        busy(0.2)
+
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith("-query.folded")
+    with open(tmp_path / files[0]) as f:
+        lines = f.read().splitlines()
+    assert any("busy (test_metrics.py" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,86 @@
+# tests/test_pagecache.py
+import os
+
+from app import loader, pipeline
+from app.pagecache import SUFFIX, PageCache
+from benchmarks.pdfgen import write_pdf
+
+
+def no_parsing(*args):
+    raise AssertionError("PDF parsed despite a cache hit")
+
+
+def test_lru_eviction_and_corrupt_entries(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10_000)
+    for i, digest in enumerate("abc"):
+        cache.put(digest, [f"page of {digest}"])
+        os.utime(tmp_path / (digest + SUFFIX), (1000 + i, 1000 + i))
+
+    assert cache.get("a") == ["page of a"]  # now the most recently used
+    # room for exactly two entries (sizes differ by a byte or so: timestamps)
+    cache.max_bytes = sum(os.path.getsize(tmp_path / (d + SUFFIX)) for d in "ac")
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("c") == ["page of c"] and cache.get("a") == ["page of a"]
+
+    (tmp_path / ("c" + SUFFIX)).write_bytes(b"truncated")
+    assert cache.get("c") is None and not (tmp_path / ("c" + SUFFIX)).exists()
+    assert PageCache(str(tmp_path), max_bytes=0).get("a") is None
+
+
+def test_entries_are_streamed_then_renamed_into_place(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10_000)
+    writer = cache.writer("a")
+    writer.add("page one")
+    assert cache.get("a") is None  # nothing visible before commit
+    writer.add("page two")
+    writer.commit(1.5)
+    assert cache.get("a") == ["page one", "page two"]
+
+    writer = cache.writer("b")
+    writer.add("dropped")
+    writer.abort()
+    writer = cache.writer("c")
+    writer.add(os.urandom(20_000).hex())  # outgrows the cache while streaming
+    writer.commit()
+    assert os.listdir(tmp_path) == ["a" + SUFFIX]
+
+
+def test_iter_pages_serves_parsed_files_from_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "PAGES_PER_TASK", 2)
+    good = tmp_path / "good.pdf"
+    write_pdf(str(good), [[f"page number {i}"] for i in range(5)])
+    bad = tmp_path / "bad.pdf"
+    bad.write_text("not a pdf")
+    paths, digests = [str(bad), str(good)], ["bad", "good"]
+    cache = PageCache(str(tmp_path / "cache"))
+
+    report = loader.new_report(paths)
+    first = list(loader.iter_pages(paths, report, workers=1, digests=digests, cache=cache))
+    assert [(f, p) for f, p, _ in first] == [(1, i) for i in range(5)]
+    assert not report[1]["cached"] and cache.get("bad") is None  # failures aren't cached
+
+    monkeypatch.setattr(loader, "extract_pages", no_parsing)
+    report = loader.new_report(paths)
+    again = list(loader.iter_pages([str(good)] * 2, report, workers=1, digests=["good"] * 2, cache=cache))
+    assert again == [(0, p, t) for _, p, t in first] + [(1, p, t) for _, p, t in first]
+    assert [r["pages"] for r in report] == [5, 5] and all(r["cached"] for r in report)
+
+    # a consumer that stops early leaves no partial entry behind
+    monkeypatch.undo()
+    pages = loader.iter_pages([str(good)], loader.new_report([str(good)]), workers=1, digests=["other"], cache=cache)
+    next(pages)
+    pages.close()
+    assert cache.get("other") is None and not [n for n in os.listdir(tmp_path / "cache") if n.endswith(".tmp")]
+
+
+def test_reingest_into_another_collection_skips_parsing(rag, tmp_path, monkeypatch):
+    pdf = str(tmp_path / "manual.pdf")
+    write_pdf(pdf, [["Close the intake valve before servicing the pump."], ["Check seals yearly."]])
+
+    assert not pipeline.process_and_store_docs([pdf])[0]["cached"]
+    monkeypatch.setattr(loader, "pdf_reader", no_parsing)
+    report = pipeline.process_and_store_docs([pdf], collection="team-a")
+    assert report[0]["cached"] and report[0]["pages"] == 2
+    assert pipeline.retrieve("intake valve", collections=["team-a"])["passages"] == \
+        pipeline.retrieve("intake valve")["passages"]
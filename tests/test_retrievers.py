@@ -0,0 +1,41 @@
+# tests/test_retrievers.py
+from app.retrievers import HybridRetriever, Retriever
+
+
+class Fixed(Retriever):
+    def __init__(self, name, ids, limit=50):
+        self.name = name
+        self.ids = ids
+        self.limit = limit
+        self.pulled = 0
+
+    def candidates(self, query, timings=None):
+        for rank, cid in enumerate(self.ids):
+            self.pulled += 1
+            yield 1.0 / (rank + 1), cid
+
+
+def test_rrf_prefers_chunks_ranked_by_both():
+    lexical = Fixed("lexical", [1, 2, 3])
+    dense = Fixed("dense", [3, 4, 1])
+
+    timings = {}
+    hits = HybridRetriever([lexical, dense], rrf_k=60).retrieve("q", k=2, timings=timings)
+
+    assert [cid for _, cid in hits] == [1, 3]
+    assert {"lexical_ms", "dense_ms", "hybrid_ms"} <= set(timings)
+
+
+def test_stage_caps_bound_the_work():
+    lexical = Fixed("lexical", list(range(1000)), limit=10)
+    dense = Fixed("dense", list(range(1000)), limit=5)
+
+    HybridRetriever([lexical, dense]).retrieve("q", k=4)
+
+    assert (lexical.pulled, dense.pulled) == (10, 5)
+
+
+def test_candidates_are_lazy():
+    lexical = Fixed("lexical", [1, 2, 3])
+    lexical.candidates("q")
+    assert lexical.pulled == 0
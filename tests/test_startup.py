@@ -0,0 +1,48 @@
+# tests/test_startup.py
+import json
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app import main, pipeline, store
+from app.llm import FakeLLM
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_defers_heavy_clients():
+    # a fresh interpreter, a real provider and no key: importing the API
+    # must neither need the key nor pull in the LLM client or PDF parser
+    env = {k: v for k, v in os.environ.items() if k != "GROQ_API_KEY"}
+    env.update(PYTHONPATH=ROOT, LLM_PROVIDER="groq")
+    code = (
+        "import json, sys\n"
+        "import app.main, app.pipeline\n"
+        "print(json.dumps([app.pipeline.llm is None, [m for m in ('langchain_groq', 'pypdf') if m in sys.modules]]))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == [True, []]
+
+
+def test_warmup_endpoint(rag, monkeypatch):
+    store.append_chunks(rag, store.empty_manifest(), ["pump maintenance schedule"])
+    monkeypatch.setattr(pipeline, "llm", None)
+    monkeypatch.setattr(pipeline, "build_llm", FakeLLM)
+
+    response = TestClient(main.app).get("/warmup")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] and body["errors"] == {}
+    assert {"llm_ms", "pdf_ms", "index_ms"} <= set(body["steps"])
+    assert isinstance(pipeline.llm, FakeLLM)
+
+    def broken():
+        raise RuntimeError("GROQ_API_KEY is not set")
+
+    monkeypatch.setattr(pipeline, "llm", None)
+    monkeypatch.setattr(pipeline, "build_llm", broken)
+    response = TestClient(main.app).get("/warmup")
+    assert response.status_code == 503
+    assert response.json()["errors"] == {"llm": "GROQ_API_KEY is not set"}
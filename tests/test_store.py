@@ -0,0 +1,108 @@
+# tests/test_store.py
+import json
+import os
+
+import pytest
+
+from app import store
+
+
+def test_append_keeps_existing_ids_and_segments(tmp_path):
+    path = str(tmp_path)
+    manifest = store.append_chunks(path, store.empty_manifest(), ["first a", "first b"], {"h1": {"filename": "a.pdf"}})
+    first_segment = os.path.join(path, manifest["segments"][0]["name"] + ".post")
+    before = os.stat(first_segment).st_mtime_ns
+
+    manifest = store.append_chunks(path, manifest, ["second a"], {"h2": {"filename": "b.pdf"}})
+
+    assert list(store.read_chunks(path, manifest)) == ["first a", "first b", "second a"]
+    assert manifest["n_chunks"] == 3
+    assert len(manifest["segments"]) == 2
+    assert set(manifest["sources"]) == {"h1", "h2"}
+    assert os.stat(first_segment).st_mtime_ns == before
+
+
+def test_manifest_survives_reload(tmp_path):
+    path = str(tmp_path)
+    manifest = store.append_chunks(path, store.empty_manifest(), ["x"])
+    assert store.load_manifest(path) == manifest
+
+
+def test_migrate_legacy_data_txt(tmp_path):
+    path = str(tmp_path)
+    with open(os.path.join(path, "data.txt"), "w", encoding="utf-8") as f:
+        f.write(store.SEPARATOR.join(["old one", "old two"]))
+
+    manifest = store.migrate_legacy(path)
+
+    assert not store.needs_migration(path)
+    assert list(store.read_chunks(path, manifest)) == ["old one", "old two"]
+    assert manifest["segments"][0]["n_docs"] == 2
+    assert not os.path.exists(os.path.join(path, "data.txt"))
+
+
+def test_migrate_keeps_ids_of_indexed_text_store(tmp_path):
+    path = str(tmp_path)
+    manifest = store.append_chunks(path, store.empty_manifest(), ["a", "", "c"])
+    for name in ("chunks.dat", "chunks.idx"):
+        os.remove(os.path.join(path, name))
+    with open(os.path.join(path, "data.txt"), "w", encoding="utf-8") as f:
+        f.write(store.SEPARATOR.join(["a", "", "c"]))
+
+    migrated = store.migrate_legacy(path)
+
+    assert migrated["segments"] == manifest["segments"]
+    assert list(store.read_chunks(path, migrated)) == ["a", "", "c"]
+
+
+def test_writer_cuts_segments_and_commits_atomically(tmp_path):
+    path = str(tmp_path)
+    writer = store.StoreWriter(path, store.empty_manifest(), segment_chunks=2)
+    for text in ["a", "b", "c", "d", "e"]:
+        writer.add(text)
+
+    assert store.load_manifest(path)["n_chunks"] == 0  # nothing visible yet
+
+    manifest = writer.commit()
+
+    assert [s["n_docs"] for s in manifest["segments"]] == [2, 2, 1]
+    assert list(store.read_chunks(path, manifest)) == ["a", "b", "c", "d", "e"]
+
+
+def test_generations_are_immutable_behind_current(tmp_path):
+    path = str(tmp_path)
+    first = store.append_chunks(path, store.empty_manifest(), ["one"])
+    pinned = store.current(path)
+
+    second = store.append_chunks(path, first, ["two"])
+
+    assert store.current(path) == store.manifest_name(second["generation"]) != pinned
+    # a reader that resolved CURRENT before the swap still gets its whole generation
+    assert store.load_manifest(path, pinned) == first
+    assert list(store.read_chunks(path, store.load_manifest(path, pinned))) == ["one"]
+    assert list(store.read_chunks(path, store.load_manifest(path))) == ["one", "two"]
+
+
+def test_old_manifest_json_is_read_then_replaced(tmp_path):
+    path = str(tmp_path)
+    manifest = store.append_chunks(path, store.empty_manifest(), ["old"])
+    os.remove(os.path.join(path, store.CURRENT))
+    with open(os.path.join(path, store.MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    assert store.load_manifest(path) == manifest
+    store.append_chunks(path, manifest, ["new"])
+    assert not os.path.exists(os.path.join(path, store.MANIFEST))
+    assert store.load_manifest(path)["n_chunks"] == 2
+
+
+def test_writer_lock_excludes_other_processes(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    lock = store.WriterLock(str(tmp_path))
+
+    # flock is per open file, so a second open() behaves like another process
+    with lock, open(os.path.join(str(tmp_path), store.LOCK_FILE), "a") as other:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with open(os.path.join(str(tmp_path), store.LOCK_FILE), "a") as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -0,0 +1,37 @@
+# tests/test_stream.py
+import json
+
+from fastapi.testclient import TestClient
+
+from app import main, store
+
+
+def parse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_sends_sources_then_tokens(rag):
+    store.append_chunks(rag, store.empty_manifest(), ["retrieval augmented generation", "other text"])
+
+    response = TestClient(main.app).post("/query/stream", json={"query": "retrieval"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "sources" and names[-1] == "done"
+    assert events[0][1]["source_chunks"][0]["text"].startswith("retrieval augmented generation")
+    answer = "".join(p["text"] for name, p in events if name == "token")
+    assert answer == "Stub answer to: retrieval"
+    assert events[-1][1]["ttft_ms"] <= events[-1][1]["total_ms"]
+
+
+def test_stream_rejects_bad_queries_before_streaming():
+    client = TestClient(main.app)
+    for body in ({"query": ""}, {"query": "   "}, {"query": 5}, {"query": None}, {"query": "x", "retriever": "nope"}):
+        response = client.post("/query/stream", json=body)
+        assert response.status_code == 400
+        assert response.headers["content-type"] == "application/json"
@@ -0,0 +1,45 @@
+# tests/test_vectors.py
+import numpy as np
+
+from app import store
+from app.embeddings import HashingEmbedder
+from app.vectors import VectorIndex, VectorWriter
+
+
+def test_hashing_embedder_is_deterministic_and_normalised():
+    embedder = HashingEmbedder(dim=64)
+    a = embedder.embed(["retrieval augmented generation", ""])
+    b = embedder.embed(["retrieval augmented generation"])
+
+    assert a.dtype == np.float32 and a.shape == (2, 64)
+    assert np.allclose(a[0], b[0])
+    assert np.isclose(np.linalg.norm(a[0]), 1.0)
+    assert not a[1].any()
+
+
+def test_search_matches_exact_ranking(tmp_path):
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((500, 16)).astype(np.float32)
+    writer = VectorWriter(str(tmp_path), 0, 16)
+    writer.add(matrix[:200])
+    writer.add(matrix[200:])
+    writer.close()
+
+    query = rng.standard_normal(16).astype(np.float32)
+    hits = VectorIndex(str(tmp_path), 500, 16).search(query, k=5)
+
+    expected = np.argsort(-(matrix @ query))[:5]
+    assert [row for _, row in hits] == expected.tolist()
+
+
+def test_store_backfills_vectors_for_older_chunks(tmp_path):
+    path = str(tmp_path)
+    embedder = HashingEmbedder(dim=32)
+    manifest = store.append_chunks(path, store.empty_manifest(), ["apple pie", "banana split"])
+    assert "n_vectors" not in manifest
+
+    manifest = store.append_chunks(path, manifest, ["cherry tart"], embedder=embedder)
+
+    assert manifest["n_vectors"] == 3
+    index = VectorIndex(path, manifest["n_vectors"], 32)
+    assert index.search(embedder.embed(["banana split"])[0], k=1)[0][1] == 1
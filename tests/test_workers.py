@@ -0,0 +1,35 @@
+# tests/test_workers.py
+import os
+import subprocess
+import sys
+
+from app import pipeline, store
+
+# another server worker: commits generations into the same store
+WRITER = """
+import sys
+from app import store
+path = sys.argv[1]
+for i in range(40):
+    with store.WriterLock(path):
+        store.append_chunks(path, store.load_manifest(path), [f"fresh chunk {i}"])
+"""
+
+
+def test_queries_pick_up_generations_from_other_processes(rag):
+    path = rag
+    store.append_chunks(path, store.empty_manifest(), ["seed chunk"])
+    assert pipeline.retrieve("seed")["passages"] == ["seed chunk"]
+
+    writer = subprocess.Popen([sys.executable, "-c", WRITER, path], cwd=os.getcwd())
+    while writer.poll() is None:
+        entry = pipeline._index(path)
+        chunks, _ = pipeline._chunks(path, entry)
+        # index, chunks and metadata always come from one generation
+        assert entry["manifest"]["n_chunks"] == len(chunks) == len(entry["meta"])
+        assert sum(s.n_docs for s in entry["ordered"]) == len(chunks)
+    assert writer.returncode == 0
+
+    # no restart needed: the next query sees the last generation
+    assert pipeline._index(path)["manifest"]["n_chunks"] == 41
+    assert "fresh chunk 39" in pipeline.retrieve("fresh chunk 39")["passages"][0]